@@ -353,6 +353,11 @@ struct NeonVisionEditorApp: App {
                 }
                 .keyboardShortcut("p", modifiers: .command)
 
+                Button("Find in Project…") {
+                    postWindowCommand(.showProjectSearchRequested)
+                }
+                .keyboardShortcut("f", modifiers: [.command, .shift])
+
                 Button("Clear Editor") {
                     postWindowCommand(.clearEditorRequested)
                 }
@@ -0,0 +1,312 @@
+import Foundation
+
+/// The declarations and headings of one document, found line by line with rules for each
+/// language, as the sidebar lists them. The outline keeps its own `TextRope` copy of the text
+/// and updates it with every edit on a background queue, rescanning only the lines the edit
+/// touched; entries below them are just moved. Results reach the main queue tagged with the
+/// document generation they describe, and `didUpdateNotification` is posted with the outline;
+/// `entries` is replaced only when an edit changed them.
+nonisolated final class DocumentOutline {
+    struct Entry: Identifiable, Equatable {
+        enum Kind {
+            case type
+            case function
+            case heading
+            /// A plain line, for languages without declaration rules.
+            case line
+        }
+
+        let name: String
+        let kind: Kind
+        /// Zero-based line number.
+        let line: Int
+
+        var id: Int { line }
+    }
+
+    static let didUpdateNotification = Notification.Name("DocumentOutlineDidUpdate")
+
+    /// Lines starting with one of these declare something; after a match the rest of the line is
+    /// tried again, so "class func run()" is the function "run".
+    private static let declarationKeywords: [String: [(keyword: String, kind: Entry.Kind)]] = [
+        "swift": [("func ", .function), ("struct ", .type), ("class ", .type), ("enum ", .type)],
+        "python": [("def ", .function), ("class ", .type)],
+        "javascript": [("function ", .function), ("class ", .type)],
+        "java": [("class ", .type)],
+        "kotlin": [("class ", .type), ("object ", .type), ("fun ", .function)],
+        "go": [("func ", .function), ("type ", .type)],
+        "ruby": [("def ", .function), ("class ", .type), ("module ", .type)],
+        "rust": [("fn ", .function), ("struct ", .type), ("enum ", .type), ("impl ", .type)],
+        "typescript": [("function ", .function), ("class ", .type), ("interface ", .type), ("type ", .type)],
+        "php": [("function ", .function), ("class ", .type), ("interface ", .type), ("trait ", .type)],
+        "objective-c": [("@interface", .type), ("@implementation", .type)],
+        "csharp": [("class ", .type), ("interface ", .type), ("enum ", .type)],
+        "powershell": [("param(", .line)]
+    ]
+    private static let headingLanguages: Set<String> = ["html", "css", "json", "markdown", "csv"]
+    private static let shellFunction = try! NSRegularExpression(pattern: #"^([A-Za-z_][A-Za-z0-9_]*)\s*\(\)\s*\{"#)
+    private static let shellKeywordFunction = try! NSRegularExpression(pattern: #"^function\s+([A-Za-z_][A-Za-z0-9_]*)\s*\{"#)
+    private static let powershellFunction = try! NSRegularExpression(pattern: #"^function\s+([A-Za-z_][A-Za-z0-9_\-]*)\s*\{"#)
+    private static let htmlTag = try! NSRegularExpression(pattern: "<[^>]*>")
+    // Languages without rules list their lines, but not for documents this long
+    private static let lineListingLengthLimit = 400_000
+
+    private let queue = DispatchQueue(label: "DocumentOutline", qos: .utility)
+    // Touched only on `queue`
+    private var rope = TextRope()
+    private var scanLanguage: String
+    private var symbols: [Entry] = []
+    private var symbolsChanged = false
+    // Touched only on the main queue
+    private var requestCount = 0
+    private var latestGeneration = 0
+    // Changed entries of a result overtaken by a later one that changed nothing
+    private var pendingEntries: [Entry]?
+
+    /// The entries of document generation `generation`, in document order.
+    private(set) var entries: [Entry] = []
+    /// Increases whenever `entries` changes, so views can skip updates that changed nothing.
+    private(set) var entriesRevision = 0
+    /// Nil until the first scan has finished.
+    private(set) var generation: Int?
+    private(set) var isTextEmpty = true
+    /// Set while the document is too long to list its lines, for languages without rules.
+    private(set) var isLineListingDisabled = false
+    private(set) var language: String
+
+    init(language: String) {
+        self.language = language
+        scanLanguage = language
+    }
+
+    /// Scans `text` from scratch, for a new document or one whose edits were not forwarded.
+    func reset(text: String, generation: Int) {
+        let request = nextRequest()
+        latestGeneration = generation
+        queue.async {
+            self.rope = TextRope(text)
+            self.rescan()
+            self.publish(generation: generation, request: request)
+        }
+    }
+
+    /// Rescans the whole text when `language` differs from the one it was scanned with.
+    func setLanguage(_ language: String) {
+        guard language != self.language else { return }
+        self.language = language
+        let request = nextRequest()
+        let generation = latestGeneration
+        queue.async {
+            self.scanLanguage = language
+            self.rescan()
+            self.publish(generation: generation, request: request)
+        }
+    }
+
+    /// Applies an edit of the document, which became generation `generation` with it: `range`
+    /// of the previous text now reads `replacement`.
+    func applyEdit(replacing range: NSRange, with replacement: String, generation: Int) {
+        let request = nextRequest()
+        latestGeneration = generation
+        queue.async {
+            self.apply(range, replacement)
+            self.publish(generation: generation, request: request)
+        }
+    }
+
+    private func nextRequest() -> Int {
+        requestCount += 1
+        return requestCount
+    }
+
+    private func rescan() {
+        let symbols = omitsLines(forLength: rope.length) ? [] : Self.scan(Substring(rope.string), firstLine: 0, language: scanLanguage)
+        symbolsChanged = symbolsChanged || symbols != self.symbols
+        self.symbols = symbols
+    }
+
+    private func omitsLines(forLength length: Int) -> Bool {
+        Self.listsLines(scanLanguage) && length >= Self.lineListingLengthLimit
+    }
+
+    private func apply(_ range: NSRange, _ replacement: String) {
+        let wasDisabled = omitsLines(forLength: rope.length)
+        let firstLine = rope.lineIndex(containing: range.location)
+        let lastOldLine = rope.lineIndex(containing: NSMaxRange(range))
+        rope.replace(range, with: replacement)
+        let isDisabled = omitsLines(forLength: rope.length)
+        guard !wasDisabled, !isDisabled else {
+            if wasDisabled != isDisabled {
+                rescan()
+            }
+            return
+        }
+        let lastNewLine = rope.lineIndex(containing: range.location + replacement.utf16.count)
+
+        let start = rope.lineStart(firstLine)
+        let end = lastNewLine + 1 < rope.lineCount ? rope.lineStart(lastNewLine + 1) - 1 : rope.length
+        let rescanned = Self.scan(
+            Substring(rope.substring(with: NSRange(location: start, length: end - start))),
+            firstLine: firstLine,
+            language: scanLanguage
+        )
+
+        // Entries of the replaced lines make way for the rescanned ones; those after them move
+        let lower = firstIndex(ofLineAtLeast: firstLine)
+        let upper = firstIndex(ofLineAtLeast: lastOldLine + 1)
+        let lineDelta = lastNewLine - lastOldLine
+        guard lineDelta != 0 || !symbols[lower..<upper].elementsEqual(rescanned) else { return }
+        symbolsChanged = true
+        var tail = rescanned
+        tail.reserveCapacity(rescanned.count + symbols.count - upper)
+        for entry in symbols[upper...] {
+            tail.append(Entry(name: entry.name, kind: entry.kind, line: entry.line + lineDelta))
+        }
+        symbols.replaceSubrange(lower..., with: tail)
+    }
+
+    private func firstIndex(ofLineAtLeast line: Int) -> Int {
+        var low = 0
+        var high = symbols.count
+        while low < high {
+            let middle = (low + high) / 2
+            if symbols[middle].line < line {
+                low = middle + 1
+            } else {
+                high = middle
+            }
+        }
+        return low
+    }
+
+    private func publish(generation: Int, request: Int) {
+        // Unchanged entries are not sent again, so an edit above a long outline costs no copy
+        let entries = symbolsChanged ? symbols : nil
+        symbolsChanged = false
+        let isTextEmpty = rope.length == 0
+        let isLineListingDisabled = omitsLines(forLength: rope.length)
+        DispatchQueue.main.async {
+            if let entries {
+                self.pendingEntries = entries
+            }
+            // Results overtaken by a later edit are dropped; that edit publishes its own
+            guard request == self.requestCount else { return }
+            if let entries = self.pendingEntries {
+                self.entries = entries
+                self.entriesRevision += 1
+                self.pendingEntries = nil
+            }
+            self.generation = generation
+            self.isTextEmpty = isTextEmpty
+            self.isLineListingDisabled = isLineListingDisabled
+            NotificationCenter.default.post(name: Self.didUpdateNotification, object: self)
+        }
+    }
+
+    // MARK: Rules
+
+    private static func scan(_ text: Substring, firstLine: Int, language: String) -> [Entry] {
+        var entries: [Entry] = []
+        var line = firstLine
+        for content in text.split(separator: "\n", omittingEmptySubsequences: false) {
+            if let symbol = symbol(in: content, language: language) {
+                entries.append(Entry(name: symbol.name, kind: symbol.kind, line: line))
+            }
+            line += 1
+        }
+        return entries
+    }
+
+    /// Whether `language` has no rules, so its outline lists short lines instead.
+    static func listsLines(_ language: String) -> Bool {
+        declarationKeywords[language] == nil && !headingLanguages.contains(language) && !["c", "cpp", "bash", "zsh"].contains(language)
+    }
+
+    /// The name and kind of what `line` declares in `language`, if anything.
+    static func symbol(in line: Substring, language: String) -> (name: String, kind: Entry.Kind)? {
+        let text = line.trimmingCharacters(in: .whitespacesAndNewlines)
+        guard !text.isEmpty else { return nil }
+
+        if let keywords = declarationKeywords[language] {
+            var rest = Substring(text)
+            var kind: Entry.Kind?
+            while let match = keywords.first(where: { rest.hasPrefix($0.keyword) }) {
+                kind = match.kind
+                rest = rest.dropFirst(match.keyword.count).drop(while: \.isWhitespace)
+            }
+            if let kind {
+                return (identifier(startingWith: rest) ?? text, kind)
+            }
+        }
+
+        switch language {
+        case "java":
+            if text.contains(" void ") || (text.contains(" public ") && text.contains("(") && text.contains(")")) {
+                return (identifier(before: "(", in: text) ?? text, .function)
+            }
+        case "csharp":
+            if text.contains(" static void Main(") || (text.contains(" void ") && text.contains("(") && text.contains(")") && text.contains("{")) {
+                return (identifier(before: "(", in: text) ?? text, .function)
+            }
+        case "c", "cpp":
+            let returnTypes = ["void ", "int ", "float ", "double ", "char "]
+            if text.contains("("), !text.contains(";"), returnTypes.contains(where: { text.hasPrefix($0) }) || text.contains("{") {
+                return (identifier(before: "(", in: text) ?? text, .function)
+            }
+        case "bash", "zsh":
+            if let name = firstCapture(of: shellFunction, in: text) ?? firstCapture(of: shellKeywordFunction, in: text) {
+                return (name, .function)
+            }
+        case "powershell":
+            if let name = firstCapture(of: powershellFunction, in: text) {
+                return (name, .function)
+            }
+        case _ where headingLanguages.contains(language):
+            if text.hasPrefix("#") {
+                let title = text.drop(while: { $0 == "#" }).trimmingCharacters(in: .whitespaces)
+                return (title.isEmpty ? text : title, .heading)
+            }
+            if text.hasPrefix("<h") {
+                let range = NSRange(location: 0, length: (text as NSString).length)
+                let title = htmlTag.stringByReplacingMatches(in: text, range: range, withTemplate: "").trimmingCharacters(in: .whitespaces)
+                return (title.isEmpty ? text : title, .heading)
+            }
+        case _ where listsLines(language):
+            // Without rules for the language, short lines stand in for headings
+            if text.count < 120 {
+                return (text, .line)
+            }
+        default:
+            break
+        }
+        return nil
+    }
+
+    /// The identifier `text` starts with, after a Go method's receiver.
+    private static func identifier(startingWith text: Substring) -> String? {
+        var rest = text
+        if rest.first == "(", let close = rest.firstIndex(of: ")") {
+            rest = rest[rest.index(after: close)...].drop(while: \.isWhitespace)
+        }
+        let name = rest.prefix(while: isIdentifierCharacter)
+        return name.isEmpty ? nil : String(name)
+    }
+
+    /// The identifier right before the first `delimiter`, with C++ scopes and destructors.
+    private static func identifier(before delimiter: Character, in text: String) -> String? {
+        guard let delimiterIndex = text.firstIndex(of: delimiter) else { return nil }
+        let head = text[..<delimiterIndex].reversed().drop(while: \.isWhitespace)
+        let name = head.prefix { isIdentifierCharacter($0) || $0 == ":" || $0 == "~" }
+        return name.isEmpty ? nil : String(name.reversed())
+    }
+
+    private static func isIdentifierCharacter(_ character: Character) -> Bool {
+        character.isLetter || character.isNumber || character == "_" || character == "$"
+    }
+
+    private static func firstCapture(of expression: NSRegularExpression, in text: String) -> String? {
+        let nsText = text as NSString
+        guard let match = expression.firstMatch(in: text, range: NSRange(location: 0, length: nsText.length)) else { return nil }
+        return nsText.substring(with: match.range(at: 1))
+    }
+}
@@ -0,0 +1,125 @@
+import Foundation
+
+/// Ranks paths against a Quick Open query whose characters may be spread out ("cvact" finds
+/// "ContentView+Actions.swift"). Characters at the start of a path segment, after a separator
+/// or at a camel-case hump score more, runs of consecutive characters score more, skipped
+/// characters cost a little, and a match inside the file name beats one spread across folders.
+nonisolated enum FuzzyMatch {
+    private static let matchScore = 16
+    private static let segmentStartBonus = 10
+    private static let wordStartBonus = 8
+    private static let consecutiveBonus = 6
+    private static let gapStartPenalty = 3
+    private static let gapExtensionPenalty = 1
+    private static let fileNameBonus = 24
+
+    /// A bit for every letter, digit and separator in `lowercasedUTF8`, with one bit shared by
+    /// all other bytes. A text can only match a query whose mask is a subset of its own.
+    static func characterMask<Bytes: Sequence>(_ lowercasedUTF8: Bytes) -> UInt64 where Bytes.Element == UInt8 {
+        var mask: UInt64 = 0
+        for byte in lowercasedUTF8 {
+            mask |= 1 << bit(for: byte)
+        }
+        return mask
+    }
+
+    /// Score of `query` (lowercased UTF-8) against `text`, or nil when the query's characters do
+    /// not all appear in order. `key` is `text` lowercased.
+    static func score(_ query: [UInt8], text: String, key: String) -> Int? {
+        guard !query.isEmpty else { return 0 }
+        return text.utf8.withContiguousStorageIfAvailableOrCopy { textBytes in
+            key.utf8.withContiguousStorageIfAvailableOrCopy { keyBytes in
+                // Case changes can only be told apart when lowercasing kept every byte in place
+                let original = textBytes.count == keyBytes.count ? textBytes : nil
+                let nameStart = (keyBytes.lastIndex(of: UInt8(ascii: "/")) ?? -1) + 1
+                if let nameScore = score(query, in: keyBytes, original: original, from: nameStart) {
+                    return nameScore + fileNameBonus
+                }
+                return nameStart > 0 ? score(query, in: keyBytes, original: original, from: 0) : nil
+            }
+        }
+    }
+
+    /// Scores the shortest stretch of `key` from `start` that holds the query in order: the
+    /// first full match found going forward, narrowed from its end going back.
+    private static func score(_ query: [UInt8], in key: UnsafeBufferPointer<UInt8>, original: UnsafeBufferPointer<UInt8>?, from start: Int) -> Int? {
+        var queryIndex = 0
+        var index = start
+        while index < key.count && queryIndex < query.count {
+            if key[index] == query[queryIndex] {
+                queryIndex += 1
+            }
+            index += 1
+        }
+        guard queryIndex == query.count else { return nil }
+        let end = index
+
+        queryIndex = query.count - 1
+        index = end - 1
+        while true {
+            if key[index] == query[queryIndex] {
+                if queryIndex == 0 { break }
+                queryIndex -= 1
+            }
+            index -= 1
+        }
+
+        var score = 0
+        var previousMatch = -2
+        var inGap = false
+        queryIndex = 0
+        for position in index..<end {
+            guard queryIndex < query.count, key[position] == query[queryIndex] else {
+                score -= inGap ? gapExtensionPenalty : gapStartPenalty
+                inGap = true
+                continue
+            }
+            score += matchScore
+            if position == 0 || key[position - 1] == UInt8(ascii: "/") {
+                score += segmentStartBonus
+            } else if isSeparator(key[position - 1]) {
+                score += wordStartBonus
+            } else if let original, isUppercase(original[position]), !isUppercase(original[position - 1]) {
+                score += wordStartBonus
+            }
+            if previousMatch == position - 1 {
+                score += consecutiveBonus
+            }
+            previousMatch = position
+            queryIndex += 1
+            inGap = false
+        }
+        return score
+    }
+
+    private static func bit(for byte: UInt8) -> UInt64 {
+        switch byte {
+        case UInt8(ascii: "a")...UInt8(ascii: "z"): return UInt64(byte - UInt8(ascii: "a"))
+        case UInt8(ascii: "0")...UInt8(ascii: "9"): return 26 + UInt64(byte - UInt8(ascii: "0"))
+        case UInt8(ascii: "/"): return 36
+        case UInt8(ascii: "."): return 37
+        case UInt8(ascii: "_"): return 38
+        case UInt8(ascii: "-"): return 39
+        case UInt8(ascii: " "): return 40
+        default: return 41
+        }
+    }
+
+    private static func isSeparator(_ byte: UInt8) -> Bool {
+        byte == UInt8(ascii: ".") || byte == UInt8(ascii: "_") || byte == UInt8(ascii: "-") || byte == UInt8(ascii: " ")
+    }
+
+    private static func isUppercase(_ byte: UInt8) -> Bool {
+        byte >= UInt8(ascii: "A") && byte <= UInt8(ascii: "Z")
+    }
+}
+
+private extension String.UTF8View {
+    /// Runs `body` on the view's bytes in place when the string stores them contiguously.
+    func withContiguousStorageIfAvailableOrCopy<Result>(_ body: (UnsafeBufferPointer<UInt8>) -> Result) -> Result {
+        if let result = withContiguousStorageIfAvailable(body) {
+            return result
+        }
+        return Array(self).withUnsafeBufferPointer(body)
+    }
+}
@@ -92,8 +92,13 @@ public struct LanguageDetector {
         public let lang: String
         public let scores: [String: Int]
         public let confidence: Int // difference between top-1 and top-2
+        public internal(set) var examinedByteCount = 0 // UTF-8 bytes of the text that were scored
     }
 
+    // Sampled detection: window size and the confidence that ends sampling early
+    public static var sampleWindowByteCount: Int = 16 * 1024
+    public static var sampleConfidenceThreshold: Int = 20
+
     public func preferredLanguage(for fileURL: URL?) -> String? {
         guard let fileURL else { return nil }
         let fileName = fileURL.lastPathComponent.lowercased()
@@ -107,32 +112,206 @@ public struct LanguageDetector {
         return extensionMap[ext]
     }
 
+    // Weighted Swift signals, scored in step 3 of `detect`
+    private static let swiftSignals: [(String, Int)] = [
+        ("import swiftui", 30),
+        ("import foundation", 20),
+        ("import appkit", 18),
+        ("import uikit", 18),
+        ("import combine", 16),
+        ("import swiftdata", 16),
+        ("struct ", 6),
+        (": view", 14),
+        ("enum ", 5),
+        (" class ", 4),
+        (" case ", 4),
+        ("let ", 6),
+        ("var ", 5),
+        ("func ", 5),
+        ("->", 4),
+        (" init(", 6),
+        ("guard ", 10),
+        ("if let ", 10),
+        ("as?", 6),
+        ("as!", 6),
+        ("try?", 6),
+        ("try!", 6),
+        ("@main", 10),
+        ("#if ", 4),
+        ("#endif", 4),
+        ("urlsession", 10),
+        ("urlrequest(", 8),
+        ("jsondecoder", 8),
+        ("jsonserialization", 6),
+        ("decodable", 8),
+        ("encodable", 6),
+        ("asyncstream<", 8),
+        ("observableobject", 10),
+        ("@published", 8),
+        ("@stateobject", 8),
+        ("@state", 6),
+        ("@binding", 6),
+        ("@mainactor", 8),
+        ("public final class ", 14),
+        (" final class ", 12),
+        ("protocol ", 10),
+        ("extension ", 10)
+    ]
+
+    // Every other literal `detect` looks for. All signals are lowercase; each one must be listed
+    // here or in `swiftSignals` so the matcher can find it.
+    private static let signals: [String] = [
+        " as const", " if let ", " import swiftui", " public ", " static ", "#!/bin/bash", "#!/bin/sh", "#!/bin/zsh",
+        "#!/usr/bin/env bash", "#!/usr/bin/env sh", "#!/usr/bin/env zsh", "#import <foundation", "#include",
+        "$", "$_get", "$_post", "$_server", "$_session", "$psversiontable", "$this->", ",", "---",
+        ".. code-block::", ".. toctree::", ":", ": boolean", ": number", ": string", "::", ":\n", ";", "<",
+        "</", "<?=", "<?php", "<?xml", "<body", "<html", "=>", "@", "@implementation", "@interface", "[",
+        "\"cell_type\"", "\"cells\"", "\"metadata\"", "\n", "\n# ", "\n* ", "\n- ", "\n====", "\n[",
+        "\nclass ", "\ndef ", "\nend", "\nimport ", "\nmodule ", "\nnamespace ", "\npublic ",
+        "\nusing system.", "\nusing system;", "]", "]\n", "```c", "```c++", "```cobol", "```cpp", "```cs",
+        "```csharp", "```dotenv", "```env", "```go", "```gql", "```graphql", "```ini", "```java",
+        "```javascript", "```js", "```kotlin", "```kt", "```objc", "```objective-c", "```php",
+        "```powershell", "```proto", "```ps1", "```python", "```rb", "```rs", "```rst", "```ruby", "```rust",
+        "```sql", "```swift", "```toml", "```ts", "```typescript", "```vim", "```xml", "```yaml", "```yml",
+        "autocmd", "companion object", "console.log", "crate::", "create table", "data class ", "echo ",
+        "error_log", "fmt.", "fn ", "fragment ", "fun ", "function ", "http {", "identification division",
+        "impl ", "implements ", "import (", "import foundationmodels", "import java.", "inoremap", "insert ",
+        "int main(", "interface ", "let mut ", "location /", "message ", "mutation", "nnoremap", "object ",
+        "package ", "package main", "param(", "printf(", "procedure division", "proxy_pass", "public class ",
+        "public static void main", "puts ", "readonly ", "rpc ", "scanf(", "schema {", "select ", "server {",
+        "server_name", "set ", "static int main(", "static void main(", "std::", "subscription",
+        "suspend fun", "syntax = \"proto", "trait ", "type ", "type query", "update ", "use ", "val ",
+        "write-host", "{", "}", "="
+    ]
+
+    private static let signalMatcher = SignalMatcher(signals: signals + swiftSignals.map(\.0))
+
+    // Line patterns, compiled once. The text is no longer lowercased, so patterns that used to
+    // run on the lowercased copy are case-insensitive. The dotenv pattern used to look for
+    // upper-case keys in that lowercased copy, where only keys made of underscores and digits
+    // could match; it matches exactly those, so detection results stay as they were. No pattern
+    // crosses a line break, so each match lies within one line and lines can be recounted alone.
+    private enum LinePattern: Int, CaseIterable {
+        case sectionLine, keyColonValue, keyEqualsValue, environmentAssignment, yamlKey, tableHeader, iniAssignment, logLevel
+
+        var source: String {
+            switch self {
+            case .sectionLine: return #"(?m)^[ \t]*\[[^\]\r\n]+\][ \t]*$"#
+            case .keyColonValue: return #"(?m)^[A-Za-z0-9_.-]+[ \t]*:[ \t]+\S+"#
+            case .keyEqualsValue: return #"(?m)^[ \t]*\w+[ \t]*=[ \t]*.+$"#
+            case .environmentAssignment: return #"(?m)^_[0-9_]*[ \t]*="#
+            case .yamlKey: return #"(?m)^\w+:[ \t]+.+$"#
+            case .tableHeader: return #"(?m)^\[[^\]\r\n]+\]$"#
+            case .iniAssignment: return #"(?m)^\w+[ \t]*=[ \t]*.+$"#
+            case .logLevel: return #"(?m)^\[(info|warn|error|debug)\]"#
+            }
+        }
+    }
+
+    private static let linePatternRegexes: [NSRegularExpression?] = LinePattern.allCases.map { pattern in
+        try? NSRegularExpression(pattern: pattern.source, options: [.caseInsensitive])
+    }
+
+    private static func firstMatch(of pattern: LinePattern, in text: String) -> Bool {
+        linePatternRegexes[pattern.rawValue]?.firstMatch(in: text, range: NSRange(text.startIndex..., in: text)) != nil
+    }
+
+    private static func matchCount(of pattern: LinePattern, in text: String) -> Int {
+        linePatternRegexes[pattern.rawValue]?.numberOfMatches(in: text, range: NSRange(text.startIndex..., in: text)) ?? 0
+    }
+
     // Main API
     public func detect(text: String, name: String?, fileURL: URL?) -> Result {
+        let signalCounts = Self.signalMatcher.counts(in: text)
+        var result = score(text: text, name: name, fileURL: fileURL, signalCounts: signalCounts) { pattern in
+            Self.firstMatch(of: pattern, in: text)
+        }
+        result.examinedByteCount = text.utf8.count
+        return result
+    }
+
+    /// Like `detect`, but large texts are scored from line-aligned windows first: the head, then
+    /// head and middle, then head, middle and tail. Sampling stops as soon as the top two languages
+    /// are `sampleConfidenceThreshold` apart; only an ambiguous result falls back to a full scan.
+    public func detectSampled(text: String, name: String?, fileURL: URL?) -> Result {
+        let utf8 = text.utf8
+        let window = Self.sampleWindowByteCount
+        guard utf8.count > window * 4 else { return detect(text: text, name: name, fileURL: fileURL) }
+
+        let middleStart = utf8.index(utf8.startIndex, offsetBy: (utf8.count - window) / 2)
+        let tailStart = utf8.index(utf8.endIndex, offsetBy: -window)
+        let windows = [
+            Self.lineAlignedWindow(in: text, from: utf8.startIndex),
+            Self.lineAlignedWindow(in: text, from: middleStart),
+            Self.lineAlignedWindow(in: text, from: tailStart)
+        ]
+        for end in 1...windows.count {
+            let sample = windows[..<end].joined(separator: "\n")
+            let result = detect(text: sample, name: name, fileURL: fileURL)
+            if result.confidence >= Self.sampleConfidenceThreshold {
+                return result
+            }
+        }
+        return detect(text: text, name: name, fileURL: fileURL)
+    }
+
+    // About `sampleWindowByteCount` bytes of whole lines, starting at the first line that begins
+    // at or after `start`; line-anchored signals then see the same lines a full scan would.
+    // Lines longer than a window (minified files) are cut at a scalar boundary instead.
+    private static func lineAlignedWindow(in text: String, from start: String.Index) -> Substring {
+        let utf8 = text.utf8
+        let newline = UInt8(ascii: "\n")
+        var lower = start
+        if lower != utf8.startIndex {
+            let lineStart = utf8[utf8.index(before: lower)...].prefix(sampleWindowByteCount).firstIndex(of: newline)
+            lower = lineStart.map { utf8.index(after: $0) } ?? scalarAligned(lower, in: text)
+        }
+        let limit = utf8.index(lower, offsetBy: sampleWindowByteCount, limitedBy: utf8.endIndex) ?? utf8.endIndex
+        let upper = utf8[limit...].prefix(sampleWindowByteCount).firstIndex(of: newline) ?? scalarAligned(limit, in: text)
+        return text[lower..<upper]
+    }
+
+    private static func scalarAligned(_ index: String.Index, in text: String) -> String.Index {
+        var index = index
+        while index.samePosition(in: text.unicodeScalars) == nil {
+            index = text.utf8.index(before: index)
+        }
+        return index
+    }
+
+    // Scores `text` from its literal signal counts. Line patterns are evaluated through `matchesLine`;
+    // the text itself is only read at its start, for prefixes, the first character and CSV rows.
+    private func score(
+        text: String,
+        name: String?,
+        fileURL: URL?,
+        signalCounts: [Int],
+        matchesLine: (LinePattern) -> Bool
+    ) -> Result {
         let raw = text
-        let t = raw.lowercased()
-        let trimmed = t.trimmingCharacters(in: .whitespacesAndNewlines)
+        func has(_ signal: String) -> Bool { Self.count(of: signal, in: signalCounts) > 0 }
+        func startsWith(_ prefix: String) -> Bool { raw.utf8.starts(with: prefix.utf8) { SignalMatcher.folded($0) == $1 } }
 
         // Strong priority: if the text contains "import SwiftUI" anywhere, classify as Swift immediately.
-        if t.contains("import swiftui") {
+        if has("import swiftui") {
             return Result(lang: "swift", scores: ["swift": 10_000], confidence: 10_000)
         }
 
         // Additional strong Swift early-returns for common app files
-        if t.contains("@main") {
+        if has("@main") {
             return Result(lang: "swift", scores: ["swift": 10_000], confidence: 10_000)
         }
-        if (t.contains("struct ") && t.contains(": view")) || t.contains("import appkit") || t.contains("import uikit") || t.contains("import foundationmodels") {
+        if (has("struct ") && has(": view")) || has("import appkit") || has("import uikit") || has("import foundationmodels") {
             return Result(lang: "swift", scores: ["swift": 9_000], confidence: 9_000)
         }
 
         // If content includes several Swift-only tokens, force Swift regardless of other signals
-        if t.contains("@published") || t.contains("@stateobject") || t.contains("guard ") || t.contains(" if let ") {
+        if has("@published") || has("@stateobject") || has("guard ") || has(" if let ") {
             return Result(lang: "swift", scores: ["swift": 8_000], confidence: 8_000)
         }
 
         // Swift-specific class modifier that's uncommon in C# (uses 'sealed' instead)
-        if t.contains(" final class ") || t.contains("public final class ") {
+        if has(" final class ") || has("public final class ") {
             return Result(lang: "swift", scores: ["swift": 8_500], confidence: 8_500)
         }
 
@@ -176,7 +355,6 @@ public struct LanguageDetector {
         ]
 
         func bump(_ key: String, _ amount: Int) { scores[key, default: 0] += amount }
-        func count(of needle: String) -> Int { t.components(separatedBy: needle).count - 1 }
 
         // 0) Extension prior
         if let byURL = preferredLanguage(for: fileURL) {
@@ -194,49 +372,53 @@ public struct LanguageDetector {
         }
 
         // 1) Explicit fenced hints
-        if t.contains("```swift") { bump("swift", 100) }
-        if t.contains("```python") { bump("python", 100) }
-        if t.contains("```js") || t.contains("```javascript") { bump("javascript", 100) }
-        if t.contains("```php") { bump("php", 100) }
-        if t.contains("```ts") || t.contains("```typescript") { bump("typescript", 100) }
-        if t.contains("```java") { bump("java", 100) }
-        if t.contains("```kotlin") || t.contains("```kt") { bump("kotlin", 100) }
-        if t.contains("```go") { bump("go", 100) }
-        if t.contains("```ruby") || t.contains("```rb") { bump("ruby", 100) }
-        if t.contains("```rust") || t.contains("```rs") { bump("rust", 100) }
-        if t.contains("```csharp") || t.contains("```cs") { bump("csharp", 100) }
-        if t.contains("```cpp") || t.contains("```c++") { bump("cpp", 100) }
-        if t.contains("```c") { bump("c", 100) }
-        if t.contains("```proto") { bump("proto", 100) }
-        if t.contains("```graphql") || t.contains("```gql") { bump("graphql", 100) }
-        if t.contains("```dotenv") || t.contains("```env") { bump("dotenv", 100) }
-        if t.contains("```rst") { bump("rst", 100) }
-        if t.contains("```sql") { bump("sql", 100) }
-        if t.contains("```xml") { bump("xml", 100) }
-        if t.contains("```yaml") || t.contains("```yml") { bump("yaml", 100) }
-        if t.contains("```toml") { bump("toml", 100) }
-        if t.contains("```ini") { bump("ini", 100) }
-        if t.contains("```vim") { bump("vim", 100) }
-        if t.contains("```powershell") || t.contains("```ps1") { bump("powershell", 100) }
-        if t.contains("```cobol") { bump("cobol", 100) }
-        if t.contains("```objective-c") || t.contains("```objc") { bump("objective-c", 100) }
+        if has("```swift") { bump("swift", 100) }
+        if has("```python") { bump("python", 100) }
+        if has("```js") || has("```javascript") { bump("javascript", 100) }
+        if has("```php") { bump("php", 100) }
+        if has("```ts") || has("```typescript") { bump("typescript", 100) }
+        if has("```java") { bump("java", 100) }
+        if has("```kotlin") || has("```kt") { bump("kotlin", 100) }
+        if has("```go") { bump("go", 100) }
+        if has("```ruby") || has("```rb") { bump("ruby", 100) }
+        if has("```rust") || has("```rs") { bump("rust", 100) }
+        if has("```csharp") || has("```cs") { bump("csharp", 100) }
+        if has("```cpp") || has("```c++") { bump("cpp", 100) }
+        if has("```c") { bump("c", 100) }
+        if has("```proto") { bump("proto", 100) }
+        if has("```graphql") || has("```gql") { bump("graphql", 100) }
+        if has("```dotenv") || has("```env") { bump("dotenv", 100) }
+        if has("```rst") { bump("rst", 100) }
+        if has("```sql") { bump("sql", 100) }
+        if has("```xml") { bump("xml", 100) }
+        if has("```yaml") || has("```yml") { bump("yaml", 100) }
+        if has("```toml") { bump("toml", 100) }
+        if has("```ini") { bump("ini", 100) }
+        if has("```vim") { bump("vim", 100) }
+        if has("```powershell") || has("```ps1") { bump("powershell", 100) }
+        if has("```cobol") { bump("cobol", 100) }
+        if has("```objective-c") || has("```objc") { bump("objective-c", 100) }
 
         // 2) Single-language quick checks
-        if let first = trimmed.first, (first == "{" || first == "[") && t.contains(":") { bump("json", 90) }
-        if t.contains("<?xml") { bump("xml", 90) }
-        if t.contains("<html") || t.contains("<body") || t.contains("</") { bump("html", 90) }
-        if t.contains("<?php") || t.contains("<?=") { bump("php", 90) }
-        if t.contains("syntax = \"proto") { bump("proto", 90) }
-        if t.contains("schema {") || t.contains("type query") { bump("graphql", 70) }
-        if t.contains("server {") || t.contains("http {") || t.contains("location /") { bump("nginx", 70) }
-        if t.contains(".. toctree::") || t.contains(".. code-block::") { bump("rst", 70) }
-        if t.contains("[") && t.contains("]") && t.range(of: #"(?m)^\s*\[[^]]+\]\s*$"#, options: .regularExpression) != nil { bump("ini", 70) }
-        if t.range(of: #"(?m)^[A-Za-z0-9_.-]+\s*:\s+\S+"#, options: .regularExpression) != nil { bump("yaml", 60) }
-        if t.range(of: #"(?m)^\s*\w+\s*=\s*.+$"#, options: .regularExpression) != nil { bump("toml", 60) }
-        if t.contains("\"cells\"") && t.contains("\"cell_type\"") && t.contains("\"metadata\"") { bump("ipynb", 90) }
-        if t.range(of: #"(?m)^[A-Z_][A-Z0-9_]*\s*="#, options: .regularExpression) != nil { bump("dotenv", 70) }
-        if raw.contains(",") && raw.contains("\n") {
-            let lines = raw.split(separator: "\n", omittingEmptySubsequences: true)
+        if let first = raw.unicodeScalars.first(where: { !CharacterSet.whitespacesAndNewlines.contains($0) }), (first == "{" || first == "[") && has(":") { bump("json", 90) }
+        if has("<?xml") { bump("xml", 90) }
+        if has("<html") || has("<body") || has("</") { bump("html", 90) }
+        if has("<?php") || has("<?=") { bump("php", 90) }
+        if has("syntax = \"proto") { bump("proto", 90) }
+        if has("schema {") || has("type query") { bump("graphql", 70) }
+        if has("server {") || has("http {") || has("location /") { bump("nginx", 70) }
+        if has(".. toctree::") || has(".. code-block::") { bump("rst", 70) }
+        // Line regexes only run when the text contains the punctuation they require
+        let hasBrackets = has("[") && has("]")
+        let hasTableHeader = hasBrackets && matchesLine(.tableHeader)
+        if hasBrackets && matchesLine(.sectionLine) { bump("ini", 70) }
+        if has(":") && matchesLine(.keyColonValue) { bump("yaml", 60) }
+        if has("=") && matchesLine(.keyEqualsValue) { bump("toml", 60) }
+        if has("\"cells\"") && has("\"cell_type\"") && has("\"metadata\"") { bump("ipynb", 90) }
+        if has("=") && matchesLine(.environmentAssignment) { bump("dotenv", 70) }
+        if has(",") && has("\n") {
+            // Only the first six lines are compared; the seventh piece is the unsplit remainder
+            let lines = raw.split(separator: "\n", maxSplits: 6, omittingEmptySubsequences: true)
             if lines.count >= 2 {
                 let commaCounts = lines.prefix(6).map { line in line.filter { $0 == "," }.count }
                 if let firstCount = commaCounts.first, firstCount > 0 && commaCounts.dropFirst().allSatisfy({ $0 == firstCount || abs($0 - firstCount) <= 1 }) {
@@ -244,65 +426,20 @@ public struct LanguageDetector {
                 }
             }
         }
-        if t.contains("#!/bin/bash") || t.contains("#!/usr/bin/env bash") { bump("bash", 90) }
-        if t.contains("#!/bin/zsh") || t.contains("#!/usr/bin/env zsh") { bump("zsh", 90) }
-        if t.contains("#!/bin/sh") || t.contains("#!/usr/bin/env sh") { bump("bash", 40) }
+        if has("#!/bin/bash") || has("#!/usr/bin/env bash") { bump("bash", 90) }
+        if has("#!/bin/zsh") || has("#!/usr/bin/env zsh") { bump("zsh", 90) }
+        if has("#!/bin/sh") || has("#!/usr/bin/env sh") { bump("bash", 40) }
 
         // 3) Swift signals
-        let swiftSignals = [
-            ("import swiftui", 30),
-            ("import foundation", 20),
-            ("import appkit", 18),
-            ("import uikit", 18),
-            ("import combine", 16),
-            ("import swiftdata", 16),
-            ("struct ", 6),
-            (": view", 14),
-            ("enum ", 5),
-            (" class ", 4),
-            (" case ", 4),
-            ("let ", 6),
-            ("var ", 5),
-            ("func ", 5),
-            ("->", 4),
-            (" init(", 6),
-            ("guard ", 10),
-            ("if let ", 10),
-            ("as?", 6),
-            ("as!", 6),
-            ("try?", 6),
-            ("try!", 6),
-            ("@main", 10),
-            ("#if ", 4),
-            ("#endif", 4),
-            ("urlsession", 10),
-            ("urlrequest(", 8),
-            ("jsondecoder", 8),
-            ("jsonserialization", 6),
-            ("decodable", 8),
-            ("encodable", 6),
-            ("asyncstream<", 8),
-            ("observableobject", 10),
-            ("@published", 8),
-            ("@stateobject", 8),
-            ("@state", 6),
-            ("@binding", 6),
-            ("@mainactor", 8)
-        ,
-        ("public final class ", 14),
-        (" final class ", 12),
-        ("protocol ", 10),
-        ("extension ", 10)
-        ]
-        for (sig, w) in swiftSignals { if t.contains(sig) { bump("swift", w) } }
+        for (sig, w) in Self.swiftSignals { if has(sig) { bump("swift", w) } }
 
         // 4) C# signals
-        let hasUsingSystem = t.contains("\nusing system;") || t.contains("\nusing system.")
-        let hasNamespace = t.contains("\nnamespace ")
-        let hasMainMethod = t.contains("static void main(") || t.contains("static int main(")
-        let hasCSharpAttributes = t.contains("\n[") && t.contains("]\n") && !t.contains("@")
+        let hasUsingSystem = has("\nusing system;") || has("\nusing system.")
+        let hasNamespace = has("\nnamespace ")
+        let hasMainMethod = has("static void main(") || has("static int main(")
+        let hasCSharpAttributes = has("\n[") && has("]\n") && !has("@")
         let csharpContext = hasUsingSystem || hasNamespace || hasMainMethod
-        let semicolonCount = raw.components(separatedBy: ";").count - 1
+        let semicolonCount = Self.count(of: ";", in: signalCounts)
 
         if hasUsingSystem { bump("csharp", 18) }
         if hasNamespace { bump("csharp", 18) }
@@ -310,7 +447,7 @@ public struct LanguageDetector {
         if hasCSharpAttributes { bump("csharp", 6) }
         if csharpContext {
             if semicolonCount > 8 { bump("csharp", 4) }
-            if t.contains("\nclass ") && (t.contains("\npublic ") || t.contains(" public ")) && t.contains(" static ") {
+            if has("\nclass ") && (has("\npublic ") || has(" public ")) && has(" static ") {
                 bump("csharp", 4)
             }
         } else {
@@ -319,102 +456,102 @@ public struct LanguageDetector {
         }
 
         // 5) Python
-        if t.contains("\ndef ") || t.hasPrefix("def ") { bump("python", 15) }
-        if t.contains("\nimport ") && t.contains(":\n") { bump("python", 8) }
+        if has("\ndef ") || startsWith("def ") { bump("python", 15) }
+        if has("\nimport ") && has(":\n") { bump("python", 8) }
 
         // 6) PHP
-        if t.contains("$this->") || t.contains("$_get") || t.contains("$_post") || t.contains("$_server") || t.contains("$_session") {
+        if has("$this->") || has("$_get") || has("$_post") || has("$_server") || has("$_session") {
             bump("php", 20)
         }
-        if (t.contains("function ") && t.contains("$")) || t.contains("echo ") {
+        if (has("function ") && has("$")) || has("echo ") {
             bump("php", 10)
         }
 
         // 7) JavaScript / TypeScript
-        if t.contains("function ") || t.contains("=>") || t.contains("console.log") { bump("javascript", 15) }
-        if t.contains("interface ") || t.contains("type ") || t.contains("implements ") || t.contains("readonly ") || t.contains(" as const") {
+        if has("function ") || has("=>") || has("console.log") { bump("javascript", 15) }
+        if has("interface ") || has("type ") || has("implements ") || has("readonly ") || has(" as const") {
             bump("typescript", 16)
         }
-        if t.contains(": string") || t.contains(": number") || t.contains(": boolean") {
+        if has(": string") || has(": number") || has(": boolean") {
             bump("typescript", 10)
         }
 
         // 8) C/C++
-        if t.contains("#include") { bump("c", 10); bump("cpp", 10) }
-        if t.contains("std::") { bump("cpp", 20) }
-        if t.contains("int main(") { bump("c", 6); bump("cpp", 6) }
-        if t.contains("printf(") || t.contains("scanf(") { bump("c", 8) }
+        if has("#include") { bump("c", 10); bump("cpp", 10) }
+        if has("std::") { bump("cpp", 20) }
+        if has("int main(") { bump("c", 6); bump("cpp", 6) }
+        if has("printf(") || has("scanf(") { bump("c", 8) }
 
         // 9) CSS
-        if t.contains("{") && t.contains("}") && t.contains(":") && t.contains(";") && !t.contains("func ") {
+        if has("{") && has("}") && has(":") && has(";") && !has("func ") {
             bump("css", 8)
         }
 
         // 10) Proto
-        if t.contains("message ") || t.contains("enum ") || t.contains("rpc ") { bump("proto", 10) }
+        if has("message ") || has("enum ") || has("rpc ") { bump("proto", 10) }
 
         // 11) GraphQL
-        if t.contains("type ") && t.contains("{") && t.contains("}") { bump("graphql", 8) }
-        if t.contains("fragment ") || t.contains("mutation") || t.contains("subscription") { bump("graphql", 8) }
+        if has("type ") && has("{") && has("}") { bump("graphql", 8) }
+        if has("fragment ") || has("mutation") || has("subscription") { bump("graphql", 8) }
 
         // 12) Nginx
-        if t.contains("proxy_pass") || t.contains("server_name") || t.contains("error_log") { bump("nginx", 8) }
+        if has("proxy_pass") || has("server_name") || has("error_log") { bump("nginx", 8) }
 
         // 13) reStructuredText
-        if t.contains("::") && t.contains("\n====") { bump("rst", 6) }
+        if has("::") && has("\n====") { bump("rst", 6) }
 
         // 14) Markdown
-        if t.contains("\n# ") || t.hasPrefix("# ") || t.contains("\n- ") || t.contains("\n* ") { bump("markdown", 8) }
+        if has("\n# ") || startsWith("# ") || has("\n- ") || has("\n* ") { bump("markdown", 8) }
 
         // 15) Java
-        if t.contains("public class ") || t.contains("public static void main") || t.contains("package ") { bump("java", 18) }
-        if t.contains("import java.") { bump("java", 12) }
+        if has("public class ") || has("public static void main") || has("package ") { bump("java", 18) }
+        if has("import java.") { bump("java", 12) }
 
         // 16) Kotlin
-        if t.contains("fun ") || t.contains("val ") || t.contains("var ") || t.contains("data class ") || t.contains("object ") { bump("kotlin", 12) }
-        if t.contains("suspend fun") || t.contains("companion object") { bump("kotlin", 12) }
+        if has("fun ") || has("val ") || has("var ") || has("data class ") || has("object ") { bump("kotlin", 12) }
+        if has("suspend fun") || has("companion object") { bump("kotlin", 12) }
 
         // 17) Go
-        if t.contains("package main") || t.contains("func ") { bump("go", 14) }
-        if t.contains("import (") || t.contains("fmt.") { bump("go", 8) }
+        if has("package main") || has("func ") { bump("go", 14) }
+        if has("import (") || has("fmt.") { bump("go", 8) }
 
         // 18) Ruby
-        if t.contains("\ndef ") || t.contains("\nclass ") || t.contains("\nmodule ") { bump("ruby", 12) }
-        if t.contains("\nend") || t.contains("puts ") { bump("ruby", 6) }
+        if has("\ndef ") || has("\nclass ") || has("\nmodule ") { bump("ruby", 12) }
+        if has("\nend") || has("puts ") { bump("ruby", 6) }
 
         // 19) Rust
-        if t.contains("fn ") || t.contains("let mut ") || t.contains("use ") { bump("rust", 12) }
-        if t.contains("crate::") || t.contains("impl ") || t.contains("trait ") { bump("rust", 8) }
+        if has("fn ") || has("let mut ") || has("use ") { bump("rust", 12) }
+        if has("crate::") || has("impl ") || has("trait ") { bump("rust", 8) }
 
         // 20) Objective-C
-        if t.contains("@interface") || t.contains("@implementation") || t.contains("#import <foundation") { bump("objective-c", 18) }
+        if has("@interface") || has("@implementation") || has("#import <foundation") { bump("objective-c", 18) }
 
         // 21) SQL
-        if t.contains("select ") || t.contains("insert ") || t.contains("update ") || t.contains("create table") { bump("sql", 14) }
+        if has("select ") || has("insert ") || has("update ") || has("create table") { bump("sql", 14) }
 
         // 22) XML
-        if t.contains("<?xml") || (t.contains("<") && t.contains("</") && !t.contains("<html")) { bump("xml", 10) }
+        if has("<?xml") || (has("<") && has("</") && !has("<html")) { bump("xml", 10) }
 
         // 23) YAML
-        if t.contains("---") || t.range(of: #"(?m)^\w+:\s+.+$"#, options: .regularExpression) != nil { bump("yaml", 8) }
+        if has("---") || (has(":") && matchesLine(.yamlKey)) { bump("yaml", 8) }
 
         // 24) TOML
-        if t.range(of: #"(?m)^\[[^\]]+\]$"#, options: .regularExpression) != nil { bump("toml", 8) }
+        if hasTableHeader { bump("toml", 8) }
 
         // 25) INI
-        if t.range(of: #"(?m)^\[[^\]]+\]$"#, options: .regularExpression) != nil && t.range(of: #"(?m)^\w+\s*=\s*.+$"#, options: .regularExpression) != nil { bump("ini", 8) }
+        if hasTableHeader && has("=") && matchesLine(.iniAssignment) { bump("ini", 8) }
 
         // 26) Vimscript
-        if t.contains("autocmd") || t.contains("nnoremap") || t.contains("inoremap") || t.contains("set ") { bump("vim", 10) }
+        if has("autocmd") || has("nnoremap") || has("inoremap") || has("set ") { bump("vim", 10) }
 
         // 27) Log
-        if t.range(of: #"(?m)^\[(info|warn|error|debug)\]"#, options: .regularExpression) != nil { bump("log", 8) }
+        if has("[") && matchesLine(.logLevel) { bump("log", 8) }
 
         // 28) PowerShell
-        if t.contains("param(") || t.contains("write-host") || t.contains("$psversiontable") { bump("powershell", 12) }
+        if has("param(") || has("write-host") || has("$psversiontable") { bump("powershell", 12) }
 
         // 29) COBOL
-        if t.contains("identification division") || t.contains("procedure division") { bump("cobol", 14) }
+        if has("identification division") || has("procedure division") { bump("cobol", 14) }
 
         // Conflict resolution tweaks
         let swiftScore = scores["swift"] ?? 0
@@ -427,12 +564,12 @@ public struct LanguageDetector {
             scores["csharp"] = max(0, csharpScore - 10)
         }
 
-        if (t.contains("import swiftui") || t.contains(": view") || t.contains("@main") || t.contains(" final class ")) && !csharpContext {
+        if (has("import swiftui") || has(": view") || has("@main") || has(" final class ")) && !csharpContext {
             scores["csharp"] = max(0, (scores["csharp"] ?? 0) - 40)
         }
 
         // If Swift-only tokens are present, strongly discourage C#
-        if (t.contains(" final class ") || t.contains("@published") || t.contains(": view")) && !csharpContext {
+        if (has(" final class ") || has("@published") || has(": view")) && !csharpContext {
             scores["csharp"] = max(0, (scores["csharp"] ?? 0) - 30)
         }
 
@@ -456,3 +593,297 @@ public struct LanguageDetector {
     }
 }
 
+// MARK: - Incremental detection
+
+extension LanguageDetector {
+    /// Running signal counts for one text. `detect(text:name:fileURL:updating:previousText:)` adjusts
+    /// them from an edit instead of rescanning, so re-detection costs time proportional to the edit.
+    public struct DetectionState: Equatable {
+        fileprivate var signalCounts: [Int]
+        // Matches per line pattern, counted in line-aligned windows
+        fileprivate var lineMatchCounts: [Int]
+
+        /// Whether the text contains `signal` (lowercase), which must be one the detector scores.
+        public func contains(_ signal: String) -> Bool {
+            LanguageDetector.count(of: signal, in: signalCounts) > 0
+        }
+    }
+
+    /// An edit in UTF-8 byte offsets: `removedLength` bytes at `location` in the old text were
+    /// replaced by `insertedLength` bytes in the new one.
+    public struct TextDelta: Equatable {
+        public var location: Int
+        public var removedLength: Int
+        public var insertedLength: Int
+
+        public init(location: Int, removedLength: Int, insertedLength: Int) {
+            self.location = location
+            self.removedLength = removedLength
+            self.insertedLength = insertedLength
+        }
+
+        /// The smallest single replacement turning `oldText` into `newText`, found by trimming the
+        /// common prefix and suffix.
+        public init(from oldText: String, to newText: String) {
+            var oldText = oldText
+            var newText = newText
+            let (prefix, suffix) = oldText.withUTF8 { old in
+                newText.withUTF8 { new -> (Int, Int) in
+                    var prefix = 0
+                    while prefix < old.count && prefix < new.count && old[prefix] == new[prefix] {
+                        prefix += 1
+                    }
+                    var suffix = 0
+                    while suffix < old.count - prefix && suffix < new.count - prefix
+                            && old[old.count - 1 - suffix] == new[new.count - 1 - suffix] {
+                        suffix += 1
+                    }
+                    return (prefix, suffix)
+                }
+            }
+            let oldCount = oldText.utf8.count
+            let newCount = newText.utf8.count
+            self.init(location: prefix, removedLength: oldCount - prefix - suffix, insertedLength: newCount - prefix - suffix)
+        }
+    }
+
+    public func detectionState(for text: String) -> DetectionState {
+        DetectionState(
+            signalCounts: Self.signalMatcher.counts(in: text),
+            lineMatchCounts: LinePattern.allCases.map { Self.matchCount(of: $0, in: text) }
+        )
+    }
+
+    /// Scores `text` after updating `state`, which described `previousText`, from the edit between
+    /// the two. Only the bytes around the edit are scanned; `examinedByteCount` reports how many.
+    public func detect(
+        text: String,
+        name: String?,
+        fileURL: URL?,
+        updating state: inout DetectionState,
+        previousText: String,
+        delta: TextDelta? = nil
+    ) -> Result {
+        let delta = delta ?? TextDelta(from: previousText, to: text)
+        let examined = Self.apply(delta, to: &state, previousText: previousText, text: text)
+        let lineMatchCounts = state.lineMatchCounts
+        var result = score(text: text, name: name, fileURL: fileURL, signalCounts: state.signalCounts) { pattern in
+            lineMatchCounts[pattern.rawValue] > 0
+        }
+        result.examinedByteCount = examined
+        return result
+    }
+
+    /// The text around one edit, before and after it: the whole lines covering the replaced range
+    /// widened by `editContextLength` characters on each side. Everything outside the two windows
+    /// reads the same in both texts.
+    public struct EditWindow {
+        public var removed: String
+        public var inserted: String
+
+        public init(removed: String, inserted: String) {
+            self.removed = removed
+            self.inserted = inserted
+        }
+    }
+
+    /// How far an `EditWindow` reaches beyond its edit. Signals are ASCII, so this counts UTF-8
+    /// bytes and UTF-16 code units alike.
+    public static var editContextLength: Int { signalMatcher.longestSignal - 1 }
+
+    /// Scores `text` after updating `state` from `edits`, applied in order to the text `state`
+    /// described. Only the windows are scanned, so neither text is copied or compared.
+    public func detect(
+        text: String,
+        name: String?,
+        fileURL: URL?,
+        updating state: inout DetectionState,
+        edits: [EditWindow]
+    ) -> Result {
+        var examined = 0
+        for edit in edits {
+            examined += Self.apply(edit, to: &state)
+        }
+        let lineMatchCounts = state.lineMatchCounts
+        var result = score(text: text, name: name, fileURL: fileURL, signalCounts: state.signalCounts) { pattern in
+            lineMatchCounts[pattern.rawValue] > 0
+        }
+        result.examinedByteCount = examined
+        return result
+    }
+
+    // The windows share everything outside them, and no signal or line pattern match touching the
+    // edit reaches past them, so swapping their counts is exact. Returns the number of bytes scanned.
+    private static func apply(_ edit: EditWindow, to state: inout DetectionState) -> Int {
+        var removed = edit.removed
+        var inserted = edit.inserted
+        removed.withUTF8 { signalMatcher.count(in: $0, into: &state.signalCounts, adding: -1) }
+        inserted.withUTF8 { signalMatcher.count(in: $0, into: &state.signalCounts, adding: 1) }
+        for pattern in LinePattern.allCases {
+            state.lineMatchCounts[pattern.rawValue] += matchCount(of: pattern, in: inserted) - matchCount(of: pattern, in: removed)
+        }
+        return removed.utf8.count + inserted.utf8.count
+    }
+
+    // Literal signals: every occurrence touching the edit lies within `longestSignal - 1` bytes of
+    // it, so counting the same margin in both texts and swapping the totals is exact. Line pattern
+    // matches never span a line break, so recounting the lines the edit touches is exact as well.
+    // Returns the number of bytes scanned.
+    private static func apply(_ delta: TextDelta, to state: inout DetectionState, previousText: String, text: String) -> Int {
+        guard delta.removedLength > 0 || delta.insertedLength > 0 else { return 0 }
+        var oldText = previousText
+        var newText = text
+        return oldText.withUTF8 { old in
+            newText.withUTF8 { new in
+                let margin = signalMatcher.longestSignal - 1
+                let start = max(0, delta.location - margin)
+                let oldWindow = start..<min(old.count, delta.location + delta.removedLength + margin)
+                let newWindow = start..<min(new.count, delta.location + delta.insertedLength + margin)
+                signalMatcher.count(in: UnsafeBufferPointer(rebasing: old[oldWindow]), into: &state.signalCounts, adding: -1)
+                signalMatcher.count(in: UnsafeBufferPointer(rebasing: new[newWindow]), into: &state.signalCounts, adding: 1)
+
+                let oldLines = lineRange(in: old, from: delta.location, to: delta.location + delta.removedLength)
+                let newLines = lineRange(in: new, from: delta.location, to: delta.location + delta.insertedLength)
+                let oldLineText = String(decoding: UnsafeBufferPointer(rebasing: old[oldLines]), as: UTF8.self)
+                let newLineText = String(decoding: UnsafeBufferPointer(rebasing: new[newLines]), as: UTF8.self)
+                for pattern in LinePattern.allCases {
+                    state.lineMatchCounts[pattern.rawValue] += matchCount(of: pattern, in: newLineText) - matchCount(of: pattern, in: oldLineText)
+                }
+                return newWindow.count + newLines.count
+            }
+        }
+    }
+
+    // Whole lines, terminators included, covering the bytes `from..<to`.
+    private static func lineRange(in bytes: UnsafeBufferPointer<UInt8>, from: Int, to: Int) -> Range<Int> {
+        let newline = UInt8(ascii: "\n")
+        var lower = min(from, bytes.count)
+        while lower > 0 && bytes[lower - 1] != newline {
+            lower -= 1
+        }
+        var upper = min(to, bytes.count)
+        while upper < bytes.count && bytes[upper] != newline {
+            upper += 1
+        }
+        return lower..<min(upper + 1, bytes.count)
+    }
+
+    fileprivate static func count(of signal: String, in signalCounts: [Int]) -> Int {
+        guard let index = signalMatcher.index(of: signal) else {
+            assertionFailure("Language signal \"\(signal)\" is not registered with the matcher")
+            return 0
+        }
+        return signalCounts[index]
+    }
+}
+
+/// Aho-Corasick automaton over a fixed set of lowercase ASCII signals. One pass over the UTF-8
+/// bytes counts every occurrence of every signal; ASCII letters are case-folded through the
+/// byte class table, so the text is never lowercased or copied.
+private struct SignalMatcher {
+    private let indices: [String: Int]
+    let longestSignal: Int
+    // Bytes that occur in no signal share class 0
+    private let byteClasses: [UInt8]
+    private let classCount: Int
+    // Dense transition table, `state * classCount + class`, with failure links already followed
+    private let transitions: [Int32]
+    // Signals ending at each state, including those reached through failure links
+    private let outputs: [[Int32]]
+
+    init(signals: [String]) {
+        var indices: [String: Int] = [:]
+        for signal in signals where indices[signal] == nil {
+            indices[signal] = indices.count
+        }
+        var byteClasses = [UInt8](repeating: 0, count: 256)
+        var classCount = 1
+        for byte in signals.joined().utf8 where byteClasses[Int(byte)] == 0 {
+            byteClasses[Int(byte)] = UInt8(classCount)
+            classCount += 1
+        }
+        for upper in UInt8(ascii: "A")...UInt8(ascii: "Z") {
+            byteClasses[Int(upper)] = byteClasses[Int(upper | 0x20)]
+        }
+
+        var next: [[Int32]] = [[Int32](repeating: -1, count: classCount)]
+        var outputs: [[Int32]] = [[]]
+        for (signal, index) in indices {
+            var state = 0
+            for byte in signal.utf8 {
+                let byteClass = Int(byteClasses[Int(byte)])
+                if next[state][byteClass] < 0 {
+                    next[state][byteClass] = Int32(next.count)
+                    next.append([Int32](repeating: -1, count: classCount))
+                    outputs.append([])
+                }
+                state = Int(next[state][byteClass])
+            }
+            outputs[state].append(Int32(index))
+        }
+
+        // Breadth-first, so a state's failure target is complete before the state itself
+        var failure = [Int32](repeating: 0, count: next.count)
+        var queue: [Int] = []
+        for byteClass in 0..<classCount {
+            if next[0][byteClass] < 0 {
+                next[0][byteClass] = 0
+            } else {
+                queue.append(Int(next[0][byteClass]))
+            }
+        }
+        var head = 0
+        while head < queue.count {
+            let state = queue[head]
+            head += 1
+            let fallback = Int(failure[state])
+            outputs[state] += outputs[fallback]
+            for byteClass in 0..<classCount {
+                let child = next[state][byteClass]
+                if child < 0 {
+                    next[state][byteClass] = next[fallback][byteClass]
+                } else {
+                    failure[Int(child)] = next[fallback][byteClass]
+                    queue.append(Int(child))
+                }
+            }
+        }
+
+        self.indices = indices
+        self.longestSignal = signals.map(\.utf8.count).max() ?? 1
+        self.byteClasses = byteClasses
+        self.classCount = classCount
+        self.transitions = next.flatMap { $0 }
+        self.outputs = outputs
+    }
+
+    func index(of signal: String) -> Int? {
+        indices[signal]
+    }
+
+    func counts(in text: String) -> [Int] {
+        var counts = [Int](repeating: 0, count: indices.count)
+        var text = text
+        text.withUTF8 { count(in: $0, into: &counts, adding: 1) }
+        return counts
+    }
+
+    // Adds `amount` to `counts` for every occurrence that lies entirely within `bytes`.
+    func count(in bytes: UnsafeBufferPointer<UInt8>, into counts: inout [Int], adding amount: Int) {
+        var state = 0
+        transitions.withUnsafeBufferPointer { transitions in
+            byteClasses.withUnsafeBufferPointer { byteClasses in
+                for byte in bytes {
+                    state = Int(transitions[state &* classCount &+ Int(byteClasses[Int(byte)])])
+                    for index in outputs[state] {
+                        counts[Int(index)] += amount
+                    }
+                }
+            }
+        }
+    }
+
+    static func folded(_ byte: UInt8) -> UInt8 {
+        (UInt8(ascii: "A")...UInt8(ascii: "Z")).contains(byte) ? byte | 0x20 : byte
+    }
+}
@@ -0,0 +1,71 @@
+import Foundation
+
+/// Line start offsets that an edit can shift without rewriting every line after it. Offsets
+/// from `shiftIndex` on are stored without `shift`, which is added as they are read; an edit
+/// folds its length change into `shift`, and only the lines between two consecutive edits are
+/// ever rewritten to bring the pending shift to the new edit.
+struct LineStartArray {
+    private var stored: [Int]
+    private var shiftIndex: Int
+    private var shift = 0
+
+    init(_ starts: [Int] = [0]) {
+        stored = starts
+        shiftIndex = starts.count
+    }
+
+    var count: Int { stored.count }
+
+    subscript(index: Int) -> Int {
+        index >= shiftIndex ? stored[index] + shift : stored[index]
+    }
+
+    /// Every offset with the pending shift applied.
+    var offsets: [Int] {
+        (0..<stored.count).map { self[$0] }
+    }
+
+    /// Index of the last offset not greater than `location`, or 0 when there is none.
+    func lastIndex(atMost location: Int) -> Int {
+        var low = 0
+        var high = stored.count - 1
+        while low < high {
+            let mid = (low + high + 1) / 2
+            if self[mid] <= location {
+                low = mid
+            } else {
+                high = mid - 1
+            }
+        }
+        return low
+    }
+
+    /// Replaces the offsets in `range` with `starts` and moves every offset after it by `delta`.
+    mutating func replace(_ range: Range<Int>, with starts: [Int], shiftingRestBy delta: Int) {
+        if shift == 0 {
+            shiftIndex = range.upperBound
+        } else if shiftIndex < range.lowerBound {
+            // Lines between the previous edit and this one take the shift for good
+            add(shift, to: shiftIndex..<range.lowerBound)
+            shiftIndex = range.upperBound
+        } else if shiftIndex <= range.upperBound {
+            shiftIndex = range.upperBound
+        } else if shiftIndex - range.upperBound <= stored.count - shiftIndex {
+            // This edit is above the previous one: lines between them take only its delta
+            add(delta, to: range.upperBound..<shiftIndex)
+        } else {
+            add(shift, to: shiftIndex..<stored.count)
+            shift = 0
+            shiftIndex = range.upperBound
+        }
+        shift += delta
+        stored.replaceSubrange(range, with: starts)
+        shiftIndex += starts.count - range.count
+    }
+
+    private mutating func add(_ amount: Int, to range: Range<Int>) {
+        for index in range {
+            stored[index] += amount
+        }
+    }
+}
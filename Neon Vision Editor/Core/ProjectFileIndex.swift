@@ -0,0 +1,208 @@
+import Foundation
+
+/// The files of one project folder as Quick Open searches them: relative paths with their
+/// lowercased match keys and modification dates. The index is saved in the caches directory,
+/// keyed by the folder's path, so reopening a folder has it ready before the folder is walked
+/// again. Updates reuse the entries of files already indexed, and every update and query runs
+/// on a background queue. Queries are ranked by `FuzzyMatch`; a query that extends the previous
+/// one only rescores the files that matched it.
+nonisolated final class ProjectFileIndex {
+    struct Entry {
+        /// Path relative to the root folder.
+        let path: String
+        /// `path` lowercased, so queries do not lowercase the index on every keystroke.
+        let key: String
+        /// Seconds since the reference date, or 0 when unknown.
+        let modificationTime: TimeInterval
+        /// `FuzzyMatch.characterMask(_:)` of `key`.
+        let mask: UInt64
+
+        init(path: String, key: String, modificationTime: TimeInterval) {
+            self.path = path
+            self.key = key
+            self.modificationTime = modificationTime
+            mask = FuzzyMatch.characterMask(key.utf8)
+        }
+
+        var name: String { (path as NSString).lastPathComponent }
+    }
+
+    struct Match {
+        let entry: Entry
+        let score: Int
+    }
+
+    /// Saves wait this long for further updates, so a burst of file events is written once.
+    static let saveDelay: TimeInterval = 2
+    private static let formatVersion = "1"
+
+    private let queue = DispatchQueue(label: "ProjectFileIndex", qos: .userInitiated)
+    // Touched only on `queue`
+    private var root: URL?
+    private var entries: [Entry] = []
+    private var pendingSave: DispatchWorkItem?
+    // The last query and the entries that matched it, all of them, not just those returned
+    private var lastQuery: [UInt8]?
+    private var lastMatchingIndices: [Int] = []
+    // Touched only on the main queue
+    private var queryGeneration = 0
+
+    /// Switches to the index of `root`, starting from the saved copy when there is one.
+    func open(root: URL) {
+        let root = root.standardizedFileURL
+        queue.async {
+            self.flushPendingSave()
+            self.root = root
+            self.entries = Self.readSavedEntries(for: root) ?? []
+            self.lastQuery = nil
+        }
+    }
+
+    /// Makes the index list exactly `files`. Entries for files already indexed are kept unless
+    /// their path is in `changedPaths`; only new or changed files get a new key and date.
+    func update(files: [URL], changedPaths: Set<URL> = []) {
+        queue.async {
+            guard let root = self.root else { return }
+            let rootPath = root.path
+            let changed = Set(changedPaths.map(\.path))
+            var existing: [String: Entry] = [:]
+            existing.reserveCapacity(self.entries.count)
+            for entry in self.entries {
+                existing[entry.path] = entry
+            }
+
+            var updated: [Entry] = []
+            updated.reserveCapacity(files.count)
+            for url in files {
+                let absolutePath = url.standardizedFileURL.path
+                guard absolutePath.hasPrefix(rootPath + "/") else { continue }
+                let path = String(absolutePath.dropFirst(rootPath.count + 1))
+                if let entry = existing[path], !changed.contains(url.path) {
+                    updated.append(entry)
+                    continue
+                }
+                // The tree loader prefetches this value, so it is usually read without a stat
+                let date = (try? url.resourceValues(forKeys: [.contentModificationDateKey]))?.contentModificationDate
+                updated.append(Entry(path: path, key: path.lowercased(), modificationTime: date?.timeIntervalSinceReferenceDate ?? 0))
+            }
+            self.entries = updated
+            self.lastQuery = nil
+            self.scheduleSave()
+        }
+    }
+
+    /// Calls `completion` on the main queue with the `limit` best matches of `query`, best first.
+    /// An empty query lists the most recently modified files. Results of a query overtaken by a
+    /// newer one are dropped.
+    func search(_ query: String, limit: Int, completion: @escaping (URL?, [Match]) -> Void) {
+        queryGeneration += 1
+        let generation = queryGeneration
+        let needle = Array(query.trimmingCharacters(in: .whitespacesAndNewlines).lowercased().utf8)
+        queue.async {
+            let results = self.matches(for: needle, limit: limit)
+            let root = self.root
+            DispatchQueue.main.async {
+                guard generation == self.queryGeneration else { return }
+                completion(root, results)
+            }
+        }
+    }
+
+    private func matches(for needle: [UInt8], limit: Int) -> [Match] {
+        guard !needle.isEmpty else {
+            lastQuery = nil
+            let recent = entries.sorted { $0.modificationTime > $1.modificationTime }
+            return recent.prefix(limit).map { Match(entry: $0, score: 0) }
+        }
+
+        // Every match of a longer query also matches the query it extends
+        let candidates: [Int]
+        if let lastQuery, needle.starts(with: lastQuery) {
+            candidates = lastMatchingIndices
+        } else {
+            candidates = Array(entries.indices)
+        }
+        let mask = FuzzyMatch.characterMask(needle)
+        var scored: [(index: Int, score: Int)] = []
+        for index in candidates where entries[index].mask & mask == mask {
+            let entry = entries[index]
+            if let score = FuzzyMatch.score(needle, text: entry.path, key: entry.key) {
+                scored.append((index, score))
+            }
+        }
+        lastQuery = needle
+        lastMatchingIndices = scored.map(\.index)
+
+        scored.sort { lhs, rhs in
+            if lhs.score != rhs.score {
+                return lhs.score > rhs.score
+            }
+            let left = entries[lhs.index]
+            let right = entries[rhs.index]
+            if left.path.utf8.count != right.path.utf8.count {
+                return left.path.utf8.count < right.path.utf8.count
+            }
+            return left.modificationTime > right.modificationTime
+        }
+        return scored.prefix(limit).map { Match(entry: entries[$0.index], score: $0.score) }
+    }
+
+    private func scheduleSave() {
+        pendingSave?.cancel()
+        let work = DispatchWorkItem { [weak self] in
+            self?.save()
+        }
+        pendingSave = work
+        queue.asyncAfter(deadline: .now() + Self.saveDelay, execute: work)
+    }
+
+    private func flushPendingSave() {
+        guard let pendingSave, !pendingSave.isCancelled else { return }
+        pendingSave.cancel()
+        self.pendingSave = nil
+        save()
+    }
+
+    private func save() {
+        pendingSave = nil
+        guard let root, let url = Self.storageURL(for: root) else { return }
+        // One line per file: modification time, path, key. Paths holding a tab or a newline are
+        // left out rather than escaped.
+        var lines = [Self.formatVersion + "\t" + root.path]
+        lines.reserveCapacity(entries.count + 1)
+        for entry in entries where !entry.path.contains("\t") && !entry.path.contains("\n") {
+            lines.append("\(entry.modificationTime)\t\(entry.path)\t\(entry.key)")
+        }
+        try? FileManager.default.createDirectory(at: url.deletingLastPathComponent(), withIntermediateDirectories: true)
+        try? Data(lines.joined(separator: "\n").utf8).write(to: url, options: .atomic)
+    }
+
+    private static func readSavedEntries(for root: URL) -> [Entry]? {
+        guard let url = storageURL(for: root),
+              let data = try? Data(contentsOf: url, options: .alwaysMapped) else { return nil }
+        let lines = String(decoding: data, as: UTF8.self).split(separator: "\n", omittingEmptySubsequences: true)
+        // A hash collision or an older format reads as no saved index
+        guard let header = lines.first, header == formatVersion + "\t" + root.path else { return nil }
+        var entries: [Entry] = []
+        entries.reserveCapacity(lines.count - 1)
+        for line in lines.dropFirst() {
+            let fields = line.split(separator: "\t", maxSplits: 2, omittingEmptySubsequences: false)
+            guard fields.count == 3 else { continue }
+            entries.append(Entry(path: String(fields[1]), key: String(fields[2]), modificationTime: TimeInterval(fields[0]) ?? 0))
+        }
+        return entries
+    }
+
+    private static func storageURL(for root: URL) -> URL? {
+        guard let caches = FileManager.default.urls(for: .cachesDirectory, in: .userDomainMask).first else { return nil }
+        // FNV-1a, which unlike `hashValue` is the same in every launch
+        var hash: UInt64 = 0xcbf29ce484222325
+        for byte in root.path.utf8 {
+            hash = (hash ^ UInt64(byte)) &* 0x100000001b3
+        }
+        return caches
+            .appendingPathComponent(Bundle.main.bundleIdentifier ?? "NeonVisionEditor", isDirectory: true)
+            .appendingPathComponent("ProjectFileIndex", isDirectory: true)
+            .appendingPathComponent(String(hash, radix: 16) + ".index")
+    }
+}
@@ -0,0 +1,194 @@
+import Foundation
+#if os(macOS)
+import CoreServices
+#elseif os(Linux)
+import Glibc
+#endif
+
+/// Reports files and folders that change under a set of directories, so the project tree and
+/// open tabs can be patched without rescanning. Events are coalesced for `latency` and handed
+/// to the `onChange` closure on the main queue as one set of paths. Backed by FSEvents on macOS
+/// and inotify on Linux; elsewhere nothing is watched.
+nonisolated final class ProjectFileWatcher {
+    /// Events this close together are delivered as one batch.
+    static let latency: TimeInterval = 0.3
+
+    private(set) var directories: [URL] = []
+    private var onChange: ((Set<URL>) -> Void)?
+
+#if os(macOS)
+    private var stream: FSEventStreamRef?
+#elseif os(Linux)
+    private var inotify: InotifyWatch?
+#endif
+
+    deinit {
+        stop()
+    }
+
+    /// Watches `directories` and everything below them, replacing what was watched before.
+    func watch(_ directories: [URL], onChange: @escaping (Set<URL>) -> Void) {
+        self.onChange = onChange
+        guard directories != self.directories else { return }
+        stop()
+        self.directories = directories
+        guard !directories.isEmpty else { return }
+#if os(macOS)
+        startStream()
+#elseif os(Linux)
+        inotify = InotifyWatch(directories: directories) { [weak self] changed in
+            self?.onChange?(changed)
+        }
+#endif
+    }
+
+    func stop() {
+        directories = []
+#if os(macOS)
+        if let stream {
+            FSEventStreamStop(stream)
+            FSEventStreamInvalidate(stream)
+            FSEventStreamRelease(stream)
+            self.stream = nil
+        }
+#elseif os(Linux)
+        inotify?.close()
+        inotify = nil
+#endif
+    }
+
+#if os(macOS)
+    private func startStream() {
+        var context = FSEventStreamContext(
+            version: 0,
+            info: Unmanaged.passUnretained(self).toOpaque(),
+            retain: nil,
+            release: nil,
+            copyDescription: nil
+        )
+        let callback: FSEventStreamCallback = { _, info, _, paths, _, _ in
+            guard let info else { return }
+            let watcher = Unmanaged<ProjectFileWatcher>.fromOpaque(info).takeUnretainedValue()
+            let changed = unsafeBitCast(paths, to: NSArray.self) as? [String] ?? []
+            // Dropped events come through as a directory to rescan; its listing is reloaded like any change
+            watcher.onChange?(Set(changed.map { URL(fileURLWithPath: $0) }))
+        }
+        let flags = FSEventStreamCreateFlags(kFSEventStreamCreateFlagUseCFTypes | kFSEventStreamCreateFlagFileEvents)
+        guard let stream = FSEventStreamCreate(
+            nil,
+            callback,
+            &context,
+            directories.map(\.path) as CFArray,
+            FSEventStreamEventId(kFSEventStreamEventIdSinceNow),
+            Self.latency,
+            flags
+        ) else { return }
+        // The stream stops in deinit, before `self` goes away, so the unretained pointer stays valid
+        FSEventStreamSetDispatchQueue(stream, DispatchQueue.main)
+        FSEventStreamStart(stream)
+        self.stream = stream
+    }
+#endif
+}
+
+#if os(Linux)
+private extension ProjectFileWatcher {
+    /// inotify watches one directory per descriptor, so every directory below the roots gets its
+    /// own watch, and directories created later are added as they appear.
+    final class InotifyWatch {
+        private static let mask = UInt32(IN_CREATE | IN_DELETE | IN_MODIFY | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF)
+
+        private let descriptor: Int32
+        private let queue = DispatchQueue(label: "ProjectFileWatcher.inotify")
+        private let onChange: (Set<URL>) -> Void
+        private var source: DispatchSourceRead?
+        // Touched only on `queue`
+        private var watchedPaths: [Int32: String] = [:]
+        private var pending: Set<URL> = []
+
+        init?(directories: [URL], onChange: @escaping (Set<URL>) -> Void) {
+            descriptor = inotify_init1(Int32(IN_NONBLOCK | IN_CLOEXEC))
+            guard descriptor >= 0 else { return nil }
+            self.onChange = onChange
+            queue.async {
+                for directory in directories {
+                    self.addWatches(under: directory)
+                }
+            }
+            let source = DispatchSource.makeReadSource(fileDescriptor: descriptor, queue: queue)
+            source.setEventHandler { [weak self] in self?.readEvents() }
+            source.setCancelHandler { [descriptor] in _ = Glibc.close(descriptor) }
+            source.resume()
+            self.source = source
+        }
+
+        func close() {
+            source?.cancel()
+            source = nil
+        }
+
+        private func addWatches(under directory: URL) {
+            addWatch(directory.path)
+            guard let enumerator = FileManager.default.enumerator(
+                at: directory,
+                includingPropertiesForKeys: [.isDirectoryKey],
+                options: [.skipsHiddenFiles, .skipsPackageDescendants]
+            ) else { return }
+            for case let url as URL in enumerator {
+                guard (try? url.resourceValues(forKeys: [.isDirectoryKey]))?.isDirectory == true else { continue }
+                if ProjectTreeLoader.ignoredDirectoryNames.contains(url.lastPathComponent) {
+                    enumerator.skipDescendants()
+                    continue
+                }
+                addWatch(url.path)
+            }
+        }
+
+        private func addWatch(_ path: String) {
+            let watch = inotify_add_watch(descriptor, path, Self.mask)
+            if watch >= 0 {
+                watchedPaths[watch] = path
+            }
+        }
+
+        private func readEvents() {
+            var buffer = [UInt8](repeating: 0, count: 64 * 1024)
+            let headerLength = MemoryLayout<inotify_event>.size
+            while true {
+                let count = buffer.withUnsafeMutableBytes { read(descriptor, $0.baseAddress, $0.count) }
+                guard count > 0 else { break }
+                var offset = 0
+                while offset + headerLength <= count {
+                    let event = buffer.withUnsafeBytes { $0.loadUnaligned(fromByteOffset: offset, as: inotify_event.self) }
+                    let nameBytes = buffer[(offset + headerLength)..<(offset + headerLength + Int(event.len))]
+                    let name = String(decoding: nameBytes.prefix { $0 != 0 }, as: UTF8.self)
+                    offset += headerLength + Int(event.len)
+
+                    guard let directory = watchedPaths[event.wd] else { continue }
+                    if event.mask & UInt32(IN_IGNORED) != 0 {
+                        watchedPaths[event.wd] = nil
+                        continue
+                    }
+                    let url = name.isEmpty ? URL(fileURLWithPath: directory) : URL(fileURLWithPath: directory).appendingPathComponent(name)
+                    if event.mask & UInt32(IN_ISDIR) != 0 && event.mask & UInt32(IN_CREATE | IN_MOVED_TO) != 0 {
+                        addWatches(under: url)
+                    }
+                    record(url)
+                }
+            }
+        }
+
+        private func record(_ url: URL) {
+            let isFirst = pending.isEmpty
+            pending.insert(url)
+            guard isFirst else { return }
+            queue.asyncAfter(deadline: .now() + ProjectFileWatcher.latency) { [weak self] in
+                guard let self else { return }
+                let batch = self.pending
+                self.pending.removeAll()
+                DispatchQueue.main.async { self.onChange(batch) }
+            }
+        }
+    }
+}
+#endif
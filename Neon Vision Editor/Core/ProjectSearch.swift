@@ -0,0 +1,236 @@
+import Foundation
+
+/// A line of a project file that matches a find-in-files query.
+struct ProjectSearchMatch: Identifiable {
+    let url: URL
+    /// One-based, as shown next to the match.
+    let lineNumber: Int
+    /// The line with surrounding whitespace trimmed, cut off after `ProjectSearch.previewLength`.
+    let preview: String
+
+    var id: String { "\(url.path):\(lineNumber)" }
+}
+
+/// Searches project files for a find query without opening them as tabs. Files are read
+/// memory-mapped by several workers at once; binary files and files over `maxFileSize` are
+/// skipped. Matches are delivered on the main queue as each file finishes, and starting another
+/// search or calling `cancel()` stops the one in flight.
+final class ProjectSearch {
+    struct Summary {
+        var searchedFileCount = 0
+        var skippedFileCount = 0
+        var matchCount = 0
+        /// Whether the search stopped at `maxMatchCount`.
+        var isTruncated = false
+    }
+
+    static let maxFileSize = 8 * 1024 * 1024
+    static let maxMatchCount = 5_000
+    static let maxMatchesPerFile = 200
+    static let previewLength = 240
+    // A NUL byte this close to the start marks a file as binary
+    private static let sniffLength = 8 * 1024
+
+    private let queue = DispatchQueue(label: "ProjectSearch", qos: .userInitiated)
+    private var current: SearchState?
+
+    /// Searches `files` for `query`. Throws only when a regex pattern does not compile.
+    func start(
+        query: TextMatchIndex.Query,
+        in files: [URL],
+        onMatches: @escaping ([ProjectSearchMatch]) -> Void,
+        onFinish: @escaping (Summary) -> Void
+    ) throws {
+        cancel()
+        let matcher = try Matcher(query: query)
+        let state = SearchState()
+        current = state
+        queue.async {
+            let workerCount = max(1, min(ProcessInfo.processInfo.activeProcessorCount, files.count))
+            DispatchQueue.concurrentPerform(iterations: workerCount) { _ in
+                while let url = state.nextFile(from: files) {
+                    guard let found = Self.matches(in: url, using: matcher) else {
+                        state.recordSkippedFile()
+                        continue
+                    }
+                    let accepted = state.recordSearchedFile(matches: found)
+                    guard !accepted.isEmpty else { continue }
+                    DispatchQueue.main.async {
+                        guard !state.isCancelled else { return }
+                        onMatches(accepted)
+                    }
+                }
+            }
+            let summary = state.summary
+            DispatchQueue.main.async {
+                guard !state.isCancelled else { return }
+                onFinish(summary)
+            }
+        }
+    }
+
+    func cancel() {
+        current?.cancel()
+        current = nil
+    }
+
+    /// Matches in one file, or nil when the file is skipped.
+    nonisolated private static func matches(in url: URL, using matcher: Matcher) -> [ProjectSearchMatch]? {
+        guard let size = try? url.resourceValues(forKeys: [.fileSizeKey]).fileSize,
+              size <= maxFileSize,
+              let data = try? Data(contentsOf: url, options: .alwaysMapped) else { return nil }
+        if data.prefix(sniffLength).contains(0) {
+            return nil
+        }
+        guard matcher.mayMatch(data) else { return [] }
+
+        let text = String(decoding: data, as: UTF8.self) as NSString
+        var results: [ProjectSearchMatch] = []
+        var lineNumber = 1
+        var lineStart = 0
+        var lineEnd = 0
+        var contentsEnd = 0
+        text.getLineStart(nil, end: &lineEnd, contentsEnd: &contentsEnd, for: NSRange(location: 0, length: 0))
+        matcher.enumerateMatches(in: text) { range in
+            // Only the first match on a line is reported
+            guard range.location >= lineEnd || results.isEmpty else { return true }
+            while range.location >= lineEnd && lineEnd < text.length {
+                lineStart = lineEnd
+                lineNumber += 1
+                text.getLineStart(nil, end: &lineEnd, contentsEnd: &contentsEnd, for: NSRange(location: lineStart, length: 0))
+            }
+            let line = text.substring(with: NSRange(location: lineStart, length: contentsEnd - lineStart))
+            let preview = line.trimmingCharacters(in: .whitespaces)
+            results.append(ProjectSearchMatch(url: url, lineNumber: lineNumber, preview: String(preview.prefix(previewLength))))
+            return results.count < maxMatchesPerFile
+        }
+        return results
+    }
+}
+
+private extension ProjectSearch {
+    /// Progress shared by the workers of one search.
+    nonisolated final class SearchState {
+        private let lock = NSLock()
+        private var nextIndex = 0
+        private var cancelled = false
+        private var progress = Summary()
+
+        var isCancelled: Bool {
+            lock.lock()
+            defer { lock.unlock() }
+            return cancelled
+        }
+
+        var summary: Summary {
+            lock.lock()
+            defer { lock.unlock() }
+            return progress
+        }
+
+        func cancel() {
+            lock.lock()
+            cancelled = true
+            lock.unlock()
+        }
+
+        /// The next file to search, or nil once every file is taken or the search is over.
+        func nextFile(from files: [URL]) -> URL? {
+            lock.lock()
+            defer { lock.unlock() }
+            guard !cancelled, !progress.isTruncated, nextIndex < files.count else { return nil }
+            nextIndex += 1
+            return files[nextIndex - 1]
+        }
+
+        func recordSkippedFile() {
+            lock.lock()
+            progress.skippedFileCount += 1
+            lock.unlock()
+        }
+
+        /// Counts a searched file and returns the part of its matches that fits under the cap.
+        func recordSearchedFile(matches: [ProjectSearchMatch]) -> [ProjectSearchMatch] {
+            lock.lock()
+            defer { lock.unlock() }
+            progress.searchedFileCount += 1
+            let room = max(0, ProjectSearch.maxMatchCount - progress.matchCount)
+            if matches.count > room {
+                progress.isTruncated = true
+            }
+            let accepted = Array(matches.prefix(room))
+            progress.matchCount += accepted.count
+            return accepted
+        }
+    }
+
+    /// A compiled query, shared read-only by the workers.
+    nonisolated struct Matcher {
+        let query: TextMatchIndex.Query
+        let expression: NSRegularExpression?
+        // Bytes a literal match must contain, for rejecting files before decoding them
+        private let needle: [UInt8]?
+
+        init(query: TextMatchIndex.Query) throws {
+            self.query = query
+            if query.usesRegex {
+                expression = try NSRegularExpression(pattern: query.pattern, options: query.caseSensitive ? [] : [.caseInsensitive])
+                needle = nil
+            } else {
+                expression = nil
+                // Case-insensitive matching folds more than ASCII, so only ASCII patterns prefilter then
+                let bytes = Array(query.pattern.utf8)
+                needle = query.caseSensitive || bytes.allSatisfy({ $0 < 0x80 }) ? bytes : nil
+            }
+        }
+
+        /// False when `data` cannot contain a match.
+        func mayMatch(_ data: Data) -> Bool {
+            guard let needle, !needle.isEmpty else { return true }
+            if query.caseSensitive {
+                return data.range(of: Data(needle)) != nil
+            }
+            let folded = needle.map(Self.lowercased)
+            return data.withUnsafeBytes { (buffer: UnsafeRawBufferPointer) -> Bool in
+                guard buffer.count >= folded.count else { return false }
+                var index = 0
+                let last = buffer.count - folded.count
+                while index <= last {
+                    var offset = 0
+                    while offset < folded.count && Self.lowercased(buffer[index + offset]) == folded[offset] {
+                        offset += 1
+                    }
+                    if offset == folded.count {
+                        return true
+                    }
+                    index += 1
+                }
+                return false
+            }
+        }
+
+        /// Calls `body` with each match in order until it returns false.
+        func enumerateMatches(in text: NSString, _ body: (NSRange) -> Bool) {
+            let whole = NSRange(location: 0, length: text.length)
+            if let expression {
+                expression.enumerateMatches(in: text as String, range: whole) { result, _, stop in
+                    if let range = result?.range, !body(range) {
+                        stop.pointee = true
+                    }
+                }
+                return
+            }
+            let options: NSString.CompareOptions = query.caseSensitive ? [] : [.caseInsensitive]
+            var position = 0
+            while position < text.length {
+                let found = text.range(of: query.pattern, options: options, range: NSRange(location: position, length: text.length - position))
+                guard found.location != NSNotFound, body(found) else { return }
+                position = NSMaxRange(found)
+            }
+        }
+
+        private static func lowercased(_ byte: UInt8) -> UInt8 {
+            byte >= 0x41 && byte <= 0x5A ? byte | 0x20 : byte
+        }
+    }
+}
@@ -0,0 +1,212 @@
+import Foundation
+
+struct ProjectTreeNode: Identifiable {
+    let url: URL
+    let isDirectory: Bool
+    /// Nil until the directory has been listed; always empty for files.
+    var children: [ProjectTreeNode]?
+    var id: String { url.path }
+}
+
+/// Lists a project folder one directory at a time, off the main thread. Only the root is listed
+/// when a folder opens; a directory is listed when it is expanded, and its subdirectories are
+/// listed ahead in the background so expanding them next is immediate. Hidden files, packages
+/// and dependency or build directories are left out.
+final class ProjectTreeLoader {
+    /// Directories holding dependencies or build output; they are neither listed nor searched.
+    static let ignoredDirectoryNames: Set<String> = ["node_modules", ".build", "DerivedData", "Pods", "__pycache__"]
+    /// Quick Open and Find in Project stop collecting files past this many.
+    static let maxFileListCount = 100_000
+
+    private let queue = DispatchQueue(label: "ProjectTreeLoader", qos: .userInitiated, attributes: .concurrent)
+    private let prefetchQueue = DispatchQueue(label: "ProjectTreeLoader.prefetch", qos: .utility, attributes: .concurrent)
+    // Serial, so file list updates apply in the order the changes happened
+    private let fileListQueue = DispatchQueue(label: "ProjectTreeLoader.files", qos: .utility)
+    // Replaced on reset, so listings still in flight land in a cache nobody reads
+    private var cache = ListingCache()
+
+    /// Forgets every listing, for a new root folder or a refresh.
+    func reset() {
+        cache = ListingCache()
+    }
+
+    /// Calls `completion` on the main queue with the sorted contents of `directory`, then lists
+    /// its subdirectories ahead of time.
+    func loadChildren(of directory: URL, completion: @escaping ([ProjectTreeNode]) -> Void) {
+        let cache = self.cache
+        if let listing = cache.listing(for: directory) {
+            completion(listing)
+            prefetchChildren(of: listing, into: cache)
+            return
+        }
+        queue.async {
+            let listing = Self.listDirectory(directory)
+            cache.store(listing, for: directory)
+            DispatchQueue.main.async { [weak self] in
+                guard let self, cache === self.cache else { return }
+                completion(listing)
+                self.prefetchChildren(of: listing, into: cache)
+            }
+        }
+    }
+
+    /// Calls `completion` on the main queue with every file under `root` that the tree would
+    /// show, in no particular order.
+    func loadFileList(under root: URL, completion: @escaping ([URL]) -> Void) {
+        let cache = self.cache
+        fileListQueue.async {
+            let files = Self.listFiles(under: root)
+            cache.files = files
+            DispatchQueue.main.async { [weak self] in
+                guard let self, cache === self.cache else { return }
+                completion(files)
+            }
+        }
+    }
+
+    /// Lists `directories` again after they changed on disk and calls `completion` on the main
+    /// queue with the new listings by path.
+    func reloadChildren(of directories: [URL], completion: @escaping ([String: [ProjectTreeNode]]) -> Void) {
+        let cache = self.cache
+        queue.async {
+            var listings: [String: [ProjectTreeNode]] = [:]
+            for directory in directories {
+                let listing = Self.listDirectory(directory)
+                cache.store(listing, for: directory)
+                listings[directory.path] = listing
+            }
+            DispatchQueue.main.async { [weak self] in
+                guard let self, cache === self.cache else { return }
+                completion(listings)
+            }
+        }
+    }
+
+    /// Updates the file list from `loadFileList(under:completion:)` for paths that changed under
+    /// `root` and calls `completion` on the main queue with the result. Only the changed paths
+    /// are looked at, and only new folders are walked.
+    func updateFileList(under root: URL, changedPaths: Set<URL>, completion: @escaping ([URL]) -> Void) {
+        let cache = self.cache
+        fileListQueue.async {
+            let files = Self.applying(changedPaths, to: cache.files, under: root)
+            cache.files = files
+            DispatchQueue.main.async { [weak self] in
+                guard let self, cache === self.cache else { return }
+                completion(files)
+            }
+        }
+    }
+
+    private func prefetchChildren(of listing: [ProjectTreeNode], into cache: ListingCache) {
+        let directories = listing.filter { $0.isDirectory && cache.listing(for: $0.url) == nil }.map(\.url)
+        guard !directories.isEmpty else { return }
+        prefetchQueue.async {
+            DispatchQueue.concurrentPerform(iterations: directories.count) { index in
+                let directory = directories[index]
+                guard cache.listing(for: directory) == nil else { return }
+                cache.store(Self.listDirectory(directory), for: directory)
+            }
+        }
+    }
+
+    nonisolated private static func listDirectory(_ directory: URL) -> [ProjectTreeNode] {
+        guard let urls = try? FileManager.default.contentsOfDirectory(
+            at: directory,
+            includingPropertiesForKeys: [.isDirectoryKey],
+            options: [.skipsHiddenFiles, .skipsPackageDescendants, .skipsSubdirectoryDescendants]
+        ) else { return [] }
+
+        // Names are taken once up front rather than on every comparison
+        var entries: [(name: String, node: ProjectTreeNode)] = []
+        entries.reserveCapacity(urls.count)
+        for url in urls {
+            let name = url.lastPathComponent
+            let isDirectory = (try? url.resourceValues(forKeys: [.isDirectoryKey]))?.isDirectory == true
+            if isDirectory && ignoredDirectoryNames.contains(name) { continue }
+            entries.append((name, ProjectTreeNode(url: url, isDirectory: isDirectory, children: isDirectory ? nil : [])))
+        }
+        entries.sort { $0.name.localizedCaseInsensitiveCompare($1.name) == .orderedAscending }
+        return entries.map(\.node)
+    }
+
+    nonisolated private static func applying(_ changedPaths: Set<URL>, to files: [URL], under root: URL) -> [URL] {
+        let rootPath = root.path
+        var changed: Set<String> = []
+        var added: [URL] = []
+        for url in changedPaths {
+            let path = url.path
+            guard path.hasPrefix(rootPath + "/") else { continue }
+            let components = path.dropFirst(rootPath.count + 1).split(separator: "/")
+            if components.contains(where: { $0.hasPrefix(".") || ignoredDirectoryNames.contains(String($0)) }) {
+                continue
+            }
+            // Dropped below, then added back if it is still there
+            changed.insert(path)
+            var isDirectory: ObjCBool = false
+            guard FileManager.default.fileExists(atPath: path, isDirectory: &isDirectory) else { continue }
+            added += isDirectory.boolValue ? listFiles(under: url) : [url]
+        }
+        guard !changed.isEmpty else { return files }
+
+        // A file goes when it or a folder above it changed
+        var kept = files.filter { file in
+            var path = file.path
+            while path.utf8.count > rootPath.utf8.count {
+                if changed.contains(path) {
+                    return false
+                }
+                path = (path as NSString).deletingLastPathComponent
+            }
+            return true
+        }
+        var seen = Set(kept.map(\.path))
+        for url in added where seen.insert(url.path).inserted {
+            kept.append(url)
+        }
+        return Array(kept.prefix(maxFileListCount))
+    }
+
+    nonisolated private static func listFiles(under root: URL) -> [URL] {
+        guard let enumerator = FileManager.default.enumerator(
+            at: root,
+            // Modification dates are fetched in the same pass for the Quick Open index
+            includingPropertiesForKeys: [.isDirectoryKey, .contentModificationDateKey],
+            options: [.skipsHiddenFiles, .skipsPackageDescendants]
+        ) else { return [] }
+
+        var files: [URL] = []
+        for case let url as URL in enumerator {
+            if (try? url.resourceValues(forKeys: [.isDirectoryKey]))?.isDirectory == true {
+                if ignoredDirectoryNames.contains(url.lastPathComponent) {
+                    enumerator.skipDescendants()
+                }
+                continue
+            }
+            files.append(url)
+            if files.count >= maxFileListCount { break }
+        }
+        return files
+    }
+}
+
+private extension ProjectTreeLoader {
+    /// Directory listings by path, filled from several queues.
+    nonisolated final class ListingCache {
+        private let lock = NSLock()
+        private var listings: [String: [ProjectTreeNode]] = [:]
+        // Touched only on `fileListQueue`
+        var files: [URL] = []
+
+        func listing(for directory: URL) -> [ProjectTreeNode]? {
+            lock.lock()
+            defer { lock.unlock() }
+            return listings[directory.path]
+        }
+
+        func store(_ listing: [ProjectTreeNode], for directory: URL) {
+            lock.lock()
+            listings[directory.path] = listing
+            lock.unlock()
+        }
+    }
+}
@@ -1,7 +1,64 @@
-import SwiftUI
 import Foundation
+#if canImport(SwiftUI)
+import SwiftUI
+#endif
+#if os(macOS)
+import AppKit
+#elseif canImport(UIKit)
+import UIKit
+#endif
+
+// Token categories a syntax rule can produce. Raw values index resolved color tables.
+enum SyntaxTokenKind: UInt8, CaseIterable {
+    case keyword
+    case string
+    case number
+    case comment
+    case attribute
+    case variable
+    case def
+    case property
+    case meta
+    case tag
+    case atom
+    case builtin
+    case type
+}
+
+// Scan priority when several rules could match at the same position; lower wins.
+// Comments and strings come first so keywords are never colored inside them.
+enum SyntaxRulePriority: Int, Comparable {
+    case comment = 0
+    case string = 1
+    case token = 2
+
+    static func < (lhs: SyntaxRulePriority, rhs: SyntaxRulePriority) -> Bool {
+        lhs.rawValue < rhs.rawValue
+    }
+}
+
+struct SyntaxRule {
+    let pattern: String
+    let kind: SyntaxTokenKind
+    let priority: SyntaxRulePriority
+
+    init(_ pattern: String, _ kind: SyntaxTokenKind, priority: SyntaxRulePriority? = nil) {
+        self.pattern = pattern
+        self.kind = kind
+        self.priority = priority ?? {
+            switch kind {
+            case .comment: return .comment
+            case .string: return .string
+            default: return .token
+            }
+        }()
+    }
+}
 
-struct SyntaxColors {
+// Theme colors live with the UI; the rest of this file is Foundation-only so the
+// benchmark package can build it on Linux.
+#if canImport(SwiftUI)
+struct SyntaxColors: Hashable {
     let keyword: Color
     let string: Color
     let number: Color
@@ -49,336 +106,748 @@ struct SyntaxColors {
             type: colorScheme == .dark ? baseColors["type"]!.dark : baseColors["type"]!.light
         )
     }
+
+    func color(for kind: SyntaxTokenKind) -> Color {
+        switch kind {
+        case .keyword: return keyword
+        case .string: return string
+        case .number: return number
+        case .comment: return comment
+        case .attribute: return attribute
+        case .variable: return variable
+        case .def: return def
+        case .property: return property
+        case .meta: return meta
+        case .tag: return tag
+        case .atom: return atom
+        case .builtin: return builtin
+        case .type: return type
+        }
+    }
 }
+#endif
 
-// Regex patterns per language mapped to colors. Keep light-weight for performance.
-func getSyntaxPatterns(for language: String, colors: SyntaxColors) -> [String: Color] {
+// Regex patterns per language tagged with the token kind they color. Keep light-weight for performance.
+// Compile through `SyntaxGrammarCache` rather than building regexes from these directly.
+func syntaxRules(for language: String) -> [SyntaxRule] {
     switch language {
     case "swift":
         return [
             // Keywords (extended to include `import`)
-            "\\b(func|struct|class|enum|protocol|extension|if|else|for|while|switch|case|default|guard|defer|throw|try|catch|return|init|deinit|import)\\b": colors.keyword,
+            SyntaxRule("\\b(func|struct|class|enum|protocol|extension|if|else|for|while|switch|case|default|guard|defer|throw|try|catch|return|init|deinit|import)\\b", .keyword),
 
             // Strings and Characters
-            "\"[^\"]*\"": colors.string,
-            "'[^'\\](?:\\.[^'\\])*'": colors.string,
+            SyntaxRule("\"[^\"]*\"", .string),
+            SyntaxRule("'[^'\\](?:\\.[^'\\])*'", .string),
 
             // Numbers
-            "\\b([0-9]+(\\.[0-9]+)?)\\b": colors.number,
+            SyntaxRule("\\b([0-9]+(\\.[0-9]+)?)\\b", .number),
+
+            // Marks / TODO / FIXME (ahead of plain line comments so they keep their own color)
+            SyntaxRule("(?m)//\\s*(MARK|TODO|FIXME)\\s*:.*$", .meta, priority: .comment),
 
             // Comments (single and multi-line)
-            "//.*": colors.comment,
-            "/\\*([^*]|(\\*+[^*/]))*\\*+/": colors.comment,
+            SyntaxRule("//.*", .comment),
+            SyntaxRule("/\\*([^*]|(\\*+[^*/]))*\\*+/", .comment),
 
             // Documentation markup (triple slash and doc blocks)
-            "(?m)^(///).*$": colors.comment,
-            "/\\*\\*([\\s\\S]*?)\\*+/": colors.comment,
+            SyntaxRule("(?m)^(///).*$", .comment),
+            SyntaxRule("/\\*\\*([\\s\\S]*?)\\*+/", .comment),
             // Documentation keywords inside docs (e.g., - Parameter:, - Returns:)
-            "(?m)\\-\\s*(Parameter|Parameters|Returns|Throws|Note|Warning|See\\salso)\\s*:": colors.meta,
-
-            // Marks / TODO / FIXME
-            "(?m)//\\s*(MARK|TODO|FIXME)\\s*:.*$": colors.meta,
+            SyntaxRule("(?m)\\-\\s*(Parameter|Parameters|Returns|Throws|Note|Warning|See\\salso)\\s*:", .meta),
 
             // URLs
-            "https?://[A-Za-z0-9._~:/?#@!$&'()*+,;=%-]+": colors.atom,
-            "file://[A-Za-z0-9._~:/?#@!$&'()*+,;=%-]+": colors.atom,
+            SyntaxRule("https?://[A-Za-z0-9._~:/?#@!$&'()*+,;=%-]+", .atom),
+            SyntaxRule("file://[A-Za-z0-9._~:/?#@!$&'()*+,;=%-]+", .atom),
 
             // Preprocessor statements (conditionals and directives)
-            "(?m)^#(if|elseif|else|endif|warning|error|available)\\b.*$": colors.keyword,
+            SyntaxRule("(?m)^#(if|elseif|else|endif|warning|error|available)\\b.*$", .keyword),
 
             // Attributes like @available, @MainActor, etc.
-            "@\\w+": colors.attribute,
+            SyntaxRule("@\\w+", .attribute),
 
             // Variable declarations
-            "\\b(var|let)\\b": colors.variable,
+            SyntaxRule("\\b(var|let)\\b", .variable),
 
             // Common Swift types
-            "\\b(String|Int|Double|Bool)\\b": colors.type,
+            SyntaxRule("\\b(String|Int|Double|Bool)\\b", .type),
 
             // Regex literals and components (Swift /…/)
-            "/[^/\\n]*/": colors.builtin, // whole regex literal
-            "\\(\\?<([A-Za-z_][A-Za-z0-9_]*)>": colors.def, // named capture start (?<name>
-            "\\[[^\\]]*\\]": colors.property, // character classes
-            "[|*+?]": colors.meta, // regex operators
+            SyntaxRule("/[^/\\n]*/", .builtin), // whole regex literal
+            SyntaxRule("\\(\\?<([A-Za-z_][A-Za-z0-9_]*)>", .def), // named capture start (?<name>
+            SyntaxRule("\\[[^\\]]*\\]", .property), // character classes
+            SyntaxRule("[|*+?]", .meta), // regex operators
 
             // Common SwiftUI property names like `body`
-            "\\bbody\\b": colors.property,
+            SyntaxRule("\\bbody\\b", .property),
             // Project-specific identifier you mentioned: `viewModel`
-            "\\bviewModel\\b": colors.property
+            SyntaxRule("\\bviewModel\\b", .property)
         ]
     case "python":
         return [
-            "\\b(def|class|if|else|for|while|try|except|with|as|import|from)\\b": colors.keyword,
-            "\\b(int|str|float|bool|list|dict)\\b": colors.type,
-            "\"[^\"]*\"|'[^']*'": colors.string,
-            "\\b([0-9]+(\\.[0-9]+)?)\\b": colors.number,
-            "#.*": colors.comment
+            SyntaxRule("\\b(def|class|if|else|for|while|try|except|with|as|import|from)\\b", .keyword),
+            SyntaxRule("\\b(int|str|float|bool|list|dict)\\b", .type),
+            SyntaxRule("\"[^\"]*\"|'[^']*'", .string),
+            SyntaxRule("\\b([0-9]+(\\.[0-9]+)?)\\b", .number),
+            SyntaxRule("#.*", .comment)
         ]
     case "javascript":
         return [
-            "\\b(function|var|let|const|if|else|for|while|do|try|catch)\\b": colors.keyword,
-            "\\b(Number|String|Boolean|Object|Array)\\b": colors.type,
-            "\"[^\"]*\"|'[^']*'|\\`[^\\`]*\\`": colors.string,
-            "\\b([0-9]+(\\.[0-9]+)?)\\b": colors.number,
-            "//.*|/\\*([^*]|(\\*+[^*/]))*\\*+/": colors.comment
+            SyntaxRule("\\b(function|var|let|const|if|else|for|while|do|try|catch)\\b", .keyword),
+            SyntaxRule("\\b(Number|String|Boolean|Object|Array)\\b", .type),
+            SyntaxRule("\"[^\"]*\"|'[^']*'|\\`[^\\`]*\\`", .string),
+            SyntaxRule("\\b([0-9]+(\\.[0-9]+)?)\\b", .number),
+            SyntaxRule("//.*|/\\*([^*]|(\\*+[^*/]))*\\*+/", .comment)
         ]
     case "php":
         return [
-            #"\b(function|class|interface|trait|namespace|use|public|private|protected|static|final|abstract|if|else|elseif|for|foreach|while|do|switch|case|default|return|try|catch|throw|new|echo)\b"#: colors.keyword,
-            #"\$[A-Za-z_][A-Za-z0-9_]*|\$\{[^}]+\}"#: colors.variable,
-            #"\"[^\"]*\"|'[^']*'"#: colors.string,
-            #"\b([0-9]+(\.[0-9]+)?)\b"#: colors.number,
-            #"//.*|#.*|/\*([^*]|(\*+[^*/]))*\*+/"#: colors.comment,
-            #"<\?php|\?>"#: colors.meta
+            SyntaxRule(#"\b(function|class|interface|trait|namespace|use|public|private|protected|static|final|abstract|if|else|elseif|for|foreach|while|do|switch|case|default|return|try|catch|throw|new|echo)\b"#, .keyword),
+            SyntaxRule(#"\$[A-Za-z_][A-Za-z0-9_]*|\$\{[^}]+\}"#, .variable),
+            SyntaxRule(#"\"[^\"]*\"|'[^']*'"#, .string),
+            SyntaxRule(#"\b([0-9]+(\.[0-9]+)?)\b"#, .number),
+            SyntaxRule(#"//.*|#.*|/\*([^*]|(\*+[^*/]))*\*+/"#, .comment),
+            SyntaxRule(#"<\?php|\?>"#, .meta)
         ]
     case "html":
-        return ["<[^>]+>": colors.tag]
+        return [SyntaxRule("<[^>]+>", .tag)]
     case "css":
-        return ["\\b([a-zA-Z-]+\\s*:\\s*[^;]+;)": colors.property]
+        return [SyntaxRule("\\b([a-zA-Z-]+\\s*:\\s*[^;]+;)", .property)]
     case "c", "cpp":
         return [
-            "\\b(int|float|double|char|void|if|else|for|while|do|switch|case|return)\\b": colors.keyword,
-            "\\b(int|float|double|char)\\b": colors.type,
-            "\"[^\"]*\"": colors.string,
-            "\\b([0-9]+(\\.[0-9]+)?)\\b": colors.number,
-            "//.*|/\\*([^*]|(\\*+[^*/]))*\\*+/": colors.comment
+            SyntaxRule("\\b(int|float|double|char|void|if|else|for|while|do|switch|case|return)\\b", .keyword),
+            SyntaxRule("\\b(int|float|double|char)\\b", .type),
+            SyntaxRule("\"[^\"]*\"", .string),
+            SyntaxRule("\\b([0-9]+(\\.[0-9]+)?)\\b", .number),
+            SyntaxRule("//.*|/\\*([^*]|(\\*+[^*/]))*\\*+/", .comment)
         ]
     case "json":
         return [
-            #"\"[^\"]+\"\s*:"#: colors.property,
-            #"\"([^\"\\]|\\.)*\""#: colors.string,
-            #"\b(-?[0-9]+(\.[0-9]+)?([eE][+-]?[0-9]+)?)\b"#: colors.number,
-            #"\b(true|false|null)\b"#: colors.keyword,
-            #"[{}\[\],:]"#: colors.meta
+            // Keys (in the string tier and ahead of the string rule, so they keep their own color)
+            SyntaxRule(#"\"[^\"]+\"\s*:"#, .property, priority: .string),
+            SyntaxRule(#"\"([^\"\\]|\\.)*\""#, .string),
+            SyntaxRule(#"\b(-?[0-9]+(\.[0-9]+)?([eE][+-]?[0-9]+)?)\b"#, .number),
+            SyntaxRule(#"\b(true|false|null)\b"#, .keyword),
+            SyntaxRule(#"[{}\[\],:]"#, .meta)
         ]
     case "markdown":
         return [
-            "^#{1,6}\\s+.+$": colors.keyword,
-            "\\*\\*[^*\\n]+\\*\\*": colors.def,
-            "(?<!_)_[^_\\n]+_(?!_)": colors.def
+            SyntaxRule("^#{1,6}\\s+.+$", .keyword),
+            SyntaxRule("\\*\\*[^*\\n]+\\*\\*", .def),
+            SyntaxRule("(?<!_)_[^_\\n]+_(?!_)", .def)
         ]
     case "bash":
         return [
             // Keywords and flow control
-            #"\b(if|then|else|elif|fi|for|while|do|done|case|esac|function|in|select|until|time)\b"#: colors.keyword,
+            SyntaxRule(#"\b(if|then|else|elif|fi|for|while|do|done|case|esac|function|in|select|until|time)\b"#, .keyword),
             // Variables and parameter expansions
-            #"\$[A-Za-z_][A-Za-z0-9_]*|\${[^}]+}"#: colors.variable,
+            SyntaxRule(#"\$[A-Za-z_][A-Za-z0-9_]*|\${[^}]+}"#, .variable),
             // Command substitution and arithmetic
-            #"\$\([^)]*\)|`[^`]*`|\$\(\([^)]*\)\)"#: colors.builtin,
+            SyntaxRule(#"\$\([^)]*\)|`[^`]*`|\$\(\([^)]*\)\)"#, .builtin),
             // Strings
-            #"\"[^\"]*\"|'[^']*'"#: colors.string,
+            SyntaxRule(#"\"[^\"]*\"|'[^']*'"#, .string),
             // Numbers
-            #"\b[0-9]+\b"#: colors.number,
+            SyntaxRule(#"\b[0-9]+\b"#, .number),
             // Comments
-            #"#.*"#: colors.comment,
+            SyntaxRule(#"#.*"#, .comment),
             // Here-doc markers and redirections/pipes
-            #"<<-?\s*[A-Za-z_][A-Za-z0-9_]*"#: colors.meta,
-            #"\|\||\|\s|>>?|<<?|2>\&1|2>>?"#: colors.meta
+            SyntaxRule(#"<<-?\s*[A-Za-z_][A-Za-z0-9_]*"#, .meta),
+            SyntaxRule(#"\|\||\|\s|>>?|<<?|2>\&1|2>>?"#, .meta)
         ]
     case "zsh":
         return [
-            "\\b(if|then|else|elif|fi|for|while|do|done|case|esac|function|in|autoload|typeset|setopt|unsetopt)\\b": colors.keyword,
-            "\\$[A-Za-z_][A-Za-z0-9_]*|\\${[^}]+}": colors.variable,
-            "\\b[0-9]+\\b": colors.number,
-            "\\\"[^\\\"]*\\\"|'[^']*'": colors.string,
-            "#.*": colors.comment
+            SyntaxRule("\\b(if|then|else|elif|fi|for|while|do|done|case|esac|function|in|autoload|typeset|setopt|unsetopt)\\b", .keyword),
+            SyntaxRule("\\$[A-Za-z_][A-Za-z0-9_]*|\\${[^}]+}", .variable),
+            SyntaxRule("\\b[0-9]+\\b", .number),
+            SyntaxRule("\\\"[^\\\"]*\\\"|'[^']*'", .string),
+            SyntaxRule("#.*", .comment)
         ]
     case "powershell":
         return [
             // Keywords and statements
-            #"\b(function|param|if|else|elseif|foreach|for|while|switch|break|continue|return|try|catch|finally)\b"#: colors.keyword,
+            SyntaxRule(#"\b(function|param|if|else|elseif|foreach|for|while|switch|break|continue|return|try|catch|finally)\b"#, .keyword),
             // Cmdlets (Get-*, Set-*, Write-*, etc.)
-            #"\b(Get|Set|New|Remove|Add|Clear|Write|Read|Start|Stop|Enable|Disable|Invoke|Test|Out|Select|Where|ForEach)-[A-Za-z][A-Za-z0-9]*\b"#: colors.builtin,
+            SyntaxRule(#"\b(Get|Set|New|Remove|Add|Clear|Write|Read|Start|Stop|Enable|Disable|Invoke|Test|Out|Select|Where|ForEach)-[A-Za-z][A-Za-z0-9]*\b"#, .builtin),
             // Variables
-            #"\$[A-Za-z_][A-Za-z0-9_:]*"#: colors.variable,
+            SyntaxRule(#"\$[A-Za-z_][A-Za-z0-9_:]*"#, .variable),
             // Strings (single, double)
-            #"\"[^\"]*\"|'[^']*'"#: colors.string,
+            SyntaxRule(#"\"[^\"]*\"|'[^']*'"#, .string),
             // Numbers
-            #"\b([0-9]+(\.[0-9]+)?)\b"#: colors.number,
+            SyntaxRule(#"\b([0-9]+(\.[0-9]+)?)\b"#, .number),
             // Comments
-            #"#.*"#: colors.comment
+            SyntaxRule(#"#.*"#, .comment)
         ]
     case "java":
         return [
-            #"\b(class|interface|enum|public|private|protected|static|final|void|int|double|float|boolean|new|return|if|else|for|while|switch|case)\b"#: colors.keyword,
-            #"\"[^\"]*\""#: colors.string,
-            #"//.*|/\*([^*]|(\*+[^*/]))*\*+/"#: colors.comment,
-            #"\b([0-9]+(\.[0-9]+)?)\b"#: colors.number
+            SyntaxRule(#"\b(class|interface|enum|public|private|protected|static|final|void|int|double|float|boolean|new|return|if|else|for|while|switch|case)\b"#, .keyword),
+            SyntaxRule(#"\"[^\"]*\""#, .string),
+            SyntaxRule(#"//.*|/\*([^*]|(\*+[^*/]))*\*+/"#, .comment),
+            SyntaxRule(#"\b([0-9]+(\.[0-9]+)?)\b"#, .number)
         ]
     case "kotlin":
         return [
-            #"\b(class|object|fun|val|var|when|if|else|for|while|return|import|package|interface)\b"#: colors.keyword,
-            #"\"[^\"]*\"|`[^`]*`"#: colors.string,
-            #"//.*|/\*([^*]|(\*+[^*/]))*\*+/"#: colors.comment,
-            #"\b([0-9]+(\.[0-9]+)?)\b"#: colors.number
+            SyntaxRule(#"\b(class|object|fun|val|var|when|if|else|for|while|return|import|package|interface)\b"#, .keyword),
+            SyntaxRule(#"\"[^\"]*\"|`[^`]*`"#, .string),
+            SyntaxRule(#"//.*|/\*([^*]|(\*+[^*/]))*\*+/"#, .comment),
+            SyntaxRule(#"\b([0-9]+(\.[0-9]+)?)\b"#, .number)
         ]
     case "go":
         return [
-            #"\b(package|import|func|var|const|type|struct|interface|if|else|for|switch|case|return|go|defer)\b"#: colors.keyword,
-            #"\"[^\"]*\"|`[^`]*`"#: colors.string,
-            #"//.*|/\*([^*]|(\*+[^*/]))*\*+/"#: colors.comment,
-            #"\b([0-9]+(\.[0-9]+)?)\b"#: colors.number
+            SyntaxRule(#"\b(package|import|func|var|const|type|struct|interface|if|else|for|switch|case|return|go|defer)\b"#, .keyword),
+            SyntaxRule(#"\"[^\"]*\"|`[^`]*`"#, .string),
+            SyntaxRule(#"//.*|/\*([^*]|(\*+[^*/]))*\*+/"#, .comment),
+            SyntaxRule(#"\b([0-9]+(\.[0-9]+)?)\b"#, .number)
         ]
     case "ruby":
         return [
-            #"\b(def|class|module|if|else|elsif|end|do|while|until|case|when|begin|rescue|ensure|return)\b"#: colors.keyword,
-            #"\"[^\"]*\"|'[^']*'"#: colors.string,
-            #"#.*"#: colors.comment,
-            #"\b([0-9]+(\.[0-9]+)?)\b"#: colors.number
+            SyntaxRule(#"\b(def|class|module|if|else|elsif|end|do|while|until|case|when|begin|rescue|ensure|return)\b"#, .keyword),
+            SyntaxRule(#"\"[^\"]*\"|'[^']*'"#, .string),
+            SyntaxRule(#"#.*"#, .comment),
+            SyntaxRule(#"\b([0-9]+(\.[0-9]+)?)\b"#, .number)
         ]
     case "rust":
         return [
-            #"\b(fn|let|mut|struct|enum|impl|trait|pub|use|mod|if|else|match|loop|while|for|return)\b"#: colors.keyword,
-            #"\"[^\"]*\""#: colors.string,
-            #"//.*|/\*([^*]|(\*+[^*/]))*\*+/"#: colors.comment,
-            #"\b([0-9]+(\.[0-9]+)?)\b"#: colors.number
+            SyntaxRule(#"\b(fn|let|mut|struct|enum|impl|trait|pub|use|mod|if|else|match|loop|while|for|return)\b"#, .keyword),
+            SyntaxRule(#"\"[^\"]*\""#, .string),
+            SyntaxRule(#"//.*|/\*([^*]|(\*+[^*/]))*\*+/"#, .comment),
+            SyntaxRule(#"\b([0-9]+(\.[0-9]+)?)\b"#, .number)
         ]
     case "typescript":
         return [
-            #"\b(function|class|interface|type|enum|const|let|var|if|else|for|while|do|try|catch|return|extends|implements)\b"#: colors.keyword,
-            #"\"[^\"]*\"|'[^']*'|`[^`]*`"#: colors.string,
-            #"//.*|/\*([^*]|(\*+[^*/]))*\*+/"#: colors.comment,
-            #"\b([0-9]+(\.[0-9]+)?)\b"#: colors.number
+            SyntaxRule(#"\b(function|class|interface|type|enum|const|let|var|if|else|for|while|do|try|catch|return|extends|implements)\b"#, .keyword),
+            SyntaxRule(#"\"[^\"]*\"|'[^']*'|`[^`]*`"#, .string),
+            SyntaxRule(#"//.*|/\*([^*]|(\*+[^*/]))*\*+/"#, .comment),
+            SyntaxRule(#"\b([0-9]+(\.[0-9]+)?)\b"#, .number)
         ]
     case "objective-c":
         return [
-            #"@\w+"#: colors.attribute,
-            #"\b(if|else|for|while|switch|case|return)\b"#: colors.keyword,
-            #"\"[^\"]*\""#: colors.string,
-            #"//.*|/\*([^*]|(\*+[^*/]))*\*+/"#: colors.comment,
-            #"\b([0-9]+(\.[0-9]+)?)\b"#: colors.number
+            SyntaxRule(#"@\w+"#, .attribute),
+            SyntaxRule(#"\b(if|else|for|while|switch|case|return)\b"#, .keyword),
+            SyntaxRule(#"\"[^\"]*\""#, .string),
+            SyntaxRule(#"//.*|/\*([^*]|(\*+[^*/]))*\*+/"#, .comment),
+            SyntaxRule(#"\b([0-9]+(\.[0-9]+)?)\b"#, .number)
         ]
     case "sql":
         return [
-            #"\b(SELECT|INSERT|UPDATE|DELETE|CREATE|TABLE|FROM|WHERE|JOIN|LEFT|RIGHT|INNER|OUTER|GROUP|BY|ORDER|LIMIT|VALUES|INTO)\b"#: colors.keyword,
-            #"'[^']*'|\"[^\"]*\""#: colors.string,
-            #"--.*"#: colors.comment,
-            #"\b([0-9]+(\.[0-9]+)?)\b"#: colors.number
+            SyntaxRule(#"\b(SELECT|INSERT|UPDATE|DELETE|CREATE|TABLE|FROM|WHERE|JOIN|LEFT|RIGHT|INNER|OUTER|GROUP|BY|ORDER|LIMIT|VALUES|INTO)\b"#, .keyword),
+            SyntaxRule(#"'[^']*'|\"[^\"]*\""#, .string),
+            SyntaxRule(#"--.*"#, .comment),
+            SyntaxRule(#"\b([0-9]+(\.[0-9]+)?)\b"#, .number)
         ]
     case "xml":
         return [
-            #"<[^>]+>"#: colors.tag,
-            #"\"[^\"]*\""#: colors.string
+            SyntaxRule(#"<[^>]+>"#, .tag),
+            SyntaxRule(#"\"[^\"]*\""#, .string)
         ]
     case "yaml":
         return [
-            #"^\s*-[\s\S]*$"#: colors.keyword,
-            #"\b(true|false|null)\b"#: colors.keyword,
-            #"\b[0-9]+\b"#: colors.number
+            SyntaxRule(#"^\s*-.*$"#, .keyword),
+            SyntaxRule(#"\b(true|false|null)\b"#, .keyword),
+            SyntaxRule(#"\b[0-9]+\b"#, .number)
         ]
     case "toml":
         return [
-            #"^\s*\[\[?[^\]]+\]?\]\s*$"#: colors.meta,
-            #"^\s*[A-Za-z0-9_.-]+\s*="#: colors.property,
-            #"\"([^\"\\]|\\.)*\"|'[^']*'"#: colors.string,
-            #"\b(-?[0-9]+(\.[0-9]+)?([eE][+-]?[0-9]+)?)\b"#: colors.number,
-            #"\b(true|false)\b"#: colors.keyword,
-            #"(?m)#.*$"#: colors.comment
+            SyntaxRule(#"^\s*\[\[?[^\]]+\]?\]\s*$"#, .meta),
+            SyntaxRule(#"^\s*[A-Za-z0-9_.-]+\s*="#, .property),
+            SyntaxRule(#"\"([^\"\\]|\\.)*\"|'[^']*'"#, .string),
+            SyntaxRule(#"\b(-?[0-9]+(\.[0-9]+)?([eE][+-]?[0-9]+)?)\b"#, .number),
+            SyntaxRule(#"\b(true|false)\b"#, .keyword),
+            SyntaxRule(#"(?m)#.*$"#, .comment)
         ]
     case "csv":
         return [
-            #"\A([^\n,]+)(,\s*[^\n,]+)*"#: colors.meta,
-            #"\"([^\"\n]|\"\")*\""#: colors.string,
-            #"\b(-?[0-9]+(\.[0-9]+)?)\b"#: colors.number,
-            #","#: colors.property
+            SyntaxRule(#"\A([^\n,]+)(,\s*[^\n,]+)*"#, .meta),
+            SyntaxRule(#"\"([^\"\n]|\"\")*\""#, .string),
+            SyntaxRule(#"\b(-?[0-9]+(\.[0-9]+)?)\b"#, .number),
+            SyntaxRule(#","#, .property)
         ]
     case "ini":
         return [
-            #"^\[[^\]]+\]"#: colors.meta,
-            #"^;.*$"#: colors.comment,
-            #"^\w+\s*=\s*.*$"#: colors.property
+            SyntaxRule(#"^\[[^\]]+\]"#, .meta),
+            SyntaxRule(#"^;.*$"#, .comment),
+            SyntaxRule(#"^\w+\s*=\s*.*$"#, .property)
         ]
     case "vim":
         return [
-            #"\b(set|let|if|endif|for|endfor|while|endwhile|function|endfunction|command|autocmd|syntax|highlight|nnoremap|inoremap|vnoremap|map|nmap|imap|vmap)\b"#: colors.keyword,
-            #"\$[A-Za-z_][A-Za-z0-9_]*|[gbwtslv]:[A-Za-z_][A-Za-z0-9_]*"#: colors.variable,
-            #"\"[^\"]*\"|'[^']*'"#: colors.string,
-            #"^\s*\".*$"#: colors.comment,
-            #"\b[0-9]+\b"#: colors.number
+            SyntaxRule(#"\b(set|let|if|endif|for|endfor|while|endwhile|function|endfunction|command|autocmd|syntax|highlight|nnoremap|inoremap|vnoremap|map|nmap|imap|vmap)\b"#, .keyword),
+            SyntaxRule(#"\$[A-Za-z_][A-Za-z0-9_]*|[gbwtslv]:[A-Za-z_][A-Za-z0-9_]*"#, .variable),
+            SyntaxRule(#"\"[^\"]*\"|'[^']*'"#, .string),
+            SyntaxRule(#"^\s*\".*$"#, .comment),
+            SyntaxRule(#"\b[0-9]+\b"#, .number)
         ]
     case "log":
         return [
-            #"\b(ERROR|ERR|FATAL|WARN|WARNING|INFO|DEBUG|TRACE)\b"#: colors.keyword,
-            #"\b[0-9]{4}-[0-9]{2}-[0-9]{2}[ T][0-9:.+-Z]+\b"#: colors.meta,
-            #"\b([0-9]+(\.[0-9]+)?)\b"#: colors.number,
-            #"(Exception|Traceback|Caused by:).*"#: colors.attribute
+            SyntaxRule(#"\b(ERROR|ERR|FATAL|WARN|WARNING|INFO|DEBUG|TRACE)\b"#, .keyword),
+            SyntaxRule(#"\b[0-9]{4}-[0-9]{2}-[0-9]{2}[ T][0-9:.+-Z]+\b"#, .meta),
+            SyntaxRule(#"\b([0-9]+(\.[0-9]+)?)\b"#, .number),
+            SyntaxRule(#"(Exception|Traceback|Caused by:).*"#, .attribute)
         ]
     case "ipynb":
         return [
-            #"\"(cells|metadata|source|outputs|execution_count|cell_type|kernelspec|language_info)\"\s*:"#: colors.property,
-            #"\"([^\"\\]|\\.)*\""#: colors.string,
-            #"\b(-?[0-9]+(\.[0-9]+)?([eE][+-]?[0-9]+)?)\b"#: colors.number,
-            #"\b(true|false|null)\b"#: colors.keyword,
-            #"[{}\[\],:]"#: colors.meta
+            // Keys (in the string tier and ahead of the string rule, so they keep their own color)
+            SyntaxRule(#"\"(cells|metadata|source|outputs|execution_count|cell_type|kernelspec|language_info)\"\s*:"#, .property, priority: .string),
+            SyntaxRule(#"\"([^\"\\]|\\.)*\""#, .string),
+            SyntaxRule(#"\b(-?[0-9]+(\.[0-9]+)?([eE][+-]?[0-9]+)?)\b"#, .number),
+            SyntaxRule(#"\b(true|false|null)\b"#, .keyword),
+            SyntaxRule(#"[{}\[\],:]"#, .meta)
         ]
     case "csharp":
         return [
-            #"\b(class|interface|enum|struct|namespace|using|public|private|protected|internal|static|readonly|sealed|abstract|virtual|override|async|await|new|return|if|else|for|foreach|while|do|switch|case|break|continue|try|catch|finally|throw)\b"#: colors.keyword,
-            #"\b(string|int|double|float|bool|decimal|char|void|object|var|List<[^>]+>|Dictionary<[^>]+>)\b"#: colors.type,
-            #"\"[^\"]*\""#: colors.string,
-            #"\b([0-9]+(\.[0-9]+)?)\b"#: colors.number,
-            #"//.*|/\*([^*]|(\*+[^*/]))*\*+/"#: colors.comment
+            SyntaxRule(#"\b(class|interface|enum|struct|namespace|using|public|private|protected|internal|static|readonly|sealed|abstract|virtual|override|async|await|new|return|if|else|for|foreach|while|do|switch|case|break|continue|try|catch|finally|throw)\b"#, .keyword),
+            SyntaxRule(#"\b(string|int|double|float|bool|decimal|char|void|object|var|List<[^>]+>|Dictionary<[^>]+>)\b"#, .type),
+            SyntaxRule(#"\"[^\"]*\""#, .string),
+            SyntaxRule(#"\b([0-9]+(\.[0-9]+)?)\b"#, .number),
+            SyntaxRule(#"//.*|/\*([^*]|(\*+[^*/]))*\*+/"#, .comment)
         ]
     case "cobol":
         return [
-            #"(?i)\b(identification|environment|data|procedure|division|section|program-id|author|installati?on|date-written|date-compiled|working-storage|linkage|file-control|input-output|select|assign|fd|01|77|88|level|pic|picture|value|values|move|add|subtract|multiply|divide|compute|if|else|end-if|evaluate|when|perform|until|varying|go|to|goback|stop|run|call|accept|display|open|close|read|write|rewrite|delete|string|unstring|initialize|set|inspect)\b"#: colors.keyword,
-            #"\"[^\"]*\"|'[^']*'"#: colors.string,
-            #"\b([0-9]+(\.[0-9]+)?)\b"#: colors.number,
-            #"(?m)^\s*\*.*$|(?m)^\s*\*>.*$"#: colors.comment
+            SyntaxRule(#"(?i)\b(identification|environment|data|procedure|division|section|program-id|author|installati?on|date-written|date-compiled|working-storage|linkage|file-control|input-output|select|assign|fd|01|77|88|level|pic|picture|value|values|move|add|subtract|multiply|divide|compute|if|else|end-if|evaluate|when|perform|until|varying|go|to|goback|stop|run|call|accept|display|open|close|read|write|rewrite|delete|string|unstring|initialize|set|inspect)\b"#, .keyword),
+            SyntaxRule(#"\"[^\"]*\"|'[^']*'"#, .string),
+            SyntaxRule(#"\b([0-9]+(\.[0-9]+)?)\b"#, .number),
+            SyntaxRule(#"(?m)^\s*\*.*$|(?m)^\s*\*>.*$"#, .comment)
         ]
     case "dotenv":
         return [
-            #"(?m)^\s*[A-Z_][A-Z0-9_]*\s*="#: colors.property,
-            #"\"[^\"]*\"|'[^']*'"#: colors.string,
-            #"(?m)#.*$"#: colors.comment
+            SyntaxRule(#"(?m)^\s*[A-Z_][A-Z0-9_]*\s*="#, .property),
+            SyntaxRule(#"\"[^\"]*\"|'[^']*'"#, .string),
+            SyntaxRule(#"(?m)#.*$"#, .comment)
         ]
     case "proto":
         return [
-            #"\b(syntax|package|import|option|message|enum|service|rpc|returns|repeated|map|oneof|reserved|required|optional)\b"#: colors.keyword,
-            #"\b(int32|int64|uint32|uint64|sint32|sint64|fixed32|fixed64|sfixed32|sfixed64|bool|string|bytes|double|float)\b"#: colors.type,
-            #"\"[^\"]*\""#: colors.string,
-            #"\b([0-9]+(\.[0-9]+)?)\b"#: colors.number,
-            #"//.*|/\*([^*]|(\*+[^*/]))*\*+/"#: colors.comment
+            SyntaxRule(#"\b(syntax|package|import|option|message|enum|service|rpc|returns|repeated|map|oneof|reserved|required|optional)\b"#, .keyword),
+            SyntaxRule(#"\b(int32|int64|uint32|uint64|sint32|sint64|fixed32|fixed64|sfixed32|sfixed64|bool|string|bytes|double|float)\b"#, .type),
+            SyntaxRule(#"\"[^\"]*\""#, .string),
+            SyntaxRule(#"\b([0-9]+(\.[0-9]+)?)\b"#, .number),
+            SyntaxRule(#"//.*|/\*([^*]|(\*+[^*/]))*\*+/"#, .comment)
         ]
     case "graphql":
         return [
-            #"\b(type|interface|enum|union|input|scalar|schema|extend|implements|directive|on|query|mutation|subscription|fragment)\b"#: colors.keyword,
-            #"\b([A-Z][A-Za-z0-9_]*)\b"#: colors.type,
-            #"\"[^\"]*\""#: colors.string,
-            #"\b([0-9]+(\.[0-9]+)?)\b"#: colors.number,
-            #"(?m)#.*$"#: colors.comment
+            SyntaxRule(#"\b(type|interface|enum|union|input|scalar|schema|extend|implements|directive|on|query|mutation|subscription|fragment)\b"#, .keyword),
+            SyntaxRule(#"\b([A-Z][A-Za-z0-9_]*)\b"#, .type),
+            SyntaxRule(#"\"[^\"]*\""#, .string),
+            SyntaxRule(#"\b([0-9]+(\.[0-9]+)?)\b"#, .number),
+            SyntaxRule(#"(?m)#.*$"#, .comment)
         ]
     case "rst":
         return [
-            #"(?m)^\s*([=\-`:'\"~^_*+<>#]{3,})\s*$"#: colors.keyword,
-            #"(?m)^\s*\.\.\s+[A-Za-z-]+::.*$"#: colors.meta,
-            #"(?m)^:?[A-Za-z-]+:\s+.*$"#: colors.property,
-            #"\*\*[^*]+\*\*"#: colors.def,
-            #"(?m)#.*$"#: colors.comment
+            SyntaxRule(#"(?m)^\s*([=\-`:'\"~^_*+<>#]{3,})\s*$"#, .keyword),
+            SyntaxRule(#"(?m)^\s*\.\.\s+[A-Za-z-]+::.*$"#, .meta),
+            SyntaxRule(#"(?m)^:?[A-Za-z-]+:\s+.*$"#, .property),
+            SyntaxRule(#"\*\*[^*]+\*\*"#, .def),
+            SyntaxRule(#"(?m)#.*$"#, .comment)
         ]
     case "nginx":
         return [
-            #"\b(http|server|location|upstream|map|if|set|return|rewrite|proxy_pass|listen|server_name|root|index|try_files|include|error_page|access_log|error_log|gzip|ssl|add_header)\b"#: colors.keyword,
-            #"\b([0-9]+(\.[0-9]+)?)\b"#: colors.number,
-            #"\"[^\"]*\"|'[^']*'"#: colors.string,
-            #"(?m)#.*$"#: colors.comment,
-            #"[{};]"#: colors.meta
+            SyntaxRule(#"\b(http|server|location|upstream|map|if|set|return|rewrite|proxy_pass|listen|server_name|root|index|try_files|include|error_page|access_log|error_log|gzip|ssl|add_header)\b"#, .keyword),
+            SyntaxRule(#"\b([0-9]+(\.[0-9]+)?)\b"#, .number),
+            SyntaxRule(#"\"[^\"]*\"|'[^']*'"#, .string),
+            SyntaxRule(#"(?m)#.*$"#, .comment),
+            SyntaxRule(#"[{};]"#, .meta)
         ]
     case "standard":
         return [
             // Strings (double/single/backtick)
-            #"\"[^\"]*\"|'[^']*'|`[^`]*`"#: colors.string,
+            SyntaxRule(#"\"[^\"]*\"|'[^']*'|`[^`]*`"#, .string),
             // Numbers
-            #"\b([0-9]+(\.[0-9]+)?)\b"#: colors.number,
+            SyntaxRule(#"\b([0-9]+(\.[0-9]+)?)\b"#, .number),
             // Line and block comments for C-like and hash comments
-            #"//.*|/\*([^*]|(\*+[^*/]))*\*+/|#.*"#: colors.comment,
+            SyntaxRule(#"//.*|/\*([^*]|(\*+[^*/]))*\*+/|#.*"#, .comment),
             // Common keywords from several languages
-            #"\b(if|else|for|while|do|switch|case|return|class|struct|enum|func|function|var|let|const|import|from|using|namespace|public|private|protected|static|void|new|try|catch|finally|throw)\b"#: colors.keyword
+            SyntaxRule(#"\b(if|else|for|while|do|switch|case|return|class|struct|enum|func|function|var|let|const|import|from|using|namespace|public|private|protected|static|void|new|try|catch|finally|throw)\b"#, .keyword)
         ]
     case "plain":
-        return [:]
+        return []
     default:
-        return [:]
+        return []
+    }
+}
+
+// Compiled regexes for one language. Theme independent, so it lives for the whole process.
+final class SyntaxGrammar {
+    struct Rule {
+        let regex: NSRegularExpression
+        let kind: SyntaxTokenKind
+        // Capture group that wraps this rule inside `scanner`.
+        let scannerGroup: Int
+    }
+
+    let language: String
+    // Valid rules in scan priority order.
+    let rules: [Rule]
+    // All rules joined into one alternation, ordered by priority, so a single walk over
+    // the text yields the leftmost, highest-priority token at every position.
+    let scanner: NSRegularExpression?
+    // Patterns that failed to compile; they are skipped and reported once when the grammar loads.
+    let invalidPatterns: [String]
+
+    init(language: String, rules: [Rule], scanner: NSRegularExpression?, invalidPatterns: [String]) {
+        self.language = language
+        self.rules = rules
+        self.scanner = scanner
+        self.invalidPatterns = invalidPatterns
+    }
+}
+
+// Process-wide cache of compiled grammars keyed by language.
+final class SyntaxGrammarCache {
+    static let shared = SyntaxGrammarCache()
+
+    private let lock = NSLock()
+    private var grammars: [String: SyntaxGrammar] = [:]
+
+    private init() {}
+
+    func grammar(for language: String) -> SyntaxGrammar {
+        lock.lock()
+        defer { lock.unlock() }
+        if let cached = grammars[language] {
+            return cached
+        }
+        var rules: [SyntaxGrammar.Rule] = []
+        var alternatives: [String] = []
+        var invalid: [String] = []
+        var nextGroup = 1
+        // Stable sort keeps table order within a priority tier.
+        let ordered = syntaxRules(for: language).enumerated().sorted {
+            ($0.element.priority, $0.offset) < ($1.element.priority, $1.offset)
+        }.map(\.element)
+        for rule in ordered {
+            do {
+                let regex = try NSRegularExpression(pattern: rule.pattern, options: [.anchorsMatchLines])
+                rules.append(SyntaxGrammar.Rule(regex: regex, kind: rule.kind, scannerGroup: nextGroup))
+                alternatives.append("(\(rule.pattern))")
+                nextGroup += 1 + regex.numberOfCaptureGroups
+            } catch {
+                invalid.append(rule.pattern)
+            }
+        }
+        let scanner: NSRegularExpression?
+        if alternatives.isEmpty {
+            scanner = nil
+        } else {
+            scanner = try? NSRegularExpression(pattern: alternatives.joined(separator: "|"), options: [.anchorsMatchLines])
+        }
+#if DEBUG
+        for pattern in invalid {
+            print("[SyntaxHighlighting] Skipping invalid \(language) pattern: \(pattern)")
+        }
+        if scanner == nil && !alternatives.isEmpty {
+            print("[SyntaxHighlighting] Combined \(language) scanner failed to compile; scanning rules separately")
+        }
+#endif
+        let grammar = SyntaxGrammar(language: language, rules: rules, scanner: scanner, invalidPatterns: invalid)
+        grammars[language] = grammar
+        return grammar
+    }
+}
+
+#if canImport(SwiftUI)
+#if os(macOS)
+typealias SyntaxPlatformColor = NSColor
+#else
+typealias SyntaxPlatformColor = UIColor
+#endif
+
+// Platform colors per token kind, indexed by `SyntaxTokenKind.rawValue`.
+// Re-resolved only when the theme's syntax colors change.
+final class SyntaxColorPalette {
+    static let shared = SyntaxColorPalette()
+
+    private let lock = NSLock()
+    private var resolvedFor: SyntaxColors?
+    private var resolved: [SyntaxPlatformColor] = []
+
+    private init() {}
+
+    func colors(for syntax: SyntaxColors) -> [SyntaxPlatformColor] {
+        lock.lock()
+        defer { lock.unlock() }
+        if resolvedFor != syntax || resolved.isEmpty {
+            resolved = SyntaxTokenKind.allCases.map { SyntaxPlatformColor(syntax.color(for: $0)) }
+            resolvedFor = syntax
+        }
+        return resolved
+    }
+}
+#endif
+
+// Multi-line constructs (block comments, raw/multi-line strings) that an incremental
+// highlight window must never cut in half.
+struct SyntaxBlockDelimiter {
+    let open: String
+    let close: String
+    let kind: SyntaxTokenKind
+}
+
+func syntaxBlockDelimiters(for language: String) -> [SyntaxBlockDelimiter] {
+    let blockComment = SyntaxBlockDelimiter(open: "/*", close: "*/", kind: .comment)
+    switch language {
+    case "swift", "kotlin":
+        return [blockComment, SyntaxBlockDelimiter(open: "\"\"\"", close: "\"\"\"", kind: .string)]
+    case "python":
+        return [
+            SyntaxBlockDelimiter(open: "\"\"\"", close: "\"\"\"", kind: .string),
+            SyntaxBlockDelimiter(open: "'''", close: "'''", kind: .string)
+        ]
+    case "javascript", "typescript", "go":
+        return [blockComment, SyntaxBlockDelimiter(open: "`", close: "`", kind: .string)]
+    case "c", "cpp", "java", "rust", "php", "csharp", "objective-c", "proto", "standard":
+        return [blockComment]
+    default:
+        return []
+    }
+}
+
+// MARK: - Line states
+
+/// Lexer state at the start of a line: the multi-line construct, if any, still open there.
+enum SyntaxLineState: Hashable {
+    case normal
+    /// Inside `SyntaxLexicalProfile.blocks[index]` (block comment or multi-line string).
+    case block(Int)
+    /// Inside a shell here-document body, waiting for the terminator line.
+    case heredoc(String)
+}
+
+/// The parts of a language's lexical structure needed to track `SyntaxLineState` line by line.
+/// Line comments and single-line strings are only skipped, so block openers inside them are ignored.
+struct SyntaxLexicalProfile {
+    let blocks: [SyntaxBlockDelimiter]
+    let lineComments: [String]
+    let quotes: [unichar]
+    let heredocs: Bool
+
+    private let blockUnits: [(open: [unichar], close: [unichar])]
+    private let lineCommentUnits: [[unichar]]
+
+    init(blocks: [SyntaxBlockDelimiter], lineComments: [String], quotes: [Character], heredocs: Bool = false) {
+        self.blocks = blocks
+        self.lineComments = lineComments
+        self.quotes = quotes.compactMap { $0.utf16.first }
+        self.heredocs = heredocs
+        self.blockUnits = blocks.map { (open: Array($0.open.utf16), close: Array($0.close.utf16)) }
+        self.lineCommentUnits = lineComments.map { Array($0.utf16) }
+    }
+
+    /// True when no construct can span lines, so every line starts in `.normal`.
+    var isTrivial: Bool { blocks.isEmpty && !heredocs }
+
+    /// Scans the line starting at `start` in `state`. Returns where the next line starts, whether
+    /// this line has a terminator, and the state the next line starts in. `onSpan` receives the
+    /// part of each block construct or here-document body that falls on this line.
+    func scanLine(
+        in text: NSString,
+        at start: Int,
+        startingIn state: SyntaxLineState,
+        buffer: inout [unichar],
+        onSpan: ((NSRange, SyntaxTokenKind) -> Void)? = nil
+    ) -> (end: Int, hasTerminator: Bool, state: SyntaxLineState) {
+        var lineEnd = 0
+        var contentsEnd = 0
+        text.getLineStart(nil, end: &lineEnd, contentsEnd: &contentsEnd, for: NSRange(location: start, length: 0))
+        let hasTerminator = lineEnd > contentsEnd
+        guard !isTrivial else { return (lineEnd, hasTerminator, .normal) }
+
+        let count = contentsEnd - start
+        if buffer.count < count {
+            buffer = [unichar](repeating: 0, count: count)
+        }
+        text.getCharacters(&buffer, range: NSRange(location: start, length: count))
+
+        if case .heredoc(let marker) = state {
+            let line = String(utf16CodeUnits: buffer, count: count).trimmingCharacters(in: .whitespaces)
+            if line == marker {
+                return (lineEnd, hasTerminator, .normal)
+            }
+            if count > 0 {
+                onSpan?(NSRange(location: start, length: count), .string)
+            }
+            return (lineEnd, hasTerminator, state)
+        }
+
+        var state = state
+        var blockStart = 0
+        var pendingHeredoc: String?
+        var i = 0
+        scan: while i < count {
+            if case .block(let index) = state {
+                let close = blockUnits[index].close
+                guard let found = firstIndex(of: close, in: buffer, from: i, to: count) else {
+                    onSpan?(NSRange(location: start + blockStart, length: count - blockStart), blocks[index].kind)
+                    return (lineEnd, hasTerminator, state)
+                }
+                i = found + close.count
+                onSpan?(NSRange(location: start + blockStart, length: i - blockStart), blocks[index].kind)
+                state = .normal
+                continue
+            }
+            for comment in lineCommentUnits where matches(comment, in: buffer, at: i, to: count) {
+                break scan
+            }
+            if let index = blockUnits.firstIndex(where: { matches($0.open, in: buffer, at: i, to: count) }) {
+                blockStart = i
+                i += blockUnits[index].open.count
+                state = .block(index)
+                continue
+            }
+            let unit = buffer[i]
+            if quotes.contains(unit) {
+                // Single-line string: skip to the matching unescaped quote or the end of the line.
+                i += 1
+                while i < count && buffer[i] != unit {
+                    i += buffer[i] == Self.backslash ? 2 : 1
+                }
+                i += 1
+                continue
+            }
+            if heredocs && unit == Self.lessThan, let marker = heredocMarker(in: buffer, at: i, to: count) {
+                pendingHeredoc = marker.word
+                i = marker.end
+                continue
+            }
+            i += 1
+        }
+        if case .normal = state, let pendingHeredoc {
+            return (lineEnd, hasTerminator, .heredoc(pendingHeredoc))
+        }
+        return (lineEnd, hasTerminator, state)
+    }
+
+    private static let backslash = unichar(UInt8(ascii: "\\"))
+    private static let lessThan = unichar(UInt8(ascii: "<"))
+
+    private func matches(_ needle: [unichar], in buffer: [unichar], at index: Int, to count: Int) -> Bool {
+        guard index + needle.count <= count else { return false }
+        for offset in 0..<needle.count where buffer[index + offset] != needle[offset] {
+            return false
+        }
+        return true
+    }
+
+    private func firstIndex(of needle: [unichar], in buffer: [unichar], from start: Int, to count: Int) -> Int? {
+        var index = start
+        while index + needle.count <= count {
+            if matches(needle, in: buffer, at: index, to: count) { return index }
+            index += 1
+        }
+        return nil
+    }
+
+    // Parses `<<WORD`, `<<-WORD`, `<< 'WORD'` or `<<"WORD"`; here-strings (`<<<`) are ignored.
+    private func heredocMarker(in buffer: [unichar], at index: Int, to count: Int) -> (word: String, end: Int)? {
+        var i = index + 2
+        guard i <= count, buffer[index + 1] == Self.lessThan else { return nil }
+        if i < count && buffer[i] == Self.lessThan { return nil }
+        if i < count && buffer[i] == unichar(UInt8(ascii: "-")) { i += 1 }
+        while i < count && (buffer[i] == unichar(UInt8(ascii: " ")) || buffer[i] == unichar(UInt8(ascii: "\t"))) { i += 1 }
+        if i < count && (buffer[i] == unichar(UInt8(ascii: "'")) || buffer[i] == unichar(UInt8(ascii: "\""))) { i += 1 }
+        let wordStart = i
+        while i < count, let scalar = Unicode.Scalar(buffer[i]),
+              scalar == "_" || (scalar.isASCII && CharacterSet.alphanumerics.contains(scalar)) {
+            i += 1
+        }
+        guard i > wordStart, let first = Unicode.Scalar(buffer[wordStart]), !CharacterSet.decimalDigits.contains(first) else { return nil }
+        return (String(utf16CodeUnits: Array(buffer[wordStart..<i]), count: i - wordStart), i)
+    }
+}
+
+func syntaxLexicalProfile(for language: String) -> SyntaxLexicalProfile {
+    let blocks = syntaxBlockDelimiters(for: language)
+    switch language {
+    case "swift", "rust":
+        return SyntaxLexicalProfile(blocks: blocks, lineComments: ["//"], quotes: ["\""])
+    case "python":
+        return SyntaxLexicalProfile(blocks: blocks, lineComments: ["#"], quotes: ["\"", "'"])
+    case "php", "standard":
+        return SyntaxLexicalProfile(blocks: blocks, lineComments: ["//", "#"], quotes: ["\"", "'"])
+    case "bash", "zsh":
+        return SyntaxLexicalProfile(blocks: blocks, lineComments: ["#"], quotes: ["\"", "'"], heredocs: true)
+    default:
+        return SyntaxLexicalProfile(blocks: blocks, lineComments: ["//"], quotes: ["\"", "'"])
+    }
+}
+
+/// Start state of every line in a document, kept in step with edits. Re-tokenizing can then
+/// begin at any line, and an edit only dirties lines until the start states downstream of it
+/// match what was cached before.
+final class SyntaxLineStateTable {
+    let language: String
+    let profile: SyntaxLexicalProfile
+    // Start location and start state of each line; the empty line after a trailing newline counts.
+    private var lineStarts = LineStartArray()
+    private(set) var states: [SyntaxLineState] = [.normal]
+
+    init(language: String, text: NSString) {
+        self.language = language
+        self.profile = syntaxLexicalProfile(for: language)
+        var buffer: [unichar] = []
+        var position = 0
+        var state = SyntaxLineState.normal
+        var starts: [Int] = []
+        states.removeAll(keepingCapacity: true)
+        while true {
+            starts.append(position)
+            states.append(state)
+            let line = profile.scanLine(in: text, at: position, startingIn: state, buffer: &buffer)
+            guard line.hasTerminator else { break }
+            position = line.end
+            state = line.state
+        }
+        lineStarts = LineStartArray(starts)
+    }
+
+    /// Index of the line containing `location`.
+    func lineIndex(containing location: Int) -> Int {
+        lineStarts.lastIndex(atMost: location)
+    }
+
+    /// Start state of the line containing `location`.
+    func state(at location: Int) -> SyntaxLineState {
+        states[lineIndex(containing: location)]
+    }
+
+    /// Updates the table for an edit (`editedRange` in post-edit coordinates, as `NSTextStorage`
+    /// reports it) and returns the line-aligned range to re-tokenize: the edited lines plus any
+    /// following lines whose start state changed. Lines after those only take a pending shift.
+    func applyEdit(in text: NSString, editedRange: NSRange, changeInLength delta: Int) -> NSRange {
+        let length = text.length
+        let editStart = min(max(0, editedRange.location), length)
+        let editEnd = min(NSMaxRange(editedRange), length)
+        let preEditEnd = NSMaxRange(editedRange) - delta
+        let first = lineIndex(containing: editStart)
+        // Old lines starting after the replaced text are still valid, shifted by `delta`.
+        var resume = lineIndex(containing: preEditEnd) + 1
+
+        var newStarts: [Int] = []
+        var newStates: [SyntaxLineState] = []
+        var buffer: [unichar] = []
+        var position = lineStarts[first]
+        var state = states[first]
+        var reachedEnd = false
+        while true {
+            newStarts.append(position)
+            newStates.append(state)
+            let line = profile.scanLine(in: text, at: position, startingIn: state, buffer: &buffer)
+            guard line.hasTerminator else {
+                reachedEnd = true
+                break
+            }
+            position = line.end
+            state = line.state
+            guard position > editEnd else { continue }
+            while resume < lineStarts.count && lineStarts[resume] + delta < position {
+                resume += 1
+            }
+            if resume < lineStarts.count && lineStarts[resume] + delta == position && states[resume] == state {
+                break
+            }
+        }
+
+        let tail = reachedEnd ? lineStarts.count : resume
+        lineStarts.replace(first..<tail, with: newStarts, shiftingRestBy: delta)
+        states.replaceSubrange(first..<tail, with: newStates)
+
+        let dirtyEnd = reachedEnd ? length : position
+        return NSRange(location: newStarts[0], length: dirtyEnd - newStarts[0])
     }
 }
 
@@ -0,0 +1,308 @@
+import Foundation
+
+struct SyntaxToken {
+    let range: NSRange
+    let kind: SyntaxTokenKind
+}
+
+/// Tokenizer output stored as parallel arrays: an `Int32` start, an `Int32` length and a
+/// one-byte kind per token (9 bytes), with colors looked up per kind when applied.
+struct SyntaxTokenBuffer: RandomAccessCollection, RangeReplaceableCollection {
+    private var starts: [Int32] = []
+    private var lengths: [Int32] = []
+    private var kinds: [SyntaxTokenKind] = []
+
+    init() {}
+
+    var startIndex: Int { 0 }
+    var endIndex: Int { starts.count }
+
+    subscript(position: Int) -> SyntaxToken {
+        SyntaxToken(range: NSRange(location: Int(starts[position]), length: Int(lengths[position])), kind: kinds[position])
+    }
+
+    mutating func append(_ token: SyntaxToken) {
+        starts.append(Int32(token.range.location))
+        lengths.append(Int32(token.range.length))
+        kinds.append(token.kind)
+    }
+
+    mutating func reserveCapacity(_ n: Int) {
+        starts.reserveCapacity(n)
+        lengths.reserveCapacity(n)
+        kinds.reserveCapacity(n)
+    }
+
+    mutating func replaceSubrange<C: Collection>(_ subrange: Range<Int>, with newElements: C) where C.Element == SyntaxToken {
+        starts.replaceSubrange(subrange, with: newElements.map { Int32($0.range.location) })
+        lengths.replaceSubrange(subrange, with: newElements.map { Int32($0.range.length) })
+        kinds.replaceSubrange(subrange, with: newElements.map(\.kind))
+    }
+}
+
+/// Monotonic counter shared by the main thread and highlight workers. A job remembers the value
+/// it started from; once the counter moves on the job stops early and its result is dropped.
+final class SyntaxHighlightGeneration {
+    private let lock = NSLock()
+    private var value = 0
+
+    var current: Int {
+        lock.lock()
+        defer { lock.unlock() }
+        return value
+    }
+
+    @discardableResult
+    func advance() -> Int {
+        lock.lock()
+        defer { lock.unlock() }
+        value &+= 1
+        return value
+    }
+}
+
+extension SyntaxGrammar {
+    /// Walks `range` once and returns tokens sorted by location and never overlapping.
+    /// At every position the leftmost match wins; ties go to the higher-priority rule,
+    /// so comments and strings swallow any keywords inside them. Bounds are transparent and
+    /// non-anchoring, so `^`, `\A` and `\b` behave as they would in a full-document scan.
+    /// `isCancelled` is polled while scanning; a cancelled scan returns a partial result.
+    func tokens(in text: String, range: NSRange, isCancelled: (() -> Bool)? = nil) -> SyntaxTokenBuffer {
+        guard range.length > 0 else { return [] }
+        guard let scanner else { return tokensScanningRulesSeparately(in: text, range: range, isCancelled: isCancelled) }
+
+        var tokens = SyntaxTokenBuffer()
+        // Progress callbacks let a cancelled scan stop even inside long stretches without matches
+        let options = isCancelled == nil ? Self.windowOptions : Self.windowOptions.union(.reportProgress)
+        scanner.enumerateMatches(in: text, options: options, range: range) { match, _, stop in
+            if let isCancelled, match == nil || tokens.count % 64 == 0, isCancelled() {
+                stop.pointee = true
+                return
+            }
+            guard let match, let token = token(for: match) else { return }
+            tokens.append(token)
+        }
+        return tokens
+    }
+
+    /// Tokenizes the line-aligned `range`, whose first line starts in `state`. Block comments,
+    /// multi-line strings and here-document bodies come from the line lexer, so `range` may begin
+    /// inside one; the regex scanner only runs over the gaps between them.
+    func tokens(
+        in text: String,
+        range: NSRange,
+        startingIn state: SyntaxLineState,
+        profile: SyntaxLexicalProfile,
+        isCancelled: (() -> Bool)? = nil
+    ) -> SyntaxTokenBuffer {
+        guard range.length > 0 else { return [] }
+        guard !profile.isTrivial else { return tokens(in: text, range: range, isCancelled: isCancelled) }
+
+        let spans = profile.blockSpans(in: text.bridgedNSString, range: range, startingIn: state)
+        var gapTokens = SyntaxTokenBuffer()
+        for gap in Self.gaps(in: range, between: spans) {
+            if isCancelled?() == true { break }
+            gapTokens += tokens(in: text, range: NSRange(gap), isCancelled: isCancelled)
+        }
+        return Self.merge(spans, gapTokens)
+    }
+
+    /// Same result as `tokens(in:range:startingIn:profile:)`, but ranges large enough to be worth
+    /// it are split into line-aligned chunks scanned concurrently. Block constructs come from one
+    /// serial lexer pass up front, so chunks can start anywhere; afterwards every chunk boundary
+    /// that falls inside a regex gap is resynchronized in case a serial scan would have carried a
+    /// match across it.
+    func tokensConcurrently(
+        in text: String,
+        range: NSRange,
+        startingIn state: SyntaxLineState = .normal,
+        profile: SyntaxLexicalProfile,
+        isCancelled: (() -> Bool)? = nil
+    ) -> SyntaxTokenBuffer {
+        let chunkCount = min(ProcessInfo.processInfo.activeProcessorCount * 2, range.length / Self.minimumChunkLength)
+        guard chunkCount > 1, scanner != nil else {
+            return tokens(in: text, range: range, startingIn: state, profile: profile, isCancelled: isCancelled)
+        }
+
+        let nsText = text.bridgedNSString
+        let end = NSMaxRange(range)
+        let spans = profile.isTrivial ? [] : profile.blockSpans(in: nsText, range: range, startingIn: state)
+        let gaps = Self.gaps(in: range, between: spans)
+
+        var boundaries = [range.location]
+        let chunkLength = range.length / chunkCount
+        for index in 1..<chunkCount {
+            let lineEnd = NSMaxRange(nsText.lineRange(for: NSRange(location: range.location + index * chunkLength, length: 0)))
+            if let last = boundaries.last, lineEnd > last, lineEnd < end {
+                boundaries.append(lineEnd)
+            }
+        }
+        boundaries.append(end)
+
+        var chunkTokens = [SyntaxTokenBuffer](repeating: SyntaxTokenBuffer(), count: boundaries.count - 1)
+        chunkTokens.withUnsafeMutableBufferPointer { results in
+            DispatchQueue.concurrentPerform(iterations: results.count) { index in
+                let chunk = boundaries[index]..<boundaries[index + 1]
+                var found = SyntaxTokenBuffer()
+                for gap in gaps where gap.overlaps(chunk) {
+                    if isCancelled?() == true { break }
+                    found += tokens(in: text, range: NSRange(gap.clamped(to: chunk)), isCancelled: isCancelled)
+                }
+                results[index] = found
+            }
+        }
+        if isCancelled?() == true { return [] }
+
+        var gapTokens = SyntaxTokenBuffer()
+        gapTokens.reserveCapacity(chunkTokens.reduce(0) { $0 + $1.count })
+        for chunk in chunkTokens {
+            gapTokens += chunk
+        }
+        for boundary in boundaries.dropFirst().dropLast() {
+            // A boundary on a gap edge cannot split a match; the scan would have stopped there anyway
+            guard let gap = gaps.first(where: { $0.lowerBound < boundary && boundary < $0.upperBound }) else { continue }
+            resynchronize(&gapTokens, at: boundary, in: gap, text: text)
+        }
+        return Self.merge(spans, gapTokens)
+    }
+
+    private static let windowOptions: NSRegularExpression.MatchingOptions = [.withTransparentBounds, .withoutAnchoringBounds]
+    private static let minimumChunkLength = 64 * 1024
+
+    private func token(for match: NSTextCheckingResult) -> SyntaxToken? {
+        guard match.range.length > 0 else { return nil }
+        for rule in rules where match.range(at: rule.scannerGroup).location != NSNotFound {
+            return SyntaxToken(range: match.range, kind: rule.kind)
+        }
+        return nil
+    }
+
+    // Replays the serial scan of `gap` from the last token before `boundary` and replaces chunk
+    // results until the replay produces a match the chunk scan also found; from there on both
+    // scans are at the same position and agree.
+    private func resynchronize(_ tokens: inout SyntaxTokenBuffer, at boundary: Int, in gap: Range<Int>, text: String) {
+        guard let scanner else { return }
+        var firstAfter = 0
+        var high = tokens.count
+        while firstAfter < high {
+            let mid = (firstAfter + high) / 2
+            if tokens[mid].range.location < boundary {
+                firstAfter = mid + 1
+            } else {
+                high = mid
+            }
+        }
+        var from = gap.lowerBound
+        if firstAfter > 0 {
+            from = max(from, NSMaxRange(tokens[firstAfter - 1].range))
+        }
+        guard from < gap.upperBound else { return }
+
+        var replayed: [SyntaxToken] = []
+        var existing = firstAfter
+        var syncLocation = gap.upperBound
+        scanner.enumerateMatches(in: text, options: Self.windowOptions, range: NSRange(from..<gap.upperBound)) { match, _, stop in
+            guard let match, let token = token(for: match) else { return }
+            while existing < tokens.count && tokens[existing].range.location < token.range.location {
+                existing += 1
+            }
+            if existing < tokens.count && tokens[existing].range == token.range && tokens[existing].kind == token.kind {
+                syncLocation = token.range.location
+                stop.pointee = true
+                return
+            }
+            replayed.append(token)
+        }
+        var superseded = firstAfter
+        while superseded < tokens.count && tokens[superseded].range.location < syncLocation {
+            superseded += 1
+        }
+        tokens.replaceSubrange(firstAfter..<superseded, with: replayed)
+    }
+
+    // The parts of `range` not covered by `spans` (sorted, non-overlapping).
+    private static func gaps(in range: NSRange, between spans: [SyntaxToken]) -> [Range<Int>] {
+        var gaps: [Range<Int>] = []
+        var cursor = range.location
+        for span in spans {
+            if span.range.location > cursor {
+                gaps.append(cursor..<span.range.location)
+            }
+            cursor = max(cursor, NSMaxRange(span.range))
+        }
+        if cursor < NSMaxRange(range) {
+            gaps.append(cursor..<NSMaxRange(range))
+        }
+        return gaps
+    }
+
+    // Merges two sorted token lists that never overlap each other.
+    private static func merge(_ first: [SyntaxToken], _ second: SyntaxTokenBuffer) -> SyntaxTokenBuffer {
+        guard !first.isEmpty else { return second }
+        var merged = SyntaxTokenBuffer()
+        merged.reserveCapacity(first.count + second.count)
+        var i = 0
+        var j = 0
+        while i < first.count && j < second.count {
+            if first[i].range.location <= second[j].range.location {
+                merged.append(first[i])
+                i += 1
+            } else {
+                merged.append(second[j])
+                j += 1
+            }
+        }
+        merged += first[i...]
+        merged += second[j...]
+        return merged
+    }
+
+    // Fallback when the combined alternation could not be compiled: same priority semantics,
+    // one regex at a time, dropping matches that overlap an already accepted token.
+    private func tokensScanningRulesSeparately(in text: String, range: NSRange, isCancelled: (() -> Bool)?) -> SyntaxTokenBuffer {
+        var covered = IndexSet()
+        var tokens: [SyntaxToken] = []
+        for rule in rules {
+            if isCancelled?() == true { break }
+            for match in rule.regex.matches(in: text, options: Self.windowOptions, range: range) where match.range.length > 0 {
+                guard let span = Range(match.range), !covered.intersects(integersIn: span) else { continue }
+                covered.insert(integersIn: span)
+                tokens.append(SyntaxToken(range: match.range, kind: rule.kind))
+            }
+        }
+        return SyntaxTokenBuffer(tokens.sorted { $0.range.location < $1.range.location })
+    }
+}
+
+extension SyntaxLexicalProfile {
+    /// Block comment, multi-line string and here-document pieces in the line-aligned `range`,
+    /// one per line they touch, in document order.
+    func blockSpans(in text: NSString, range: NSRange, startingIn state: SyntaxLineState) -> [SyntaxToken] {
+        guard !isTrivial else { return [] }
+        let end = NSMaxRange(range)
+        var spans: [SyntaxToken] = []
+        var buffer: [unichar] = []
+        var position = range.location
+        var lineState = state
+        while position < end {
+            let line = scanLine(in: text, at: position, startingIn: lineState, buffer: &buffer) { span, kind in
+                spans.append(SyntaxToken(range: span, kind: kind))
+            }
+            guard line.hasTerminator else { break }
+            position = line.end
+            lineState = line.state
+        }
+        return spans
+    }
+}
+
+extension String {
+    // Free on Apple platforms; corelibs Foundation cannot bridge with `as` and needs a copy.
+    var bridgedNSString: NSString {
+#if canImport(ObjectiveC)
+        return self as NSString
+#else
+        return NSString(string: self)
+#endif
+    }
+}
@@ -0,0 +1,93 @@
+import Foundation
+
+/// Start offset of every line in a document, kept in step with edits, so converting between
+/// offsets and line numbers is a binary search rather than a scan from the top. Lines break
+/// where `NSString.lineRange(for:)` breaks them; the empty line after a trailing newline counts.
+final class TextLineIndex {
+    private var starts = LineStartArray()
+
+    init(text: NSString = "") {
+        reset(text: text)
+    }
+
+    var lineCount: Int { starts.count }
+
+    /// The start offset of every line, in order.
+    var lineStarts: [Int] { starts.offsets }
+
+    /// Rebuilds the index for `text`.
+    func reset(text: NSString) {
+        var lineStarts = [0]
+        var position = 0
+        while let next = Self.nextLineStart(in: text, after: position) {
+            lineStarts.append(next)
+            position = next
+        }
+        starts = LineStartArray(lineStarts)
+    }
+
+    /// Number of lines in `text`, counted the same way without keeping their offsets.
+    static func lineCount(of text: NSString) -> Int {
+        var count = 1
+        var position = 0
+        while let next = nextLineStart(in: text, after: position) {
+            count += 1
+            position = next
+        }
+        return count
+    }
+
+    /// Zero-based index of the line containing `location`.
+    func lineIndex(containing location: Int) -> Int {
+        starts.lastIndex(atMost: location)
+    }
+
+    /// Offset of the first character of the zero-based line `line`, clamped to the document.
+    func lineStart(_ line: Int) -> Int {
+        starts[min(max(0, line), starts.count - 1)]
+    }
+
+    /// Updates the index for an edit (`editedRange` in post-edit coordinates, as `NSTextStorage`
+    /// reports it). Only the edited lines are rescanned; later lines are shifted by `delta`, lazily,
+    /// so a keystroke does not rewrite the offset of every line below it.
+    func applyEdit(in text: NSString, editedRange: NSRange, changeInLength delta: Int) {
+        let length = text.length
+        let editStart = min(max(0, editedRange.location), length)
+        let editEnd = min(NSMaxRange(editedRange), length)
+        let preEditEnd = NSMaxRange(editedRange) - delta
+        // Start a line early: the edit may join or split the "\r\n" ending the previous line
+        let first = max(0, lineIndex(containing: editStart) - 1)
+        // Old lines starting after the replaced text are still valid, shifted by `delta`.
+        var resume = lineIndex(containing: preEditEnd) + 1
+
+        var newStarts: [Int] = []
+        var position = starts[first]
+        var reachedEnd = false
+        while true {
+            newStarts.append(position)
+            guard let next = Self.nextLineStart(in: text, after: position) else {
+                reachedEnd = true
+                break
+            }
+            position = next
+            guard position > editEnd else { continue }
+            while resume < starts.count && starts[resume] + delta < position {
+                resume += 1
+            }
+            if resume < starts.count && starts[resume] + delta == position {
+                break
+            }
+        }
+
+        let tail = reachedEnd ? starts.count : resume
+        starts.replace(first..<tail, with: newStarts, shiftingRestBy: delta)
+    }
+
+    /// Start of the line after the one starting at `position`, or nil when that line is the last.
+    private static func nextLineStart(in text: NSString, after position: Int) -> Int? {
+        var end = 0
+        var contentsEnd = 0
+        text.getLineStart(nil, end: &end, contentsEnd: &contentsEnd, for: NSRange(location: position, length: 0))
+        return end > contentsEnd ? end : nil
+    }
+}
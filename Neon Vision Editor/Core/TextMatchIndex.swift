@@ -0,0 +1,227 @@
+import Foundation
+
+/// Every match of one find query in a document. The matches are found once, on a background
+/// queue, and then kept in step with edits, so stepping through them and reporting "N of M" is
+/// a binary search and Replace All needs no second scan.
+final class TextMatchIndex {
+    struct Query: Equatable {
+        var pattern: String
+        var usesRegex: Bool
+        var caseSensitive: Bool
+    }
+
+    private(set) var query: Query?
+    /// Sorted, non-overlapping match ranges. They describe the current text only while
+    /// `isCurrent` is true.
+    private(set) var matches: [NSRange] = []
+    private(set) var isCurrent = false
+
+    private var expression: NSRegularExpression?
+    // Advances with every edit and query change; searches started before it are redone
+    private var generation = 0
+    private var isSearching = false
+    private var snapshot: (() -> NSString)?
+    private var waiting: [(Result<[NSRange], Error>) -> Void] = []
+
+    private static let searchQueue = DispatchQueue(label: "TextMatchIndex.search", qos: .userInitiated)
+    // How far past an edit `applyEdit` searches for the old matches to line up again, in UTF-16
+    // code units; beyond it the matches are found again in the background
+    private static let rescanBudget = 64 * 1024
+
+    /// The compiled expression for a regex query, reused until the query changes.
+    func regularExpression(for query: Query) throws -> NSRegularExpression {
+        setQuery(query)
+        if let expression {
+            return expression
+        }
+        let compiled = try NSRegularExpression(pattern: query.pattern, options: query.caseSensitive ? [] : [.caseInsensitive])
+        expression = compiled
+        return compiled
+    }
+
+    /// Calls `completion` on the main queue with every match of `query`. Cached matches are
+    /// returned right away; otherwise `text` is asked for a snapshot of the document, which is
+    /// searched in the background. Fails only when a regex pattern does not compile.
+    func matches(for query: Query, in text: @escaping () -> NSString, completion: @escaping (Result<[NSRange], Error>) -> Void) {
+        setQuery(query)
+        if isCurrent {
+            completion(.success(matches))
+            return
+        }
+        if query.usesRegex {
+            do {
+                _ = try regularExpression(for: query)
+            } catch {
+                completion(.failure(error))
+                return
+            }
+        }
+        snapshot = text
+        waiting.append(completion)
+        startSearch()
+    }
+
+    /// Index of the match to select after `selection`: the first one at or past its end, wrapping
+    /// around to the first match. Empty matches at the selection itself are skipped.
+    func indexOfMatch(after selection: NSRange) -> Int? {
+        guard !matches.isEmpty else { return nil }
+        var low = 0
+        var high = matches.count
+        while low < high {
+            let mid = (low + high) / 2
+            if matches[mid].location < NSMaxRange(selection) {
+                low = mid + 1
+            } else {
+                high = mid
+            }
+        }
+        if low < matches.count && matches[low] == selection {
+            low += 1
+        }
+        return low < matches.count ? low : 0
+    }
+
+    /// Updates the matches for an edit (`editedRange` in post-edit coordinates, as
+    /// `NSTextStorage` reports it). The text after the edit is searched only until the old
+    /// matches line up again, and at most `rescanBudget` code units; past that the matches are
+    /// found again the next time they are needed.
+    func applyEdit(in text: NSString, editedRange: NSRange, changeInLength delta: Int) {
+        guard let query else { return }
+        generation += 1
+        guard isCurrent, !query.usesRegex else {
+            // A regex match can reach and look around arbitrarily far from the edit, so the
+            // matches are found again the next time they are needed.
+            invalidate()
+            return
+        }
+
+        let options = Self.compareOptions(for: query)
+        // Case-insensitive matches can be longer than the pattern (say "SS" for "ß")
+        let margin = 4 * (query.pattern as NSString).length
+        let editStart = min(max(0, editedRange.location), text.length)
+        let editEnd = min(NSMaxRange(editedRange), text.length)
+
+        // Matches ending well before the edit stay as they are
+        var scanStart = max(0, editStart - margin)
+        var low = 0
+        var high = matches.count
+        while low < high {
+            let mid = (low + high) / 2
+            if NSMaxRange(matches[mid]) > scanStart {
+                high = mid
+            } else {
+                low = mid + 1
+            }
+        }
+        let first = low
+        if first < matches.count {
+            scanStart = min(scanStart, matches[first].location)
+        }
+
+        // When every old match ends before the edit, the text after the edit held no occurrence,
+        // so only matches starting inside the edit can be new
+        let noMatchesAfterEdit = matches.last.map { NSMaxRange($0) <= editStart } ?? true
+        let limit = noMatchesAfterEdit
+            ? min(text.length, editEnd + margin)
+            : min(text.length, editEnd + margin + Self.rescanBudget)
+
+        // Search forward until a match past the edit lines up with an old one; from there on the
+        // old matches hold, shifted by `delta`.
+        var resume = first
+        var tail: Int?
+        var rescanned: [NSRange] = []
+        var position = scanStart
+        while let match = Self.nextLiteralMatch(of: query.pattern, options: options, in: text, from: position, before: limit) {
+            if match.location >= editEnd + margin {
+                while resume < matches.count && matches[resume].location + delta < match.location {
+                    resume += 1
+                }
+                if resume < matches.count
+                    && matches[resume].location + delta == match.location
+                    && matches[resume].length == match.length {
+                    tail = resume
+                    break
+                }
+            }
+            rescanned.append(match)
+            position = NSMaxRange(match)
+        }
+        if tail == nil && limit < text.length && !noMatchesAfterEdit {
+            // The old matches did not line up within the budget
+            invalidate()
+            return
+        }
+        let shifted = matches[(tail ?? matches.count)...].map { NSRange(location: $0.location + delta, length: $0.length) }
+        matches.replaceSubrange(first..., with: rescanned + shifted)
+    }
+
+    private func invalidate() {
+        isCurrent = false
+        matches.removeAll()
+    }
+
+    private func setQuery(_ query: Query) {
+        guard query != self.query else { return }
+        self.query = query
+        expression = nil
+        matches.removeAll()
+        isCurrent = false
+        generation += 1
+        // Callers waiting on the old query no longer want its results
+        waiting.removeAll()
+    }
+
+    private func startSearch() {
+        guard !isSearching, let query, let snapshot else { return }
+        isSearching = true
+        let generation = self.generation
+        let text = snapshot()
+        let expression = self.expression
+        Self.searchQueue.async {
+            let found = Self.findMatches(of: query, expression: expression, in: text)
+            DispatchQueue.main.async { [weak self] in
+                guard let self else { return }
+                self.isSearching = false
+                guard generation == self.generation else {
+                    // The text or the query changed while searching
+                    if !self.waiting.isEmpty {
+                        self.startSearch()
+                    }
+                    return
+                }
+                self.matches = found
+                self.isCurrent = true
+                let waiting = self.waiting
+                self.waiting.removeAll()
+                for completion in waiting {
+                    completion(.success(found))
+                }
+            }
+        }
+    }
+
+    nonisolated private static func findMatches(of query: Query, expression: NSRegularExpression?, in text: NSString) -> [NSRange] {
+        if let expression {
+            return expression.matches(in: text as String, range: NSRange(location: 0, length: text.length)).map(\.range)
+        }
+        let options = compareOptions(for: query)
+        var found: [NSRange] = []
+        var position = 0
+        while let match = nextLiteralMatch(of: query.pattern, options: options, in: text, from: position, before: text.length) {
+            found.append(match)
+            position = NSMaxRange(match)
+        }
+        return found
+    }
+
+    // The first match lying within `position..<limit`
+    nonisolated private static func nextLiteralMatch(of pattern: String, options: NSString.CompareOptions, in text: NSString, from position: Int, before limit: Int) -> NSRange? {
+        guard position < limit else { return nil }
+        let found = text.range(of: pattern, options: options, range: NSRange(location: position, length: limit - position))
+        return found.location == NSNotFound ? nil : found
+    }
+
+    nonisolated private static func compareOptions(for query: Query) -> NSString.CompareOptions {
+        query.caseSensitive ? [] : [.caseInsensitive]
+    }
+}
@@ -0,0 +1,333 @@
+import Foundation
+
+/// UTF-16 text kept as a balanced tree of small chunks. Every node caches the length and
+/// newline count of the text below it, so replacing a range, converting between offsets and
+/// line numbers and extracting a substring cost O(log n) plus the size of the text involved,
+/// however large the document is.
+///
+/// Offsets and ranges are in UTF-16 code units, as in `NSString`. Lines end at "\n", which
+/// also covers "\r\n"; a lone "\r" does not start a new line.
+nonisolated final class TextRope {
+    private final class Node {
+        // Leaves hold text; internal nodes hold children and no text. The empty rope is one
+        // empty leaf.
+        var chunk: [UInt16]
+        var children: [Node]
+        var length = 0
+        var newlineCount = 0
+
+        var isLeaf: Bool { children.isEmpty }
+
+        init(chunk: [UInt16]) {
+            self.chunk = chunk
+            self.children = []
+            updateMetrics()
+        }
+
+        init(children: [Node]) {
+            self.chunk = []
+            self.children = children
+            updateMetrics()
+        }
+
+        // Chunks are arrays, so the copy shares their storage until one side changes them
+        init(copying node: Node) {
+            chunk = node.chunk
+            children = node.children.map(Node.init(copying:))
+            length = node.length
+            newlineCount = node.newlineCount
+        }
+
+        func updateMetrics() {
+            if isLeaf {
+                length = chunk.count
+                newlineCount = TextRope.newlines(in: chunk[...])
+            } else {
+                length = 0
+                newlineCount = 0
+                for child in children {
+                    length += child.length
+                    newlineCount += child.newlineCount
+                }
+            }
+        }
+    }
+
+    private static let maxChunkLength = 2048
+    private static let maxChildCount = 16
+    private static let newline = UInt16(ascii: "\n")
+
+    private var root: Node
+
+    init(_ text: String = "") {
+        root = Self.tree(from: Self.leaves(from: Array(text.utf16)[...]))
+    }
+
+    private init(root: Node) {
+        self.root = root
+    }
+
+    /// A copy that shares its text with this rope, costing one node per chunk. Either rope can
+    /// be read on one queue while the other is edited on another.
+    func snapshot() -> TextRope {
+        TextRope(root: Node(copying: root))
+    }
+
+    /// Length in UTF-16 code units.
+    var length: Int { root.length }
+
+    /// Number of lines; text ending in a newline has an empty last line.
+    var lineCount: Int { root.newlineCount + 1 }
+
+    var string: String {
+        var units: [UInt16] = []
+        units.reserveCapacity(length)
+        forEachChunk { units.append(contentsOf: $0) }
+        return String(decoding: units, as: UTF16.self)
+    }
+
+    func substring(with range: NSRange) -> String {
+        precondition(range.location >= 0 && NSMaxRange(range) <= length, "range out of bounds")
+        var units: [UInt16] = []
+        units.reserveCapacity(range.length)
+        collect(range.location..<NSMaxRange(range), from: root, into: &units)
+        return String(decoding: units, as: UTF16.self)
+    }
+
+    /// Replaces `range` with `replacement`, the way `NSMutableString.replaceCharacters` does.
+    func replace(_ range: NSRange, with replacement: String) {
+        precondition(range.location >= 0 && NSMaxRange(range) <= length, "range out of bounds")
+        if range.length > 0 {
+            remove(range.location..<NSMaxRange(range), from: root)
+        }
+        let units = Array(replacement.utf16)
+        if !units.isEmpty {
+            let siblings = insert(units[...], at: range.location, into: root)
+            if !siblings.isEmpty {
+                root = Self.tree(from: [root] + siblings)
+            }
+        }
+        // Deletions can leave a chain of single-child nodes at the top
+        while root.children.count == 1 {
+            root = root.children[0]
+        }
+    }
+
+    // MARK: Lines
+
+    /// Zero-based index of the line containing `offset`. The offset of a newline belongs to the
+    /// line it ends; `length` belongs to the last line.
+    func lineIndex(containing offset: Int) -> Int {
+        precondition(offset >= 0 && offset <= length, "offset out of bounds")
+        var node = root
+        var remaining = offset
+        var line = 0
+        while !node.isLeaf {
+            var index = 0
+            while index < node.children.count - 1 && remaining >= node.children[index].length {
+                remaining -= node.children[index].length
+                line += node.children[index].newlineCount
+                index += 1
+            }
+            node = node.children[index]
+        }
+        return line + Self.newlines(in: node.chunk[..<min(remaining, node.chunk.count)])
+    }
+
+    /// Offset of the first code unit of line `line`, zero-based.
+    func lineStart(_ line: Int) -> Int {
+        precondition(line >= 0 && line < lineCount, "line out of bounds")
+        guard line > 0 else { return 0 }
+        // A line starts right after the `line`-th newline
+        var node = root
+        var remaining = line
+        var offset = 0
+        while !node.isLeaf {
+            var index = 0
+            while remaining > node.children[index].newlineCount {
+                remaining -= node.children[index].newlineCount
+                offset += node.children[index].length
+                index += 1
+            }
+            node = node.children[index]
+        }
+        for (index, unit) in node.chunk.enumerated() where unit == Self.newline {
+            remaining -= 1
+            if remaining == 0 {
+                return offset + index + 1
+            }
+        }
+        preconditionFailure("newline counts out of sync with the text")
+    }
+
+    /// Range of line `line` including its terminator, if it has one.
+    func lineRange(_ line: Int) -> NSRange {
+        let start = lineStart(line)
+        let end = line + 1 < lineCount ? lineStart(line + 1) : length
+        return NSRange(location: start, length: end - start)
+    }
+
+    /// Runs of spaces and tabs that end a line, before its "\n" or "\r\n" or at the end of the
+    /// text, in document order.
+    func trailingWhitespaceRanges() -> [NSRange] {
+        var ranges: [NSRange] = []
+        var runStart = -1
+        var offset = 0
+        forEachChunk { chunk in
+            for unit in chunk {
+                switch unit {
+                case UInt16(ascii: " "), UInt16(ascii: "\t"):
+                    if runStart < 0 { runStart = offset }
+                case Self.newline, UInt16(ascii: "\r"):
+                    if runStart >= 0 {
+                        ranges.append(NSRange(location: runStart, length: offset - runStart))
+                    }
+                    runStart = -1
+                default:
+                    runStart = -1
+                }
+                offset += 1
+            }
+        }
+        if runStart >= 0 {
+            ranges.append(NSRange(location: runStart, length: offset - runStart))
+        }
+        return ranges
+    }
+
+    // MARK: Tree maintenance
+
+    private func forEachChunk(_ body: (ArraySlice<UInt16>) -> Void) {
+        var stack = [root]
+        while let node = stack.popLast() {
+            if node.isLeaf {
+                body(node.chunk[...])
+            } else {
+                stack.append(contentsOf: node.children.reversed())
+            }
+        }
+    }
+
+    private func collect(_ range: Range<Int>, from node: Node, into units: inout [UInt16]) {
+        if node.isLeaf {
+            units.append(contentsOf: node.chunk[range])
+            return
+        }
+        var start = 0
+        for child in node.children {
+            let end = start + child.length
+            if end > range.lowerBound && start < range.upperBound {
+                let lower = max(range.lowerBound, start) - start
+                let upper = min(range.upperBound, end) - start
+                collect(lower..<upper, from: child, into: &units)
+            }
+            if end >= range.upperBound { break }
+            start = end
+        }
+    }
+
+    private func remove(_ range: Range<Int>, from node: Node) {
+        if node.isLeaf {
+            node.chunk.removeSubrange(range)
+            node.updateMetrics()
+            return
+        }
+        var start = 0
+        for child in node.children {
+            let end = start + child.length
+            if end > range.lowerBound && start < range.upperBound {
+                let lower = max(range.lowerBound, start) - start
+                let upper = min(range.upperBound, end) - start
+                remove(lower..<upper, from: child)
+            }
+            if end >= range.upperBound { break }
+            start = end
+        }
+        node.children.removeAll { $0.length == 0 }
+        Self.mergeSmallLeaves(in: node)
+        node.updateMetrics()
+    }
+
+    /// Inserts `units` at `offset` below `node` and returns any nodes split off it, which belong
+    /// right after it in its parent.
+    private func insert(_ units: ArraySlice<UInt16>, at offset: Int, into node: Node) -> [Node] {
+        if node.isLeaf {
+            guard node.chunk.count + units.count > Self.maxChunkLength else {
+                node.chunk.insert(contentsOf: units, at: offset)
+                node.updateMetrics()
+                return []
+            }
+            var combined = node.chunk[..<offset]
+            combined.append(contentsOf: units)
+            combined.append(contentsOf: node.chunk[offset...])
+            let leaves = Self.leaves(from: combined)
+            node.chunk = leaves[0].chunk
+            node.updateMetrics()
+            return Array(leaves.dropFirst())
+        }
+        var index = 0
+        var start = 0
+        while index < node.children.count - 1 && offset > start + node.children[index].length {
+            start += node.children[index].length
+            index += 1
+        }
+        let siblings = insert(units, at: offset - start, into: node.children[index])
+        node.children.insert(contentsOf: siblings, at: index + 1)
+        guard node.children.count > Self.maxChildCount else {
+            node.updateMetrics()
+            return []
+        }
+        let groups = Self.grouped(node.children)
+        node.children = groups[0]
+        node.updateMetrics()
+        return groups.dropFirst().map(Node.init(children:))
+    }
+
+    /// Joins neighbouring leaves that fit in one chunk, so deletions don't leave slivers behind.
+    private static func mergeSmallLeaves(in node: Node) {
+        var index = 0
+        while index + 1 < node.children.count {
+            let left = node.children[index]
+            let right = node.children[index + 1]
+            if left.isLeaf && right.isLeaf && left.chunk.count + right.chunk.count <= maxChunkLength / 2 {
+                left.chunk.append(contentsOf: right.chunk)
+                left.updateMetrics()
+                node.children.remove(at: index + 1)
+            } else {
+                index += 1
+            }
+        }
+    }
+
+    private static func leaves(from units: ArraySlice<UInt16>) -> [Node] {
+        guard !units.isEmpty else { return [Node(chunk: [])] }
+        // Evenly sized chunks, each at least half full
+        let count = (units.count + maxChunkLength - 1) / maxChunkLength
+        let size = (units.count + count - 1) / count
+        return stride(from: units.startIndex, to: units.endIndex, by: size).map { start in
+            Node(chunk: Array(units[start..<min(start + size, units.endIndex)]))
+        }
+    }
+
+    private static func grouped(_ nodes: [Node]) -> [[Node]] {
+        let count = (nodes.count + maxChildCount - 1) / maxChildCount
+        let size = (nodes.count + count - 1) / count
+        return stride(from: 0, to: nodes.count, by: size).map { Array(nodes[$0..<min($0 + size, nodes.count)]) }
+    }
+
+    private static func tree(from nodes: [Node]) -> Node {
+        var level = nodes
+        while level.count > 1 {
+            level = grouped(level).map(Node.init(children:))
+        }
+        return level[0]
+    }
+
+    private static func newlines(in units: ArraySlice<UInt16>) -> Int {
+        var count = 0
+        for unit in units where unit == newline {
+            count += 1
+        }
+        return count
+    }
+}
@@ -9,11 +9,28 @@ import UIKit
 struct TabData: Identifiable {
     let id = UUID()
     var name: String
-    var content: String
+    // Shared by reference: typing updates the buffer without copying the document or republishing `tabs`
+    let buffer: TextDocumentBuffer
     var language: String
     var fileURL: URL?
     var languageLocked: Bool = false
     var isDirty: Bool = false
+    // Modification date of `fileURL` when the tab was opened or last saved
+    var fileModificationDate: Date?
+    /// Set when `fileURL` changes on disk after that, until the tab is saved again.
+    var isChangedOnDisk: Bool = false
+
+    init(name: String, content: String, language: String, fileURL: URL?, languageLocked: Bool = false, isDirty: Bool = false) {
+        self.name = name
+        self.buffer = TextDocumentBuffer(text: content)
+        self.language = language
+        self.fileURL = fileURL
+        self.languageLocked = languageLocked
+        self.isDirty = isDirty
+    }
+
+    // Materializes the full text; prefer `buffer.changeCount` to detect changes
+    var content: String { buffer.text }
 }
 
 @MainActor
@@ -25,6 +42,13 @@ class EditorViewModel: ObservableObject {
     @Published var showingRename: Bool = false
     @Published var renameText: String = ""
     @Published var isLineWrapEnabled: Bool = true
+
+    private var contentGenerations: [UUID: Int] = [:]
+    // Edits per tab since its last detection request, what the detector updates its counts from
+    private var pendingDetectionEdits: [UUID: DetectionEdits] = [:]
+    private let detectionBases = LanguageDetectionBases()
+    private var pendingLanguageDetections: [UUID: DispatchWorkItem] = [:]
+    private let languageDetectionQueue = DispatchQueue(label: "NeonVision.LanguageDetection", qos: .utility)
     
     var selectedTab: TabData? {
         get { tabs.first(where: { $0.id == selectedTabID }) }
@@ -99,6 +123,7 @@ class EditorViewModel: ObservableObject {
     
     func addNewTab() {
         let newTab = TabData(name: "Untitled \(tabs.count + 1)", content: "", language: "plain", fileURL: nil, languageLocked: true)
+        observeEdits(of: newTab)
         tabs.append(newTab)
         selectedTabID = newTab.id
     }
@@ -109,124 +134,269 @@ class EditorViewModel: ObservableObject {
         }
     }
     
+    /// Replaces a tab's text from outside the editor, e.g. templates and AI suggestions.
     func updateTabContent(tab: TabData, content: String) {
         if let index = tabs.firstIndex(where: { $0.id == tab.id }) {
-            let previous = tabs[index].content
-            tabs[index].content = content
-            if content != previous {
-                tabs[index].isDirty = true
+            guard content != tabs[index].content else { return }
+            tabs[index].buffer.replaceText(content)
+            tabs[index].isDirty = true
+            scheduleLanguageDetection(for: tabs[index].id)
+        }
+    }
+
+    private func observeEdits(of tab: TabData) {
+        tab.buffer.editContextMargin = LanguageDetector.editContextLength
+        tab.buffer.onEditContext = { [weak self, id = tab.id] context in
+            self?.recordDetectionEdit(context, tabID: id)
+        }
+        tab.buffer.onEdit = { [weak self, id = tab.id] in
+            self?.tabContentDidEdit(tabID: id)
+        }
+    }
+
+    private func recordDetectionEdit(_ context: TextDocumentBuffer.EditContext?, tabID: UUID) {
+        guard let context,
+              case .windows(var windows) = pendingDetectionEdits[tabID, default: .windows([])],
+              windows.count < Self.maxPendingDetectionEdits else {
+            pendingDetectionEdits[tabID] = .unknown
+            return
+        }
+        windows.append(LanguageDetector.EditWindow(removed: context.removed, inserted: context.inserted))
+        pendingDetectionEdits[tabID] = .windows(windows)
+    }
+
+    // Typing in the editor: only the first edit after a save republishes `tabs`, to show the dirty mark
+    private func tabContentDidEdit(tabID: UUID) {
+        guard let index = tabs.firstIndex(where: { $0.id == tabID }) else { return }
+        if !tabs[index].isDirty {
+            tabs[index].isDirty = true
+        }
+        scheduleLanguageDetection(for: tabID)
+    }
+
+    // Language detection runs off the main thread once typing pauses. Each edit bumps the tab's
+    // content generation; a result is applied only if no newer edit arrived in the meantime.
+    private func scheduleLanguageDetection(for tabID: UUID) {
+        let generation = (contentGenerations[tabID] ?? 0) + 1
+        contentGenerations[tabID] = generation
+        pendingLanguageDetections[tabID]?.cancel()
+
+        // The text is read once the pause is over, not per keystroke
+        let work = DispatchWorkItem { [weak self] in
+            self?.startLanguageDetection(for: tabID, generation: generation)
+        }
+        pendingLanguageDetections[tabID] = work
+        DispatchQueue.main.asyncAfter(deadline: .now() + 0.3, execute: work)
+    }
+
+    private func startLanguageDetection(for tabID: UUID, generation: Int) {
+        guard contentGenerations[tabID] == generation, let tab = tabs.first(where: { $0.id == tabID }) else { return }
+        let nameExt = URL(fileURLWithPath: tab.name).pathExtension.lowercased()
+        let request = LanguageDetectionRequest(
+            tabID: tab.id,
+            generation: generation,
+            text: tab.buffer.snapshot(),
+            name: tab.name,
+            fileURL: tab.fileURL,
+            nameLanguage: languageMap[nameExt],
+            language: tab.language,
+            languageLocked: tab.languageLocked,
+            edits: pendingDetectionEdits.removeValue(forKey: tab.id) ?? .windows([])
+        )
+        let bases = detectionBases
+        languageDetectionQueue.async { [weak self] in
+            // Built here rather than on the main thread, where it would stall typing in large tabs
+            let content = request.text.text
+            let decision = Self.resolveLanguage(for: request, content: content, bases: bases)
+            DispatchQueue.main.async { [weak self] in
+                self?.applyLanguageDecision(decision, for: request)
             }
+        }
+    }
 
-            let isLargeContent = (content as NSString).length >= 1_000_000
-            if isLargeContent {
-                let nameExt = URL(fileURLWithPath: tabs[index].name).pathExtension.lowercased()
-                if !tabs[index].languageLocked,
-                   let mapped = LanguageDetector.shared.preferredLanguage(for: tabs[index].fileURL) ??
-                                languageMap[nameExt] {
-                    tabs[index].language = mapped
+    private func applyLanguageDecision(_ decision: LanguageDecision, for request: LanguageDetectionRequest) {
+        guard contentGenerations[request.tabID] == request.generation,
+              let index = tabs.firstIndex(where: { $0.id == request.tabID }) else { return }
+        pendingLanguageDetections[request.tabID] = nil
+        // The user may have picked a language while detection was running
+        guard tabs[index].language == request.language, tabs[index].languageLocked == request.languageLocked else { return }
+        if tabs[index].language != decision.language {
+            tabs[index].language = decision.language
+        }
+        if tabs[index].languageLocked != decision.languageLocked {
+            tabs[index].languageLocked = decision.languageLocked
+        }
+    }
+
+    private struct LanguageDetectionRequest {
+        let tabID: UUID
+        let generation: Int
+        let text: TextDocumentBuffer.Snapshot
+        let name: String
+        let fileURL: URL?
+        let nameLanguage: String?
+        let language: String
+        let languageLocked: Bool
+        let edits: DetectionEdits
+    }
+
+    private enum DetectionEdits {
+        /// The text around each edit, in order.
+        case windows([LanguageDetector.EditWindow])
+        /// Some edit came without its context, so the text is compared with the one last scored.
+        case unknown
+    }
+
+    // Past this many edits between two detections, rescanning is cheaper than replaying them
+    private static let maxPendingDetectionEdits = 512
+
+    private struct LanguageDecision {
+        var language: String
+        var languageLocked: Bool
+    }
+
+    // Picks the tab's language and lock state for `request`, whose text is `content`, and updates
+    // the tab's entry in `bases`; runs on the detection queue.
+    nonisolated private static func resolveLanguage(for request: LanguageDetectionRequest, content: String, bases: LanguageDetectionBases) -> LanguageDecision {
+        var decision = LanguageDecision(language: request.language, languageLocked: request.languageLocked)
+
+        // Large content skips the token heuristics below; sampled detection reads a few windows
+        let isLargeContent = (content as NSString).length >= 1_000_000
+        if isLargeContent {
+            bases.states[request.tabID] = nil
+            bases.texts[request.tabID] = nil
+            if !request.languageLocked {
+                if let mapped = LanguageDetector.shared.preferredLanguage(for: request.fileURL) ?? request.nameLanguage {
+                    decision.language = mapped
+                } else {
+                    let result = LanguageDetector.shared.detectSampled(text: content, name: request.name, fileURL: request.fileURL)
+                    if result.lang != "plain" {
+                        decision.language = result.lang
+                    }
                 }
-                return
-            }
-            
-            // Early lock to Swift if clearly Swift-specific tokens are present
-            let lower = content.lowercased()
-            let swiftStrongTokens: Bool = (
-                lower.contains(" import swiftui") ||
-                lower.hasPrefix("import swiftui") ||
-                lower.contains("@main") ||
-                lower.contains(" final class ") ||
-                lower.contains("public final class ") ||
-                lower.contains(": view") ||
-                lower.contains("@published") ||
-                lower.contains("@stateobject") ||
-                lower.contains("@mainactor") ||
-                lower.contains("protocol ") ||
-                lower.contains("extension ") ||
-                lower.contains("import appkit") ||
-                lower.contains("import uikit") ||
-                lower.contains("import foundationmodels") ||
-                lower.contains("guard ") ||
-                lower.contains("if let ")
-            )
-            if swiftStrongTokens {
-                tabs[index].language = "swift"
-                tabs[index].languageLocked = true
-                return
             }
-            
-            if !tabs[index].languageLocked {
-                // If the tab name has a known extension, honor it and lock
-                let nameExt = URL(fileURLWithPath: tabs[index].name).pathExtension.lowercased()
-                if let extLang = languageMap[nameExt], !extLang.isEmpty {
-                    // If the extension suggests C# but content looks like Swift, prefer Swift and do not lock.
-                    if extLang == "csharp" {
-                        let looksSwift = lower.contains("import swiftui") || lower.contains(": view") || lower.contains("@main") || lower.contains(" final class ")
-                        if looksSwift {
-                            tabs[index].language = "swift"
-                            tabs[index].languageLocked = true
-                        } else {
-                            tabs[index].language = extLang
-                            tabs[index].languageLocked = true
-                        }
+            return decision
+        }
+        
+        // Signal counts are updated from the edits since the last detection rather than rescanned
+        let detector = LanguageDetector.shared
+        var state: LanguageDetector.DetectionState
+        let result: LanguageDetector.Result
+        switch (request.edits, bases.states[request.tabID], bases.texts[request.tabID]) {
+        case (.windows(let windows), let base?, _):
+            state = base
+            result = detector.detect(text: content, name: request.name, fileURL: request.fileURL, updating: &state, edits: windows)
+        case (.unknown, let base?, let previousText?):
+            state = base
+            result = detector.detect(text: content, name: request.name, fileURL: request.fileURL, updating: &state, previousText: previousText)
+        default:
+            state = detector.detectionState(for: content)
+            let unchanged = LanguageDetector.TextDelta(location: 0, removedLength: 0, insertedLength: 0)
+            result = detector.detect(text: content, name: request.name, fileURL: request.fileURL, updating: &state, previousText: content, delta: unchanged)
+        }
+        bases.states[request.tabID] = state
+        // Only tabs whose edits come without context need the text to compare against next time
+        if case .unknown = request.edits {
+            bases.texts[request.tabID] = content
+        } else {
+            bases.texts[request.tabID] = nil
+        }
+
+        // Early lock to Swift if clearly Swift-specific tokens are present
+        let swiftStrongTokens: Bool = (
+            state.contains(" import swiftui") ||
+            content.prefix(14).lowercased() == "import swiftui" ||
+            state.contains("@main") ||
+            state.contains(" final class ") ||
+            state.contains("public final class ") ||
+            state.contains(": view") ||
+            state.contains("@published") ||
+            state.contains("@stateobject") ||
+            state.contains("@mainactor") ||
+            state.contains("protocol ") ||
+            state.contains("extension ") ||
+            state.contains("import appkit") ||
+            state.contains("import uikit") ||
+            state.contains("import foundationmodels") ||
+            state.contains("guard ") ||
+            state.contains("if let ")
+        )
+        if swiftStrongTokens {
+            decision.language = "swift"
+            decision.languageLocked = true
+            return decision
+        }
+        
+        if !request.languageLocked {
+            // If the tab name has a known extension, honor it and lock
+            if let extLang = request.nameLanguage, !extLang.isEmpty {
+                // If the extension suggests C# but content looks like Swift, prefer Swift and do not lock.
+                if extLang == "csharp" {
+                    let looksSwift = state.contains("import swiftui") || state.contains(": view") || state.contains("@main") || state.contains(" final class ")
+                    if looksSwift {
+                        decision.language = "swift"
+                        decision.languageLocked = true
                     } else {
-                        tabs[index].language = extLang
-                        tabs[index].languageLocked = true
+                        decision.language = extLang
+                        decision.languageLocked = true
                     }
                 } else {
-                    let result = LanguageDetector.shared.detect(text: content, name: tabs[index].name, fileURL: tabs[index].fileURL)
-                    let detected = result.lang
-                    let scores = result.scores
-                    let current = tabs[index].language
-                    let swiftScore = scores["swift"] ?? 0
-                    let csharpScore = scores["csharp"] ?? 0
-
-                    // Derive strong Swift tokens and C# context similar to the detector to control switching behavior
-                    // (let lower = content.lowercased()) -- removed duplicate since defined above
-                    let swiftStrongTokens: Bool = (
-                        lower.contains(" final class ") ||
-                        lower.contains("public final class ") ||
-                        lower.contains(": view") ||
-                        lower.contains("@published") ||
-                        lower.contains("@stateobject") ||
-                        lower.contains("@mainactor") ||
-                        lower.contains("protocol ") ||
-                        lower.contains("extension ") ||
-                        lower.contains("import swiftui") ||
-                        lower.contains("import appkit") ||
-                        lower.contains("import uikit") ||
-                        lower.contains("import foundationmodels") ||
-                        lower.contains("guard ") ||
-                        lower.contains("if let ")
-                    )
-
-                    let hasUsingSystem = lower.contains("\nusing system;") || lower.contains("\nusing system.")
-                    let hasNamespace = lower.contains("\nnamespace ")
-                    let hasMainMethod = lower.contains("static void main(") || lower.contains("static int main(")
-                    let hasCSharpAttributes = (lower.contains("\n[") && lower.contains("]\n") && !lower.contains("@"))
-                    let csharpContext = hasUsingSystem || hasNamespace || hasMainMethod || hasCSharpAttributes
-
-                    // Avoid switching from Swift to C# unless there is very strong C# evidence and margin
-                    if current == "swift" && detected == "csharp" {
-                        let requireMargin = 25
-                        if swiftStrongTokens && !csharpContext {
-                            // Keep Swift when Swift-only tokens are present and no C# context exists
-                        } else if !(csharpContext && csharpScore >= swiftScore + requireMargin) {
-                            // Not enough evidence to switch away from Swift
-                        } else {
-                            tabs[index].language = "csharp"
-                            tabs[index].languageLocked = false
-                        }
+                    decision.language = extLang
+                    decision.languageLocked = true
+                }
+            } else {
+                let detected = result.lang
+                let scores = result.scores
+                let current = request.language
+                let swiftScore = scores["swift"] ?? 0
+                let csharpScore = scores["csharp"] ?? 0
+
+                // Derive strong Swift tokens and C# context similar to the detector to control switching behavior
+                let swiftStrongTokens: Bool = (
+                    state.contains(" final class ") ||
+                    state.contains("public final class ") ||
+                    state.contains(": view") ||
+                    state.contains("@published") ||
+                    state.contains("@stateobject") ||
+                    state.contains("@mainactor") ||
+                    state.contains("protocol ") ||
+                    state.contains("extension ") ||
+                    state.contains("import swiftui") ||
+                    state.contains("import appkit") ||
+                    state.contains("import uikit") ||
+                    state.contains("import foundationmodels") ||
+                    state.contains("guard ") ||
+                    state.contains("if let ")
+                )
+
+                let hasUsingSystem = state.contains("\nusing system;") || state.contains("\nusing system.")
+                let hasNamespace = state.contains("\nnamespace ")
+                let hasMainMethod = state.contains("static void main(") || state.contains("static int main(")
+                let hasCSharpAttributes = (state.contains("\n[") && state.contains("]\n") && !state.contains("@"))
+                let csharpContext = hasUsingSystem || hasNamespace || hasMainMethod || hasCSharpAttributes
+
+                // Avoid switching from Swift to C# unless there is very strong C# evidence and margin
+                if current == "swift" && detected == "csharp" {
+                    let requireMargin = 25
+                    if swiftStrongTokens && !csharpContext {
+                        // Keep Swift when Swift-only tokens are present and no C# context exists
+                    } else if !(csharpContext && csharpScore >= swiftScore + requireMargin) {
+                        // Not enough evidence to switch away from Swift
                     } else {
-                        // For all other cases, accept the detection
-                        tabs[index].language = detected
-                        // If Swift is confidently detected or Swift-only tokens are present, lock to prevent flip-flops
-                        if detected == "swift" && (result.confidence >= 5 || swiftStrongTokens) {
-                            tabs[index].languageLocked = true
-                        }
+                        decision.language = "csharp"
+                        decision.languageLocked = false
+                    }
+                } else {
+                    // For all other cases, accept the detection
+                    decision.language = detected
+                    // If Swift is confidently detected or Swift-only tokens are present, lock to prevent flip-flops
+                    if detected == "swift" && (result.confidence >= 5 || swiftStrongTokens) {
+                        decision.languageLocked = true
                     }
                 }
             }
         }
+        return decision
     }
     
     func updateTabLanguage(tab: TabData, language: String) {
@@ -238,6 +408,14 @@ class EditorViewModel: ObservableObject {
     
     func closeTab(tab: TabData) {
         tabs.removeAll { $0.id == tab.id }
+        pendingLanguageDetections.removeValue(forKey: tab.id)?.cancel()
+        contentGenerations[tab.id] = nil
+        pendingDetectionEdits[tab.id] = nil
+        let bases = detectionBases
+        languageDetectionQueue.async { [id = tab.id] in
+            bases.states[id] = nil
+            bases.texts[id] = nil
+        }
         if tabs.isEmpty {
             addNewTab()
         } else if selectedTabID == tab.id {
@@ -249,12 +427,10 @@ class EditorViewModel: ObservableObject {
         guard let index = tabs.firstIndex(where: { $0.id == tab.id }) else { return }
         if let url = tabs[index].fileURL {
             do {
-                let trimmed = trimTrailingWhitespaceIfNeeded(tabs[index].content)
-                if trimmed != tabs[index].content {
-                    tabs[index].content = trimmed
-                }
-                try trimmed.write(to: url, atomically: true, encoding: .utf8)
+                trimTrailingWhitespaceIfNeeded(in: tabs[index].buffer)
+                try tabs[index].content.write(to: url, atomically: true, encoding: .utf8)
                 tabs[index].isDirty = false
+                noteFileSaved(at: index)
             } catch {
                 debugLog("Failed to save file.")
             }
@@ -283,11 +459,8 @@ class EditorViewModel: ObservableObject {
 
         if panel.runModal() == .OK, let url = panel.url {
             do {
-                let trimmed = trimTrailingWhitespaceIfNeeded(tabs[index].content)
-                if trimmed != tabs[index].content {
-                    tabs[index].content = trimmed
-                }
-                try trimmed.write(to: url, atomically: true, encoding: .utf8)
+                trimTrailingWhitespaceIfNeeded(in: tabs[index].buffer)
+                try tabs[index].content.write(to: url, atomically: true, encoding: .utf8)
                 tabs[index].fileURL = url
                 tabs[index].name = url.lastPathComponent
                 if let mapped = LanguageDetector.shared.preferredLanguage(for: url) ?? languageMap[url.pathExtension.lowercased()] {
@@ -295,6 +468,7 @@ class EditorViewModel: ObservableObject {
                     tabs[index].languageLocked = true
                 }
                 tabs[index].isDirty = false
+                noteFileSaved(at: index)
             } catch {
                 debugLog("Failed to save file.")
             }
@@ -306,12 +480,10 @@ class EditorViewModel: ObservableObject {
 #endif
     }
 
-    private func trimTrailingWhitespaceIfNeeded(_ text: String) -> String {
+    private func trimTrailingWhitespaceIfNeeded(in buffer: TextDocumentBuffer) {
         let shouldTrim = UserDefaults.standard.bool(forKey: "SettingsTrimTrailingWhitespace")
-        guard shouldTrim else { return text }
-        let lines = text.components(separatedBy: .newlines)
-        let trimmed = lines.map { $0.replacingOccurrences(of: #"[\t ]+$"#, with: "", options: .regularExpression) }
-        return trimmed.joined(separator: "\n")
+        guard shouldTrim else { return }
+        buffer.trimTrailingWhitespace()
     }
     
     func openFile() {
@@ -338,13 +510,15 @@ class EditorViewModel: ObservableObject {
         do {
             let content = try String(contentsOf: url, encoding: .utf8)
             let extLang = LanguageDetector.shared.preferredLanguage(for: url) ?? languageMap[url.pathExtension.lowercased()]
-            let detectedLang = extLang ?? LanguageDetector.shared.detect(text: content, name: url.lastPathComponent, fileURL: url).lang
-            let newTab = TabData(name: url.lastPathComponent,
+            let detectedLang = extLang ?? LanguageDetector.shared.detectSampled(text: content, name: url.lastPathComponent, fileURL: url).lang
+            var newTab = TabData(name: url.lastPathComponent,
                                  content: content,
                                  language: detectedLang,
                                  fileURL: url,
                                  languageLocked: extLang != nil,
                                  isDirty: false)
+            newTab.fileModificationDate = Self.modificationDate(of: url)
+            observeEdits(of: newTab)
             tabs.append(newTab)
             selectedTabID = newTab.id
         } catch {
@@ -383,6 +557,30 @@ class EditorViewModel: ObservableObject {
             }
         }
         tabs[index].isDirty = false
+        noteFileSaved(at: index)
+    }
+
+    /// Flags open tabs whose file is among `urls` and no longer matches what was opened or saved.
+    func noteFilesChangedOnDisk(_ urls: Set<URL>) {
+        let paths = Set(urls.map { $0.resolvingSymlinksInPath().standardizedFileURL.path })
+        for index in tabs.indices where !tabs[index].isChangedOnDisk {
+            guard let fileURL = tabs[index].fileURL,
+                  paths.contains(fileURL.resolvingSymlinksInPath().standardizedFileURL.path) else { continue }
+            // Our own saves are reported too; they leave the recorded date matching
+            if Self.modificationDate(of: fileURL) != tabs[index].fileModificationDate {
+                tabs[index].isChangedOnDisk = true
+            }
+        }
+    }
+
+    private func noteFileSaved(at index: Int) {
+        tabs[index].fileModificationDate = tabs[index].fileURL.flatMap(Self.modificationDate(of:))
+        tabs[index].isChangedOnDisk = false
+    }
+
+    private static func modificationDate(of url: URL) -> Date? {
+        // Not a URL resource value: those are cached on the URL and would miss later changes
+        (try? FileManager.default.attributesOfItem(atPath: url.path))?[.modificationDate] as? Date
     }
     
     func wordCount(for text: String) -> Int {
@@ -396,3 +594,10 @@ class EditorViewModel: ObservableObject {
 #endif
     }
 }
+
+/// Running detection counts per tab, with the text they were counted from for tabs whose edits
+/// arrive without context. Touched only on the language detection queue.
+nonisolated private final class LanguageDetectionBases {
+    var states: [UUID: LanguageDetector.DetectionState] = [:]
+    var texts: [UUID: String] = [:]
+}
@@ -0,0 +1,220 @@
+import Foundation
+
+/// A tab's text, shared by reference between copies of its `TabData`. The text lives in a
+/// `TextRope`, so line lookups and edits stay cheap for multi-megabyte files; the `String` form
+/// is built on demand and cached until the next edit.
+///
+/// An attached editor either forwards each edit with `applyEdit(replacing:with:)`, keeping the
+/// rope current, or only reports that something changed with `noteEdit()`, in which case the
+/// text is read back from the editor the next time someone asks for it.
+final class TextDocumentBuffer {
+    private var storage: TextRope
+    private var cachedText: String?
+    private var isStorageCurrent = true
+    private var liveText: (() -> String?)?
+
+    /// Increases with every edit and every replacement, so views can tell whether they are current.
+    private(set) var changeCount = 0
+
+    /// A 1-based line for the next editor that shows this buffer to put the caret on, for
+    /// requests made before an editor has loaded the text. The editor clears it.
+    var pendingCaretLine: Int?
+
+    /// Called after each edit reported by the attached editor.
+    var onEdit: (() -> Void)?
+
+    /// While set, called before `onEdit` with the text around each change, or with nil when a
+    /// change cannot be described that way: edits only noted, replacements, and edits on lines
+    /// too long to copy per keystroke.
+    var onEditContext: ((EditContext?) -> Void)?
+    /// How many characters an `EditContext` includes on each side of its edit.
+    var editContextMargin = 0
+    private static let maxEditContextLength = 16 * 1024
+
+    // Started by the first `outline(for:)` and kept in step with every change after that
+    private var documentOutline: DocumentOutline?
+    private var isOutlineCurrent = false
+    private var pendingOutlineReset: DispatchWorkItem?
+
+    init(text: String = "") {
+        storage = TextRope(text)
+        cachedText = text
+    }
+
+    var text: String {
+        refreshFromEditor()
+        if let cachedText {
+            return cachedText
+        }
+        let text = storage.string
+        cachedText = text
+        return text
+    }
+
+    /// The text as a rope, for line-oriented work that should not copy the whole document.
+    var rope: TextRope {
+        refreshFromEditor()
+        return storage
+    }
+
+    /// The text as it is now, to be read on another queue while editing goes on. Taking it
+    /// copies no text: it shares the rope's chunks, or holds the editor's own copy when edits
+    /// were only noted, and the `String` is built wherever `text` is read.
+    func snapshot() -> Snapshot {
+        if let cachedText {
+            return Snapshot(string: cachedText, rope: nil)
+        }
+        if !isStorageCurrent, let live = liveText?() {
+            return Snapshot(string: live, rope: nil)
+        }
+        return Snapshot(string: nil, rope: storage.snapshot())
+    }
+
+    nonisolated struct Snapshot {
+        fileprivate let string: String?
+        fileprivate let rope: TextRope?
+
+        var text: String { string ?? rope?.string ?? "" }
+    }
+
+    /// The text around one edit, before and after it: the whole lines covering the replaced
+    /// range widened by `editContextMargin` characters on each side. The rest of the document
+    /// reads the same before and after the edit.
+    struct EditContext {
+        let removed: String
+        let inserted: String
+    }
+
+    /// Replaces the text from outside the editor; an attached editor loads it on its next update.
+    func replaceText(_ text: String) {
+        storage = TextRope(text)
+        cachedText = text
+        isStorageCurrent = true
+        changeCount += 1
+        resetOutline()
+        onEditContext?(nil)
+    }
+
+    /// Records an edit made in the attached editor: `range` of the previous text now reads
+    /// `replacement`.
+    func applyEdit(replacing range: NSRange, with replacement: String) {
+        // Text read back from the editor already contains the edit
+        if isStorageCurrent {
+            let removed = onEditContext == nil ? nil : contextRange(around: range.location, NSMaxRange(range)).map { storage.substring(with: $0) }
+            storage.replace(range, with: replacement)
+            if let onEditContext {
+                var context: EditContext?
+                if let removed, let inserted = contextRange(around: range.location, range.location + replacement.utf16.count) {
+                    context = EditContext(removed: removed, inserted: storage.substring(with: inserted))
+                }
+                onEditContext(context)
+            }
+        } else {
+            onEditContext?(nil)
+        }
+        cachedText = nil
+        changeCount += 1
+        recordOutlineEdit(replacing: range, with: replacement)
+        onEdit?()
+    }
+
+    /// Records an edit made in the attached editor without copying the document.
+    func noteEdit() {
+        isStorageCurrent = false
+        cachedText = nil
+        changeCount += 1
+        scheduleOutlineReset()
+        onEditContext?(nil)
+        onEdit?()
+    }
+
+    /// Removes spaces and tabs at the ends of lines, leaving line endings as they are. Returns
+    /// whether anything changed; an attached editor loads the result on its next update.
+    @discardableResult
+    func trimTrailingWhitespace() -> Bool {
+        let ranges = rope.trailingWhitespaceRanges()
+        guard !ranges.isEmpty else { return false }
+        // Back to front, so earlier ranges keep their offsets
+        for range in ranges.reversed() {
+            storage.replace(range, with: "")
+        }
+        cachedText = nil
+        changeCount += 1
+        for range in ranges.reversed() {
+            recordOutlineEdit(replacing: range, with: "")
+        }
+        onEditContext?(nil)
+        return true
+    }
+
+    /// The outline of the text in `language`, started on first use and updated with each edit
+    /// from then on.
+    func outline(for language: String) -> DocumentOutline {
+        if let documentOutline {
+            documentOutline.setLanguage(language)
+            return documentOutline
+        }
+        let outline = DocumentOutline(language: language)
+        documentOutline = outline
+        resetOutline()
+        return outline
+    }
+
+    /// Makes `liveText` the source of the text until `detach()`. It returns nil once the editor
+    /// is gone, in which case the last stored text is kept.
+    func attach(liveText: @escaping () -> String?) {
+        refreshFromEditor()
+        self.liveText = liveText
+    }
+
+    /// Stores the editor's current text and stops reading from it.
+    func detach() {
+        refreshFromEditor()
+        liveText = nil
+    }
+
+    private func refreshFromEditor() {
+        if !isStorageCurrent, let live = liveText?() {
+            storage = TextRope(live)
+            cachedText = live
+        }
+        isStorageCurrent = true
+    }
+
+    // The whole lines of the stored text covering `lower..<upper` widened by `editContextMargin`,
+    // or nil when they are longer than `maxEditContextLength`
+    private func contextRange(around lower: Int, _ upper: Int) -> NSRange? {
+        let firstLine = storage.lineIndex(containing: max(0, lower - editContextMargin))
+        let lastLine = storage.lineIndex(containing: min(storage.length, upper + editContextMargin))
+        let start = storage.lineStart(firstLine)
+        let end = NSMaxRange(storage.lineRange(lastLine))
+        guard end - start <= Self.maxEditContextLength else { return nil }
+        return NSRange(location: start, length: end - start)
+    }
+
+    private func recordOutlineEdit(replacing range: NSRange, with replacement: String) {
+        // A reset is on its way and will include the edit
+        guard isOutlineCurrent else { return }
+        documentOutline?.applyEdit(replacing: range, with: replacement, generation: changeCount)
+    }
+
+    /// Without the edits themselves the outline is rescanned, once typing pauses.
+    private func scheduleOutlineReset() {
+        guard documentOutline != nil else { return }
+        isOutlineCurrent = false
+        pendingOutlineReset?.cancel()
+        let work = DispatchWorkItem { [weak self] in
+            self?.resetOutline()
+        }
+        pendingOutlineReset = work
+        DispatchQueue.main.asyncAfter(deadline: .now() + 0.3, execute: work)
+    }
+
+    private func resetOutline() {
+        guard let documentOutline else { return }
+        pendingOutlineReset?.cancel()
+        pendingOutlineReset = nil
+        isOutlineCurrent = true
+        documentOutline.reset(text: text, generation: changeCount)
+    }
+}
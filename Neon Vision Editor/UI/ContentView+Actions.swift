@@ -27,8 +27,7 @@ extension ContentView {
             }
         }
         iosExportTabID = tab.id
-        let exportText = trimTrailingWhitespaceIfNeeded(tab.content)
-        iosExportDocument = PlainTextDocument(text: exportText)
+        iosExportDocument = PlainTextDocument(text: exportText(of: tab))
         iosExportFilename = suggestedExportFilename(for: tab)
         showIOSFileExporter = true
 #endif
@@ -75,12 +74,13 @@ extension ContentView {
         return "\(tab.name).txt"
     }
 
-    private func trimTrailingWhitespaceIfNeeded(_ text: String) -> String {
+    private func exportText(of tab: TabData) -> String {
         let shouldTrim = UserDefaults.standard.bool(forKey: "SettingsTrimTrailingWhitespace")
-        guard shouldTrim else { return text }
-        let lines = text.components(separatedBy: .newlines)
-        let trimmed = lines.map { $0.replacingOccurrences(of: #"[\t ]+$"#, with: "", options: .regularExpression) }
-        return trimmed.joined(separator: "\n")
+        guard shouldTrim else { return tab.content }
+        // Only the exported copy is trimmed; the open document and its undo history stay as they are
+        let copy = TextDocumentBuffer(text: tab.content)
+        copy.trimTrailingWhitespace()
+        return copy.text
     }
 #endif
 
@@ -148,35 +148,21 @@ extension ContentView {
 #if os(macOS)
         guard !findQuery.isEmpty, let tv = activeEditorTextView() else { return }
         findStatusMessage = ""
-        let ns = tv.string as NSString
-        let start = tv.selectedRange().upperBound
-        let forwardRange = NSRange(location: start, length: max(0, ns.length - start))
-        let wrapRange = NSRange(location: 0, length: max(0, start))
-
-        if findUsesRegex {
-            guard let regex = try? NSRegularExpression(pattern: findQuery, options: findCaseSensitive ? [] : [.caseInsensitive]) else {
+        tv.findMatches.matches(for: currentFindQuery, in: { [weak tv] in (tv?.string ?? "") as NSString }) { result in
+            guard case .success(let matches) = result else {
                 findStatusMessage = "Invalid regex pattern"
                 NSSound.beep()
                 return
             }
-            let forwardMatch = regex.firstMatch(in: tv.string, options: [], range: forwardRange)
-            let wrapMatch = regex.firstMatch(in: tv.string, options: [], range: wrapRange)
-            if let match = forwardMatch ?? wrapMatch {
-                tv.setSelectedRange(match.range)
-                tv.scrollRangeToVisible(match.range)
-            } else {
-                findStatusMessage = "No matches found"
-                NSSound.beep()
-            }
-        } else {
-            let opts: NSString.CompareOptions = findCaseSensitive ? [] : [.caseInsensitive]
-            if let range = ns.range(of: findQuery, options: opts, range: forwardRange).toOptional() ?? ns.range(of: findQuery, options: opts, range: wrapRange).toOptional() {
-                tv.setSelectedRange(range)
-                tv.scrollRangeToVisible(range)
-            } else {
+            guard let index = tv.findMatches.indexOfMatch(after: tv.selectedRange()) else {
                 findStatusMessage = "No matches found"
                 NSSound.beep()
+                return
             }
+            let range = matches[index]
+            tv.setSelectedRange(range)
+            tv.scrollRangeToVisible(range)
+            findStatusMessage = "\(index + 1) of \(matches.count)"
         }
 #else
         findStatusMessage = "Find next is currently available on macOS editor."
@@ -190,7 +176,7 @@ extension ContentView {
         guard sel.length > 0 else { return }
         let selectedText = (tv.string as NSString).substring(with: sel)
         if findUsesRegex {
-            guard let regex = try? NSRegularExpression(pattern: findQuery, options: findCaseSensitive ? [] : [.caseInsensitive]) else {
+            guard let regex = try? tv.findMatches.regularExpression(for: currentFindQuery) else {
                 findStatusMessage = "Invalid regex pattern"
                 NSSound.beep()
                 return
@@ -216,45 +202,39 @@ extension ContentView {
 #if os(macOS)
         guard let tv = activeEditorTextView(), !findQuery.isEmpty else { return }
         findStatusMessage = ""
-        let original = tv.string
-
-        if findUsesRegex {
-            guard let regex = try? NSRegularExpression(pattern: findQuery, options: findCaseSensitive ? [] : [.caseInsensitive]) else {
+        let query = currentFindQuery
+        let template = replaceQuery
+        tv.findMatches.matches(for: query, in: { [weak tv] in (tv?.string ?? "") as NSString }) { result in
+            guard case .success(let matches) = result else {
                 findStatusMessage = "Invalid regex pattern"
                 NSSound.beep()
                 return
             }
-            let fullRange = NSRange(location: 0, length: (original as NSString).length)
-            let count = regex.numberOfMatches(in: original, options: [], range: fullRange)
-            guard count > 0 else {
+            guard !matches.isEmpty, let storage = tv.textStorage else {
                 findStatusMessage = "No matches found"
                 NSSound.beep()
                 return
             }
-            let updated = regex.stringByReplacingMatches(in: original, options: [], range: fullRange, withTemplate: replaceQuery)
-            tv.string = updated
-            tv.didChangeText()
-            findStatusMessage = "Replaced \(count) matches"
-        } else {
-            let opts: NSString.CompareOptions = findCaseSensitive ? [] : [.caseInsensitive]
-            let nsOriginal = original as NSString
-            var count = 0
-            var searchLocation = 0
-            while searchLocation < nsOriginal.length {
-                let r = nsOriginal.range(of: findQuery, options: opts, range: NSRange(location: searchLocation, length: nsOriginal.length - searchLocation))
-                if r.location == NSNotFound { break }
-                count += 1
-                searchLocation = max(r.location + max(r.length, 1), searchLocation + 1)
+            let original = tv.string
+            var replacements = Array(repeating: template, count: matches.count)
+            if query.usesRegex, let regex = try? tv.findMatches.regularExpression(for: query) {
+                // Match again in place to expand capture groups in the template
+                let options: NSRegularExpression.MatchingOptions = [.anchored, .withTransparentBounds, .withoutAnchoringBounds]
+                for (index, range) in matches.enumerated() {
+                    if let match = regex.firstMatch(in: original, options: options, range: range) {
+                        replacements[index] = regex.replacementString(for: match, in: original, offset: 0, template: template)
+                    }
+                }
             }
-            guard count > 0 else {
-                findStatusMessage = "No matches found"
-                NSSound.beep()
-                return
+            // One storage edit and one undo step for all replacements, instead of resetting the text
+            guard tv.shouldChangeText(inRanges: matches.map { NSValue(range: $0) }, replacementStrings: replacements) else { return }
+            storage.beginEditing()
+            for (range, replacement) in zip(matches, replacements).reversed() {
+                storage.replaceCharacters(in: range, with: replacement)
             }
-            let updated = nsOriginal.replacingOccurrences(of: findQuery, with: replaceQuery, options: opts, range: NSRange(location: 0, length: nsOriginal.length))
-            tv.string = updated
+            storage.endEditing()
             tv.didChangeText()
-            findStatusMessage = "Replaced \(count) matches"
+            findStatusMessage = "Replaced \(matches.count) matches"
         }
 #else
         guard !findQuery.isEmpty else { return }
@@ -287,10 +267,15 @@ extension ContentView {
     }
 
 #if os(macOS)
-    private func activeEditorTextView() -> NSTextView? {
+    private var currentFindQuery: TextMatchIndex.Query {
+        TextMatchIndex.Query(pattern: findQuery, usesRegex: findUsesRegex, caseSensitive: findCaseSensitive)
+    }
+
+    // Only editor text views count; the Find panel's own fields are text views too
+    private func activeEditorTextView() -> AcceptingTextView? {
         let windows = ([NSApp.keyWindow, NSApp.mainWindow].compactMap { $0 }) + NSApp.windows
         for window in windows {
-            if let tv = window.firstResponder as? NSTextView, tv.isEditable {
+            if let tv = window.firstResponder as? AcceptingTextView, tv.isEditable {
                 return tv
             }
             if let found = findTextView(in: window.contentView) {
@@ -300,12 +285,12 @@ extension ContentView {
         return nil
     }
 
-    private func findTextView(in view: NSView?) -> NSTextView? {
+    private func findTextView(in view: NSView?) -> AcceptingTextView? {
         guard let view else { return nil }
-        if let scroll = view as? NSScrollView, let tv = scroll.documentView as? NSTextView, tv.isEditable {
+        if let scroll = view as? NSScrollView, let tv = scroll.documentView as? AcceptingTextView, tv.isEditable {
             return tv
         }
-        if let tv = view as? NSTextView, tv.isEditable {
+        if let tv = view as? AcceptingTextView, tv.isEditable {
             return tv
         }
         for subview in view.subviews {
@@ -348,7 +333,7 @@ extension ContentView {
 
     func refreshProjectTree() {
         guard let root = projectRootFolderURL else { return }
-        projectTreeNodes = buildProjectTree(at: root)
+        loadProjectTree(at: root)
     }
 
     func openProjectFile(url: URL) {
@@ -359,53 +344,122 @@ extension ContentView {
         viewModel.openFile(url: url)
     }
 
-    private func buildProjectTree(at root: URL) -> [ProjectTreeNode] {
-        var isDir: ObjCBool = false
-        guard FileManager.default.fileExists(atPath: root.path, isDirectory: &isDir), isDir.boolValue else { return [] }
-        return readChildren(of: root)
+    /// Lists the root folder for the sidebar and collects the file list for Quick Open and
+    /// Find in Project, both in the background. Subfolders are listed as they are expanded.
+    private func loadProjectTree(at root: URL) {
+        projectTreeLoader.reset()
+        projectTreeNodes = []
+        projectFiles = []
+        projectTreeLoader.loadChildren(of: root) { projectTreeNodes = $0 }
+        // The saved index serves Quick Open until the folder has been walked again
+        projectFileIndex.open(root: root)
+        projectTreeLoader.loadFileList(under: root) { files in
+            projectFiles = files
+            projectFileIndex.update(files: files)
+        }
+        updateWatchedDirectories()
     }
 
-    func setProjectFolder(_ folderURL: URL) {
-#if canImport(UIKit)
-        if let previous = projectFolderSecurityURL {
-            previous.stopAccessingSecurityScopedResource()
+    /// Watches the project folder, plus the folders of open files outside it.
+    func updateWatchedDirectories() {
+        var directories: [URL] = []
+        if let root = projectRootFolderURL {
+            directories.append(root)
         }
-        if folderURL.startAccessingSecurityScopedResource() {
-            projectFolderSecurityURL = folderURL
+        for case let fileURL? in viewModel.tabs.map(\.fileURL) {
+            let directory = fileURL.deletingLastPathComponent()
+            if !directories.contains(where: { directory.path == $0.path || directory.path.hasPrefix($0.path + "/") }) {
+                directories.append(directory)
+            }
         }
-#endif
-        projectRootFolderURL = folderURL
-        projectTreeNodes = buildProjectTree(at: folderURL)
+        projectFileWatcher.watch(directories) { handleFileSystemChanges($0) }
     }
 
-    private func readChildren(of directory: URL) -> [ProjectTreeNode] {
-        let fm = FileManager.default
-        let keys: [URLResourceKey] = [.isDirectoryKey, .isHiddenKey, .nameKey]
-        guard let urls = try? fm.contentsOfDirectory(at: directory, includingPropertiesForKeys: keys, options: [.skipsPackageDescendants, .skipsSubdirectoryDescendants]) else {
-            return []
-        }
+    /// Patches the tree and file list for paths that changed on disk: only folders already
+    /// listed in the tree are listed again, and loaded subfolders keep their contents.
+    private func handleFileSystemChanges(_ urls: Set<URL>) {
+        viewModel.noteFilesChangedOnDisk(urls)
+        guard let root = projectRootFolderURL else { return }
+        let changed = Set(urls.map { projectURL(for: $0, root: root) })
 
-        let sorted = urls.sorted { $0.lastPathComponent.localizedCaseInsensitiveCompare($1.lastPathComponent) == .orderedAscending }
-        var nodes: [ProjectTreeNode] = []
-        for url in sorted {
-            guard let values = try? url.resourceValues(forKeys: Set(keys)) else { continue }
-            if values.isHidden == true { continue }
-            let isDirectory = values.isDirectory == true
-            let children = isDirectory ? readChildren(of: url) : []
-            nodes.append(ProjectTreeNode(url: url, isDirectory: isDirectory, children: children))
+        var listedDirectories = listedDirectoryPaths(in: projectTreeNodes)
+        listedDirectories.insert(root.path)
+        let directories = Set(changed.map { $0.deletingLastPathComponent().path }).filter(listedDirectories.contains)
+        if !directories.isEmpty {
+            projectTreeLoader.reloadChildren(of: directories.map { URL(fileURLWithPath: $0, isDirectory: true) }) { listings in
+                for (path, listing) in listings {
+                    if path == root.path {
+                        projectTreeNodes = merging(listing, into: projectTreeNodes)
+                    } else {
+                        projectTreeNodes = settingChildren(listing, ofDirectoryAt: path, in: projectTreeNodes)
+                    }
+                }
+            }
+        }
+        projectTreeLoader.updateFileList(under: root, changedPaths: changed) { files in
+            projectFiles = files
+            projectFileIndex.update(files: files, changedPaths: changed)
         }
-        return nodes
     }
 
-    func projectFileURLs(from nodes: [ProjectTreeNode]) -> [URL] {
-        var results: [URL] = []
+    /// `url` spelled under `root` as the tree spells it; file events report resolved paths.
+    private func projectURL(for url: URL, root: URL) -> URL {
+        let resolvedRoot = root.resolvingSymlinksInPath().path
+        guard resolvedRoot != root.path, url.path.hasPrefix(resolvedRoot + "/") else { return url }
+        return URL(fileURLWithPath: root.path + url.path.dropFirst(resolvedRoot.count))
+    }
+
+    private func listedDirectoryPaths(in nodes: [ProjectTreeNode]) -> Set<String> {
+        var paths: Set<String> = []
         for node in nodes {
-            if node.isDirectory {
-                results.append(contentsOf: projectFileURLs(from: node.children))
-            } else {
-                results.append(node.url)
+            guard let children = node.children, node.isDirectory else { continue }
+            paths.insert(node.id)
+            paths.formUnion(listedDirectoryPaths(in: children))
+        }
+        return paths
+    }
+
+    func loadProjectDirectory(_ directory: URL) {
+        projectTreeLoader.loadChildren(of: directory) { children in
+            projectTreeNodes = settingChildren(children, ofDirectoryAt: directory.path, in: projectTreeNodes)
+        }
+    }
+
+    private func settingChildren(_ children: [ProjectTreeNode], ofDirectoryAt path: String, in nodes: [ProjectTreeNode]) -> [ProjectTreeNode] {
+        nodes.map { node in
+            guard node.isDirectory else { return node }
+            var node = node
+            if node.id == path {
+                node.children = merging(children, into: node.children)
+            } else if path.hasPrefix(node.id + "/"), let existing = node.children {
+                node.children = settingChildren(children, ofDirectoryAt: path, in: existing)
             }
+            return node
+        }
+    }
+
+    /// `listing` with the contents of subfolders that were already listed carried over.
+    private func merging(_ listing: [ProjectTreeNode], into existing: [ProjectTreeNode]?) -> [ProjectTreeNode] {
+        guard let existing else { return listing }
+        let existingByID = Dictionary(existing.map { ($0.id, $0) }, uniquingKeysWith: { first, _ in first })
+        return listing.map { node in
+            guard node.isDirectory, let previous = existingByID[node.id], previous.isDirectory else { return node }
+            var node = node
+            node.children = previous.children
+            return node
+        }
+    }
+
+    func setProjectFolder(_ folderURL: URL) {
+#if canImport(UIKit)
+        if let previous = projectFolderSecurityURL {
+            previous.stopAccessingSecurityScopedResource()
+        }
+        if folderURL.startAccessingSecurityScopedResource() {
+            projectFolderSecurityURL = folderURL
         }
-        return results
+#endif
+        projectRootFolderURL = folderURL
+        loadProjectTree(at: folderURL)
     }
 }
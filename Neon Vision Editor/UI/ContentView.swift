@@ -91,6 +91,13 @@ struct ContentView: View {
     @State var showCompactSidebarSheet: Bool = false
     @State var projectRootFolderURL: URL? = nil
     @State var projectTreeNodes: [ProjectTreeNode] = []
+    @State var projectFiles: [URL] = []
+    @State var projectTreeLoader = ProjectTreeLoader()
+    @State var projectFileWatcher = ProjectFileWatcher()
+    @State var projectFileIndex = ProjectFileIndex()
+    @State var quickSwitcherFileMatches: [(item: QuickFileSwitcherPanel.Item, score: Int)] = []
+    // Most recently selected first, for ranking tabs in Quick Open
+    @State var recentTabIDs: [UUID] = []
     @State var showProjectFolderPicker: Bool = false
     @State var projectFolderSecurityURL: URL? = nil
     @State var pendingCloseTabID: UUID? = nil
@@ -103,6 +110,7 @@ struct ContentView: View {
     @State var iosExportTabID: UUID? = nil
     @State var showQuickSwitcher: Bool = false
     @State var quickSwitcherQuery: String = ""
+    @State var showProjectSearch: Bool = false
     @State var vimModeEnabled: Bool = UserDefaults.standard.bool(forKey: "EditorVimModeEnabled")
     @State var vimInsertMode: Bool = true
     @State var droppedFileLoadInProgress: Bool = false
@@ -824,8 +832,13 @@ struct ContentView: View {
             .onReceive(NotificationCenter.default.publisher(for: .showQuickSwitcherRequested)) { notif in
                 guard matchesCurrentWindow(notif) else { return }
                 quickSwitcherQuery = ""
+                refreshQuickSwitcherFileMatches()
                 showQuickSwitcher = true
             }
+            .onReceive(NotificationCenter.default.publisher(for: .showProjectSearchRequested)) { notif in
+                guard matchesCurrentWindow(notif) else { return }
+                showProjectSearch = true
+            }
             .onReceive(NotificationCenter.default.publisher(for: .showWelcomeTourRequested)) { notif in
                 guard matchesCurrentWindow(notif) else { return }
                 showWelcomeTour = true
@@ -980,7 +993,7 @@ struct ContentView: View {
 #if os(iOS)
         .sheet(isPresented: $showCompactSidebarSheet) {
             NavigationStack {
-                SidebarView(content: currentContent, language: currentLanguage)
+                SidebarView(buffer: viewModel.selectedTab?.buffer, language: currentLanguage)
                     .navigationTitle("Sidebar")
                     .toolbar {
                         ToolbarItem(placement: .topBarTrailing) {
@@ -1011,6 +1024,12 @@ struct ContentView: View {
                 onSelect: { selectQuickSwitcherItem($0) }
             )
         }
+        .sheet(isPresented: $showProjectSearch) {
+            ProjectSearchPanel(
+                fileURLs: projectFiles,
+                onSelect: { selectProjectSearchMatch($0) }
+            )
+        }
         .sheet(isPresented: $showLanguageSetupPrompt) {
             languageSetupSheet
         }
@@ -1104,7 +1123,7 @@ struct ContentView: View {
     @ViewBuilder
     var sidebarView: some View {
         if viewModel.showSidebar && !viewModel.isBrainDumpMode {
-            SidebarView(content: currentContent,
+            SidebarView(buffer: viewModel.selectedTab?.buffer,
                         language: currentLanguage)
                 .frame(minWidth: 200, idealWidth: 250, maxWidth: 600)
                 .animation(.spring(), value: viewModel.showSidebar)
@@ -1532,6 +1551,7 @@ struct ContentView: View {
                 // Single editor (no TabView)
                 CustomTextEditor(
                     text: currentContentBinding,
+                    documentBuffer: viewModel.selectedTab?.buffer,
                     language: currentLanguage,
                     colorScheme: colorScheme,
                     fontName: editorFontName,
@@ -1580,6 +1600,7 @@ struct ContentView: View {
                     onOpenFile: { openFileFromToolbar() },
                     onOpenFolder: { openProjectFolder() },
                     onOpenProjectFile: { openProjectFile(url: $0) },
+                    onLoadDirectory: { loadProjectDirectory($0) },
                     onRefreshTree: { refreshProjectTree() }
                 )
                 .frame(minWidth: 220, idealWidth: 260, maxWidth: 340)
@@ -1597,6 +1618,20 @@ struct ContentView: View {
         .onChange(of: enableTranslucentWindow) { _, newValue in
             applyWindowTranslucency(newValue)
         }
+        .onChange(of: viewModel.tabs.map(\.fileURL)) { _, _ in
+            updateWatchedDirectories()
+        }
+        .onChange(of: quickSwitcherQuery) { _, _ in
+            refreshQuickSwitcherFileMatches()
+        }
+        .onChange(of: viewModel.selectedTabID) { _, newValue in
+            guard let newValue else { return }
+            recentTabIDs.removeAll { $0 == newValue }
+            recentTabIDs.insert(newValue, at: 0)
+            if recentTabIDs.count > 50 {
+                recentTabIDs.removeLast()
+            }
+        }
         .toolbar {
             editorToolbarContent
         }
@@ -1689,6 +1724,13 @@ struct ContentView: View {
                         }
                         .buttonStyle(.plain)
 
+                        if tab.isChangedOnDisk {
+                            Image(systemName: "exclamationmark.arrow.circlepath")
+                                .font(.system(size: 10, weight: .semibold))
+                                .foregroundStyle(.orange)
+                                .help("\(tab.name) changed on disk")
+                        }
+
                         Button {
                             requestCloseTab(tab)
                         } label: {
@@ -1731,41 +1773,50 @@ struct ContentView: View {
         return "\(Int(clamped * 100))%"
     }
 
+    /// Open tabs and project files ranked together by `FuzzyMatch`; recently selected tabs get
+    /// a bonus. Without a query, tabs come first by recency, then recently modified files.
     private var quickSwitcherItems: [QuickFileSwitcherPanel.Item] {
-        var items: [QuickFileSwitcherPanel.Item] = []
         let fileURLSet = Set(viewModel.tabs.compactMap { $0.fileURL?.standardizedFileURL.path })
+        let query = Array(quickSwitcherQuery.trimmingCharacters(in: .whitespacesAndNewlines).lowercased().utf8)
+        var ranked: [(item: QuickFileSwitcherPanel.Item, score: Int)] = []
 
         for tab in viewModel.tabs {
-            let subtitle = tab.fileURL?.path ?? "Open tab"
-            items.append(
+            let text = tab.fileURL?.path ?? tab.name
+            guard let score = FuzzyMatch.score(query, text: text, key: text.lowercased()) else { continue }
+            let recency = recentTabIDs.firstIndex(of: tab.id).map { max(0, 40 - 8 * $0) } ?? 0
+            ranked.append((
                 QuickFileSwitcherPanel.Item(
                     id: "tab:\(tab.id.uuidString)",
                     title: tab.name,
-                    subtitle: subtitle
-                )
-            )
+                    subtitle: tab.fileURL?.path ?? "Open tab"
+                ),
+                score + recency
+            ))
         }
+        ranked.sort { $0.score > $1.score }
 
-        for url in projectFileURLs(from: projectTreeNodes) {
-            let standardized = url.standardizedFileURL.path
-            if fileURLSet.contains(standardized) { continue }
-            items.append(
-                QuickFileSwitcherPanel.Item(
-                    id: "file:\(standardized)",
-                    title: url.lastPathComponent,
-                    subtitle: standardized
-                )
-            )
+        // Project files were ranked against the index off the main thread
+        for match in quickSwitcherFileMatches where !fileURLSet.contains(match.item.subtitle) {
+            ranked.append(match)
+        }
+        if !query.isEmpty {
+            ranked.sort { $0.score > $1.score }
         }
+        return ranked.prefix(300).map(\.item)
+    }
 
-        let query = quickSwitcherQuery.trimmingCharacters(in: .whitespacesAndNewlines).lowercased()
-        guard !query.isEmpty else { return Array(items.prefix(300)) }
-        return Array(
-            items.filter {
-                $0.title.lowercased().contains(query) || $0.subtitle.lowercased().contains(query)
+    /// Queries the project file index for the current Quick Open text.
+    private func refreshQuickSwitcherFileMatches() {
+        projectFileIndex.search(quickSwitcherQuery, limit: 300) { root, matches in
+            guard let root else {
+                quickSwitcherFileMatches = []
+                return
             }
-            .prefix(300)
-        )
+            quickSwitcherFileMatches = matches.map { match in
+                let path = root.appendingPathComponent(match.entry.path).path
+                return (QuickFileSwitcherPanel.Item(id: "file:\(path)", title: match.entry.name, subtitle: path), match.score)
+            }
+        }
     }
 
     private func selectQuickSwitcherItem(_ item: QuickFileSwitcherPanel.Item) {
@@ -1782,4 +1833,18 @@ struct ContentView: View {
         }
     }
 
+    private func selectProjectSearchMatch(_ match: ProjectSearchMatch) {
+        let previousTabID = viewModel.selectedTabID
+        openProjectFile(url: match.url)
+        guard let tab = viewModel.selectedTab,
+              tab.fileURL?.standardizedFileURL == match.url.standardizedFileURL else { return }
+        if tab.id == previousTabID {
+            // The editor already shows the file
+            NotificationCenter.default.post(name: .moveCursorToLine, object: match.lineNumber)
+        } else {
+            // The editor moves the caret once it has loaded the tab's text
+            tab.buffer.pendingCaretLine = match.lineNumber
+        }
+    }
+
 }
@@ -26,6 +26,8 @@ final class AcceptingTextView: NSTextView {
     var indentStyle: String = "spaces"
     var indentWidth: Int = 4
     var highlightCurrentLine: Bool = true
+    // Matches of the Find & Replace query, kept in step with edits by the coordinator
+    let findMatches = TextMatchIndex()
 
     // We want the caret at the *start* of the paste.
     private var pendingPasteCaretLocation: Int?
@@ -725,6 +727,8 @@ final class PageGuideView: NSView {
 // NSViewRepresentable wrapper around NSTextView to integrate with SwiftUI.
 struct CustomTextEditor: NSViewRepresentable {
     @Binding var text: String
+    // When set, edits are reported to the buffer instead of copying the text into `text`
+    var documentBuffer: TextDocumentBuffer? = nil
     let language: String
     let colorScheme: ColorScheme
     let fontName: String
@@ -849,11 +853,13 @@ struct CustomTextEditor: NSViewRepresentable {
 
         // Configure the text view delegate
         textView.delegate = context.coordinator
+        // Storage edits drive the incremental highlight window
+        textView.textStorage?.delegate = context.coordinator
 
         // Install line number ruler
         scrollView.hasVerticalRuler = showLineNumbers && !isLargeFileMode
         scrollView.rulersVisible = showLineNumbers && !isLargeFileMode
-        scrollView.verticalRulerView = LineNumberRulerView(textView: textView)
+        scrollView.verticalRulerView = LineNumberRulerView(textView: textView, lineIndex: context.coordinator.lineIndex)
 
         let pageGuideView = PageGuideView(frame: scrollView.bounds)
         pageGuideView.autoresizingMask = [.width, .height]
@@ -876,6 +882,8 @@ struct CustomTextEditor: NSViewRepresentable {
             sv.window?.makeFirstResponder(tv)
         }
         context.coordinator.scheduleHighlightIfNeeded(currentText: text)
+        // Large documents highlight what is on screen, so scrolling drives more coloring
+        NotificationCenter.default.addObserver(context.coordinator, selector: #selector(Coordinator.viewportBoundsDidChange(_:)), name: NSView.boundsDidChangeNotification, object: scrollView.contentView)
 
         // Keep container width in sync when the scroll view resizes
         NotificationCenter.default.addObserver(forName: NSView.boundsDidChangeNotification, object: scrollView.contentView, queue: .main) { [weak textView, weak scrollView] _ in
@@ -899,7 +907,9 @@ struct CustomTextEditor: NSViewRepresentable {
             textView.isSelectable = true
             let acceptingView = textView as? AcceptingTextView
             let isDropApplyInFlight = acceptingView?.isApplyingDroppedContent ?? false
-            if !(acceptingView?.recentlyAcceptedInlineSuggestion ?? false),
+            if let documentBuffer {
+                context.coordinator.syncDocumentBuffer(documentBuffer, into: textView, canReplaceText: !(acceptingView?.recentlyAcceptedInlineSuggestion ?? false) && !isDropApplyInFlight)
+            } else if !(acceptingView?.recentlyAcceptedInlineSuggestion ?? false),
                !isDropApplyInFlight && textView.string != text {
                 textView.string = text
             }
@@ -909,14 +919,9 @@ struct CustomTextEditor: NSViewRepresentable {
             }
             let style = paragraphStyle()
             if textView.defaultParagraphStyle != style {
+                // Existing text is restyled by the next highlight pass, which sees the new line height
                 textView.defaultParagraphStyle = style
                 textView.typingAttributes[.paragraphStyle] = style
-                let nsLen = (textView.string as NSString).length
-                if nsLen <= 200_000, let storage = textView.textStorage {
-                    storage.beginEditing()
-                    storage.addAttribute(.paragraphStyle, value: style, range: NSRange(location: 0, length: nsLen))
-                    storage.endEditing()
-                }
             }
             let theme = currentEditorTheme(colorScheme: colorScheme)
             // Background color adjustments for translucency
@@ -981,9 +986,18 @@ struct CustomTextEditor: NSViewRepresentable {
         Coordinator(self)
     }
 
+    static func dismantleNSView(_ nsView: NSScrollView, coordinator: Coordinator) {
+        coordinator.attachedBuffer?.detach()
+    }
+
     // Coordinator: NSTextViewDelegate that bridges NSText changes to SwiftUI and manages highlighting.
-    class Coordinator: NSObject, NSTextViewDelegate {
+    class Coordinator: NSObject, NSTextViewDelegate, NSTextStorageDelegate {
         var parent: CustomTextEditor
+        private(set) weak var attachedBuffer: TextDocumentBuffer?
+        private var syncedBufferChangeCount = 0
+        private var isLoadingDocumentBuffer = false
+        // Line starts of the text view's text, shared with the line number ruler
+        let lineIndex = TextLineIndex()
         weak var textView: NSTextView?
         weak var pageGuideView: PageGuideView?
 
@@ -991,10 +1005,38 @@ struct CustomTextEditor: NSViewRepresentable {
         private let highlightQueue = DispatchQueue(label: "NeonVision.SyntaxHighlight", qos: .userInitiated)
         // Snapshots of last highlighted state to avoid redundant work
         private var pendingHighlight: DispatchWorkItem?
-        private var lastHighlightedText: String = ""
+        private var lastHighlightedGeneration: Int?
         private var lastLanguage: String?
         private var lastColorScheme: ColorScheme?
+        private var lastSyntaxColors: SyntaxColors?
         var lastLineHeight: CGFloat?
+        // Advanced on every character edit; highlight jobs compare it instead of the text itself.
+        private let textGeneration = SyntaxHighlightGeneration()
+        // Advanced whenever a new highlight pass is requested, cancelling the one in flight.
+        private let highlightRequestGeneration = SyntaxHighlightGeneration()
+        // Union of character ranges edited since the last applied highlight pass (current document coordinates).
+        private var pendingEditedRange: NSRange?
+        // Set when the viewport path handled the document, so the next regular pass recolors everything.
+        private var needsFullHighlight: Bool = true
+        // Line height the storage's paragraph style was last set for.
+        private var appliedLineHeight: CGFloat?
+        // Lexer start state per line, built by full passes and updated on every edit (main thread only).
+        private var lineStates: SyntaxLineStateTable?
+
+        // Viewport-first highlighting for documents above `viewportHighlightThreshold`
+        private static let viewportHighlightThreshold = 200_000
+        private let viewportMargin = 20_000
+        private let viewportFillBatchLength = 128 * 1024
+        // Up to this size the rest of the document is tokenized in one concurrent pass after the viewport.
+        private static let concurrentFillLimit = 5_000_000
+        private let viewportApplySliceTokenCount = 20_000
+        private let viewportFillQueue = DispatchQueue(label: "NeonVision.SyntaxHighlight.Fill", qos: .utility)
+        private var pendingViewportHighlight: DispatchWorkItem?
+        // Advanced on every scroll or edit; batches from an older generation stop and are dropped.
+        private let viewportGeneration = SyntaxHighlightGeneration()
+        private var viewportScheduledTextGeneration = -1
+        // Characters already colored for the current text/theme (current document coordinates).
+        private var highlightedCoverage = IndexSet()
 
         init(_ parent: CustomTextEditor) {
             self.parent = parent
@@ -1006,8 +1048,56 @@ struct CustomTextEditor: NSViewRepresentable {
             NotificationCenter.default.removeObserver(self)
         }
 
-        /// Schedules highlighting if text/language/theme changed. Skips very large documents
-        /// and defers when a modal sheet is presented.
+        // Track which characters changed so the next pass only re-tokenizes the affected window.
+        func textStorage(_ textStorage: NSTextStorage, didProcessEditing editedMask: NSTextStorage.EditActions, range editedRange: NSRange, changeInLength delta: Int) {
+            guard editedMask.contains(.editedCharacters) else { return }
+            textGeneration.advance()
+            lineIndex.applyEdit(in: textStorage.mutableString, editedRange: editedRange, changeInLength: delta)
+            (textView as? AcceptingTextView)?.findMatches.applyEdit(in: textStorage.mutableString, editedRange: editedRange, changeInLength: delta)
+            if let buffer = attachedBuffer, !isLoadingDocumentBuffer {
+                // Keep the document in step edit by edit instead of copying it after each keystroke
+                let replacedRange = NSRange(location: editedRange.location, length: editedRange.length - delta)
+                buffer.applyEdit(replacing: replacedRange, with: textStorage.mutableString.substring(with: editedRange))
+                syncedBufferChangeCount = buffer.changeCount
+            }
+            let preEditEnd = editedRange.location + editedRange.length - delta
+            if !highlightedCoverage.isEmpty {
+                highlightedCoverage.remove(integersIn: editedRange.location..<max(editedRange.location, preEditEnd))
+                highlightedCoverage.shift(startingAt: preEditEnd, by: delta)
+                if let edited = Range(editedRange) {
+                    highlightedCoverage.remove(integersIn: edited)
+                }
+            }
+            // Re-tokenize until the lexer state downstream of the edit settles
+            let dirtyRange = lineStates?.applyEdit(in: textStorage.mutableString, editedRange: editedRange, changeInLength: delta) ?? editedRange
+            if !highlightedCoverage.isEmpty, let dirty = Range(dirtyRange) {
+                // Lines whose start state changed need new colors as well
+                highlightedCoverage.remove(integersIn: dirty)
+            }
+            guard let pending = pendingEditedRange else {
+                pendingEditedRange = dirtyRange
+                return
+            }
+            // Shift the pending range into post-edit coordinates, then merge the new edit into it.
+            var start = pending.location
+            var end = NSMaxRange(pending)
+            if start >= preEditEnd {
+                start += delta
+            } else if start > editedRange.location {
+                start = editedRange.location
+            }
+            if end >= preEditEnd {
+                end += delta
+            } else if end > editedRange.location {
+                end = NSMaxRange(editedRange)
+            }
+            start = min(max(0, min(start, dirtyRange.location)), textStorage.length)
+            end = min(max(end, NSMaxRange(dirtyRange)), textStorage.length)
+            pendingEditedRange = NSRange(location: start, length: max(0, end - start))
+        }
+
+        /// Schedules highlighting if text/language/theme changed. Very large documents (and large
+        /// file mode) are colored viewport-first; defers when a modal sheet is presented.
         func scheduleHighlightIfNeeded(currentText: String? = nil) {
             guard textView != nil else { return }
 
@@ -1051,30 +1141,42 @@ struct CustomTextEditor: NSViewRepresentable {
                 return result
             }()
 
-            if parent.isLargeFileMode {
-                self.lastHighlightedText = text
-                self.lastLanguage = lang
-                self.lastColorScheme = scheme
-                self.lastLineHeight = lineHeight
-                return
-            }
-
-            // Skip expensive highlighting for very large documents
+            // Very large documents: color the visible region first, then fill outward
             let nsLen = (text as NSString).length
-            if nsLen > 200_000 { // ~200k UTF-16 code units
-                self.lastHighlightedText = text
+            if parent.isLargeFileMode || nsLen > Self.viewportHighlightThreshold {
+                let syntaxColors = currentEditorTheme(colorScheme: scheme).syntax
+                let styleChanged = lastLanguage != lang || lastColorScheme != scheme ||
+                    lastSyntaxColors != syntaxColors || lastLineHeight != lineHeight
+                if styleChanged {
+                    highlightedCoverage = IndexSet()
+                }
+                self.lastHighlightedGeneration = nil
                 self.lastLanguage = lang
                 self.lastColorScheme = scheme
+                self.lastSyntaxColors = syntaxColors
+                self.lastLineHeight = lineHeight
+                self.needsFullHighlight = true
+                self.pendingEditedRange = nil
+                if styleChanged || viewportScheduledTextGeneration != textGeneration.current {
+                    if Thread.isMainThread {
+                        scheduleViewportHighlight()
+                    } else {
+                        DispatchQueue.main.async { [weak self] in self?.scheduleViewportHighlight() }
+                    }
+                }
                 return
             }
 
-            if text == lastHighlightedText && lastLanguage == lang && lastColorScheme == scheme && lastLineHeight == lineHeight {
+            if lastHighlightedGeneration == textGeneration.current && lastLanguage == lang && lastColorScheme == scheme && lastLineHeight == lineHeight &&
+                lastSyntaxColors == currentEditorTheme(colorScheme: scheme).syntax {
                 return
             }
             rehighlight()
         }
 
         /// Perform regex-based token coloring off-main, then apply attributes on the main thread.
+        /// Plain edits only re-tokenize the lines the line-state table marked dirty; language, theme
+        /// or line-height changes recolor the whole document and rebuild the table.
         func rehighlight() {
             guard let textView = textView else { return }
             // Snapshot current state
@@ -1084,42 +1186,55 @@ struct CustomTextEditor: NSViewRepresentable {
             let lineHeight = parent.lineHeightMultiple
             let selected = textView.selectedRange()
             let colors = currentEditorTheme(colorScheme: scheme).syntax
-            let patterns = getSyntaxPatterns(for: language, colors: colors)
-
-            // Cancel any in-flight work
+            let grammar = SyntaxGrammarCache.shared.grammar(for: language)
+            let palette = SyntaxColorPalette.shared.colors(for: colors)
+            let profile = syntaxLexicalProfile(for: language)
+            let editedRange = pendingEditedRange
+            let currentLineStates = lineStates?.language == language ? lineStates : nil
+            let needsFullPass = needsFullHighlight ||
+                editedRange == nil ||
+                currentLineStates == nil ||
+                lastLanguage != language ||
+                lastColorScheme != scheme ||
+                lastSyntaxColors != colors ||
+                lastLineHeight != lineHeight
+            let startState: SyntaxLineState = needsFullPass ? .normal : (currentLineStates?.state(at: editedRange?.location ?? 0) ?? .normal)
+            let generation = textGeneration.current
+            // Cancel any in-flight work, including a job that is already scanning
             pendingHighlight?.cancel()
+            let request = highlightRequestGeneration.advance()
+            let isCancelled = { [textGeneration, highlightRequestGeneration] in
+                textGeneration.current != generation || highlightRequestGeneration.current != request
+            }
 
             let work = DispatchWorkItem { [weak self] in
+                guard !isCancelled() else { return }
                 // Compute matches off the main thread
                 let nsText = textSnapshot as NSString
                 let fullRange = NSRange(location: 0, length: nsText.length)
-                var coloredRanges: [(NSRange, Color)] = []
-                for (pattern, color) in patterns {
-                    guard let regex = try? NSRegularExpression(pattern: pattern, options: [.anchorsMatchLines]) else { continue }
-                    let matches = regex.matches(in: textSnapshot, range: fullRange)
-                    for match in matches {
-                        coloredRanges.append((match.range, color))
-                    }
-                }
+                let highlightRange: NSRange = {
+                    guard !needsFullPass, let editedRange else { return fullRange }
+                    return nsText.lineRange(for: editedRange)
+                }()
+                // A full pass also rebuilds the line states that later edits resume from
+                let rebuiltLineStates = needsFullPass ? SyntaxLineStateTable(language: language, text: nsText) : nil
+                // One pass over the window yields sorted, non-overlapping tokens; full passes use every core
+                let tokens = needsFullPass
+                    ? grammar.tokensConcurrently(in: textSnapshot, range: highlightRange, profile: profile, isCancelled: isCancelled)
+                    : grammar.tokens(in: textSnapshot, range: highlightRange, startingIn: startState, profile: profile, isCancelled: isCancelled)
+                guard !isCancelled() else { return }
 
                 DispatchQueue.main.async { [weak self] in
                     guard let self = self, let tv = self.textView else { return }
-                    // Discard if text changed since we started
-                    guard tv.string == textSnapshot else { return }
-
-                    tv.textStorage?.beginEditing()
-                    // Clear previous coloring and apply base color
-                    tv.textStorage?.removeAttribute(.foregroundColor, range: fullRange)
-                    tv.textStorage?.addAttribute(.foregroundColor, value: tv.textColor ?? NSColor.labelColor, range: fullRange)
-                    // Apply paragraph style for line height
-                    let style = NSMutableParagraphStyle()
-                    style.lineHeightMultiple = max(0.9, lineHeight)
-                    tv.textStorage?.addAttribute(.paragraphStyle, value: style, range: fullRange)
-                    // Apply colored ranges
-                    for (range, color) in coloredRanges {
-                        tv.textStorage?.addAttribute(.foregroundColor, value: NSColor(color), range: range)
+                    // Discard if the text was edited or a newer pass was requested since we started
+                    guard !isCancelled() else { return }
+
+                    self.applyHighlight(tokens, in: highlightRange, palette: palette, lineHeight: lineHeight)
+                    if let rebuiltLineStates {
+                        self.lineStates = rebuiltLineStates
                     }
-                    tv.textStorage?.endEditing()
+                    self.pendingEditedRange = nil
+                    self.needsFullHighlight = false
 
                     // Restore selection only if it hasn't changed since we started
                     if NSEqualRanges(tv.selectedRange(), selected) {
@@ -1127,9 +1242,10 @@ struct CustomTextEditor: NSViewRepresentable {
                     }
 
                     // Update last highlighted state
-                    self.lastHighlightedText = textSnapshot
+                    self.lastHighlightedGeneration = generation
                     self.lastLanguage = language
                     self.lastColorScheme = scheme
+                    self.lastSyntaxColors = colors
                     self.lastLineHeight = lineHeight
                 }
             }
@@ -1139,6 +1255,240 @@ struct CustomTextEditor: NSViewRepresentable {
             highlightQueue.asyncAfter(deadline: .now() + 0.12, execute: work)
         }
 
+        /// Recolors `range` to match `tokens` (base color in between). Only segments whose current
+        /// color differs are touched, so layout is invalidated just where colors changed. Main thread only.
+        private func applyHighlight<Tokens: Collection>(_ tokens: Tokens, in range: NSRange, palette: [NSColor], lineHeight: CGFloat)
+            where Tokens.Element == SyntaxToken {
+            guard let tv = textView, let storage = tv.textStorage else { return }
+            let baseColor = tv.textColor ?? NSColor.labelColor
+            storage.beginEditing()
+            // Paragraph style only changes with the line height; new text picks it up from typingAttributes
+            if appliedLineHeight != lineHeight {
+                let style = NSMutableParagraphStyle()
+                style.lineHeightMultiple = max(0.9, lineHeight)
+                storage.addAttribute(.paragraphStyle, value: style, range: NSRange(location: 0, length: storage.length))
+                appliedLineHeight = lineHeight
+            }
+            var cursor = range.location
+            for token in tokens {
+                if token.range.location > cursor {
+                    setForegroundColor(baseColor, in: NSRange(location: cursor, length: token.range.location - cursor), of: storage)
+                }
+                setForegroundColor(palette[Int(token.kind.rawValue)], in: token.range, of: storage)
+                cursor = max(cursor, NSMaxRange(token.range))
+            }
+            if cursor < NSMaxRange(range) {
+                setForegroundColor(baseColor, in: NSRange(location: cursor, length: NSMaxRange(range) - cursor), of: storage)
+            }
+            storage.endEditing()
+        }
+
+        // Sets `color` on the parts of `run` whose existing foreground color differs.
+        private func setForegroundColor(_ color: NSColor, in run: NSRange, of storage: NSTextStorage) {
+            let end = NSMaxRange(run)
+            var location = run.location
+            while location < end {
+                var effective = NSRange(location: 0, length: 0)
+                let existing = storage.attribute(.foregroundColor, at: location, effectiveRange: &effective) as? NSColor
+                let segmentEnd = min(max(NSMaxRange(effective), location + 1), end)
+                if existing !== color && existing?.isEqual(color) != true {
+                    storage.addAttribute(.foregroundColor, value: color, range: NSRange(location: location, length: segmentEnd - location))
+                }
+                location = segmentEnd
+            }
+        }
+
+        // MARK: Viewport-first highlighting
+
+        // Everything a chain of viewport batches needs; captured once per generation.
+        private struct ViewportPass {
+            let generation: Int
+            let textGeneration: Int
+            let text: String
+            let language: String
+            let grammar: SyntaxGrammar
+            let profile: SyntaxLexicalProfile
+            let palette: [NSColor]
+            let lineHeight: CGFloat
+        }
+
+        // True once the viewport moved or the text changed after `pass` was captured.
+        private func isStale(_ pass: ViewportPass) -> Bool {
+            viewportGeneration.current != pass.generation || textGeneration.current != pass.textGeneration
+        }
+
+        @objc func viewportBoundsDidChange(_ notification: Notification) {
+            guard parent.isLargeFileMode || (textView?.textStorage?.length ?? 0) > Self.viewportHighlightThreshold else { return }
+            scheduleViewportHighlight()
+        }
+
+        /// Restarts viewport highlighting after a short debounce. Any fill still walking
+        /// regions around the previous viewport stops at its next batch boundary.
+        private func scheduleViewportHighlight() {
+            pendingViewportHighlight?.cancel()
+            viewportGeneration.advance()
+            viewportScheduledTextGeneration = textGeneration.current
+            let work = DispatchWorkItem { [weak self] in
+                self?.highlightViewport()
+            }
+            pendingViewportHighlight = work
+            DispatchQueue.main.asyncAfter(deadline: .now() + 0.05, execute: work)
+        }
+
+        private func highlightViewport() {
+            guard let tv = textView,
+                  let layoutManager = tv.layoutManager,
+                  let container = tv.textContainer else { return }
+            let textSnapshot = tv.string
+            let nsText = textSnapshot as NSString
+            guard nsText.length > 0 else { return }
+            let colors = currentEditorTheme(colorScheme: parent.colorScheme).syntax
+            let pass = ViewportPass(
+                generation: viewportGeneration.current,
+                textGeneration: textGeneration.current,
+                text: textSnapshot,
+                language: parent.language,
+                grammar: SyntaxGrammarCache.shared.grammar(for: parent.language),
+                profile: syntaxLexicalProfile(for: parent.language),
+                palette: SyntaxColorPalette.shared.colors(for: colors),
+                lineHeight: parent.lineHeightMultiple
+            )
+            // Batches start in the lexer state the table records for their first line. The table
+            // is built once, off the main thread, and edits keep it current from then on.
+            guard lineStates?.language == pass.language else {
+                highlightQueue.async { [weak self] in
+                    let table = SyntaxLineStateTable(language: pass.language, text: nsText)
+                    DispatchQueue.main.async { [weak self] in
+                        guard let self, self.textGeneration.current == pass.textGeneration else { return }
+                        self.lineStates = table
+                        if !self.isStale(pass) {
+                            self.highlightViewport()
+                        }
+                    }
+                }
+                return
+            }
+
+            let glyphRange = layoutManager.glyphRange(forBoundingRect: tv.visibleRect, in: container)
+            let visible = layoutManager.characterRange(forGlyphRange: glyphRange, actualGlyphRange: nil)
+            let start = max(0, visible.location - viewportMargin)
+            let end = min(nsText.length, NSMaxRange(visible) + viewportMargin)
+            let target = nsText.lineRange(for: NSRange(location: start, length: end - start))
+
+            let fillsConcurrently = nsText.length <= Self.concurrentFillLimit
+            highlightViewportBatch(target, pass: pass, queue: highlightQueue) { [weak self] in
+                if fillsConcurrently {
+                    self?.fillViewportConcurrently(pass: pass)
+                } else {
+                    self?.fillViewportOutward(lower: target.location, upper: NSMaxRange(target), towardEnd: true, pass: pass)
+                }
+            }
+        }
+
+        /// Tokenizes the whole document across all cores, then applies the result in slices so the
+        /// main thread stays responsive. Skipped once everything is colored.
+        private func fillViewportConcurrently(pass: ViewportPass) {
+            let length = (pass.text as NSString).length
+            guard !isStale(pass), !highlightedCoverage.contains(integersIn: 0..<length) else { return }
+            let isCancelled = { [weak self] in self?.isStale(pass) ?? true }
+            viewportFillQueue.async { [weak self] in
+                guard !isCancelled() else { return }
+                let tokens = pass.grammar.tokensConcurrently(
+                    in: pass.text,
+                    range: NSRange(location: 0, length: length),
+                    profile: pass.profile,
+                    isCancelled: isCancelled
+                )
+                guard !isCancelled() else { return }
+                DispatchQueue.main.async { [weak self] in
+                    self?.applyViewportTokens(tokens, from: 0, location: 0, length: length, pass: pass)
+                }
+            }
+        }
+
+        // Applies `tokens[index...]` starting at `location`, one slice per main-queue turn.
+        private func applyViewportTokens(_ tokens: SyntaxTokenBuffer, from index: Int, location: Int, length: Int, pass: ViewportPass) {
+            guard !isStale(pass) else { return }
+            let endIndex = min(tokens.count, index + viewportApplySliceTokenCount)
+            let sliceEnd = endIndex == tokens.count ? length : NSMaxRange(tokens[endIndex - 1].range)
+            applyHighlight(tokens[index..<endIndex], in: NSRange(location: location, length: sliceEnd - location),
+                           palette: pass.palette, lineHeight: pass.lineHeight)
+            highlightedCoverage.insert(integersIn: location..<sliceEnd)
+            guard endIndex < tokens.count else { return }
+            DispatchQueue.main.async { [weak self] in
+                self?.applyViewportTokens(tokens, from: endIndex, location: sliceEnd, length: length, pass: pass)
+            }
+        }
+
+        /// Colors the next batch beyond `lower..<upper`, alternating below and above the viewport
+        /// until the whole document is covered or the generation moves on.
+        private func fillViewportOutward(lower: Int, upper: Int, towardEnd: Bool, pass: ViewportPass) {
+            guard !isStale(pass) else { return }
+            let nsText = pass.text as NSString
+            let length = nsText.length
+            let canGrowDown = upper < length
+            let canGrowUp = lower > 0
+            guard canGrowDown || canGrowUp else { return }
+
+            if canGrowDown && (towardEnd || !canGrowUp) {
+                let batch = nsText.lineRange(for: NSRange(location: upper, length: min(viewportFillBatchLength, length - upper)))
+                highlightViewportBatch(batch, pass: pass, queue: viewportFillQueue) { [weak self] in
+                    self?.fillViewportOutward(lower: lower, upper: NSMaxRange(batch), towardEnd: false, pass: pass)
+                }
+            } else {
+                let batchStart = max(0, lower - viewportFillBatchLength)
+                let batch = nsText.lineRange(for: NSRange(location: batchStart, length: lower - batchStart))
+                highlightViewportBatch(batch, pass: pass, queue: viewportFillQueue) { [weak self] in
+                    self?.fillViewportOutward(lower: batch.location, upper: upper, towardEnd: true, pass: pass)
+                }
+            }
+        }
+
+        /// Tokenizes the not-yet-colored parts of `range` on `queue` and applies them on main.
+        /// Results are dropped if the text was edited or the viewport moved in the meantime.
+        private func highlightViewportBatch(_ range: NSRange, pass: ViewportPass, queue: DispatchQueue, then next: @escaping () -> Void) {
+            guard let span = Range(range) else { return }
+            let missing = IndexSet(integersIn: span).subtracting(highlightedCoverage)
+            guard !missing.isEmpty else {
+                next()
+                return
+            }
+
+            guard !isStale(pass), let lineStates, lineStates.language == pass.language else { return }
+
+            // Widen each gap to whole lines and look up the lexer state each window starts in,
+            // here on the main thread where the table is kept
+            let nsText = pass.text as NSString
+            var windows = IndexSet()
+            for gap in missing.rangeView {
+                if let window = Range(nsText.lineRange(for: NSRange(location: gap.lowerBound, length: gap.count))) {
+                    windows.insert(integersIn: window)
+                }
+            }
+            let starts = windows.rangeView.map { window in
+                (range: NSRange(location: window.lowerBound, length: window.count), state: lineStates.state(at: window.lowerBound))
+            }
+
+            let isCancelled = { [weak self] in self?.isStale(pass) ?? true }
+            queue.async { [weak self] in
+                guard !isCancelled() else { return }
+                let batches = starts.map { start -> (NSRange, SyntaxTokenBuffer) in
+                    let tokens = pass.grammar.tokens(in: pass.text, range: start.range, startingIn: start.state, profile: pass.profile, isCancelled: isCancelled)
+                    return (start.range, tokens)
+                }
+                guard !isCancelled() else { return }
+
+                DispatchQueue.main.async { [weak self] in
+                    guard let self = self, !self.isStale(pass) else { return }
+                    for (windowRange, tokens) in batches {
+                        self.applyHighlight(tokens, in: windowRange, palette: pass.palette, lineHeight: pass.lineHeight)
+                    }
+                    self.highlightedCoverage.formUnion(windows)
+                    next()
+                }
+            }
+        }
+
         func textDidChange(_ notification: Notification) {
             guard let textView = notification.object as? NSTextView else { return }
             if let accepting = textView as? AcceptingTextView, accepting.isApplyingDroppedContent {
@@ -1146,10 +1496,41 @@ struct CustomTextEditor: NSViewRepresentable {
                 // until the final didChangeText emitted after import completion.
                 return
             }
-            // Update SwiftUI binding, caret status, and rehighlight.
-            parent.text = textView.string
-            updateCaretStatusAndHighlight()
-            scheduleHighlightIfNeeded(currentText: parent.text)
+            // Update the document (or SwiftUI binding), caret status, and rehighlight.
+            if attachedBuffer != nil {
+                // The text storage delegate has already passed the edit on to the buffer
+                updateCaretStatusAndHighlight()
+                scheduleHighlightIfNeeded()
+            } else {
+                parent.text = textView.string
+                updateCaretStatusAndHighlight()
+                scheduleHighlightIfNeeded(currentText: parent.text)
+            }
+        }
+
+        /// Shows `buffer` in `textView`. Switching buffers stores the outgoing document's text first;
+        /// afterwards the text view is only reloaded when the buffer was replaced from outside.
+        func syncDocumentBuffer(_ buffer: TextDocumentBuffer, into textView: NSTextView, canReplaceText: Bool) {
+            // Loading the buffer's own text must not be reported back to it as an edit
+            isLoadingDocumentBuffer = true
+            defer { isLoadingDocumentBuffer = false }
+            if attachedBuffer !== buffer {
+                attachedBuffer?.detach()
+                let text = buffer.text
+                if textView.string != text {
+                    textView.string = text
+                }
+                buffer.attach { [weak textView] in textView?.string }
+                attachedBuffer = buffer
+                syncedBufferChangeCount = buffer.changeCount
+            } else if canReplaceText && syncedBufferChangeCount != buffer.changeCount {
+                textView.string = buffer.text
+                syncedBufferChangeCount = buffer.changeCount
+            }
+            if let line = buffer.pendingCaretLine {
+                buffer.pendingCaretLine = nil
+                moveCaret(toLine: line)
+            }
         }
 
         func textViewDidChangeSelection(_ notification: Notification) {
@@ -1164,25 +1545,21 @@ struct CustomTextEditor: NSViewRepresentable {
             guard let tv = textView else { return }
             let ns = tv.string as NSString
             let sel = tv.selectedRange()
-            let location = sel.location
-            if parent.isLargeFileMode || ns.length > 300_000 {
-                NotificationCenter.default.post(
-                    name: .caretPositionDidChange,
-                    object: nil,
-                    userInfo: ["line": 0, "column": location]
-                )
+            let location = min(sel.location, ns.length)
+            let isLargeDocument = parent.isLargeFileMode || ns.length > 300_000
+            let line = lineIndex.lineIndex(containing: location)
+            let lineStart = min(lineIndex.lineStart(line), location)
+            // Columns count characters, so composed sequences and emoji count once. Large documents
+            // can have multi-megabyte lines, so they count UTF-16 units instead.
+            let col = isLargeDocument
+                ? location - lineStart
+                : ns.substring(with: NSRange(location: lineStart, length: location - lineStart)).count
+            NotificationCenter.default.post(name: .caretPositionDidChange, object: nil, userInfo: ["line": line + 1, "column": col])
+
+            // Re-highlighting the current line touches attributes across the whole document
+            if isLargeDocument {
                 return
             }
-            let prefix = ns.substring(to: min(location, ns.length))
-            let line = prefix.reduce(1) { $1 == "\n" ? $0 + 1 : $0 }
-            let col: Int = {
-                if let lastNL = prefix.lastIndex(of: "\n") {
-                    return prefix.distance(from: lastNL, to: prefix.endIndex) - 1
-                } else {
-                    return prefix.count
-                }
-            }()
-            NotificationCenter.default.post(name: .caretPositionDidChange, object: nil, userInfo: ["line": line, "column": col])
 
             let fullRange = NSRange(location: 0, length: ns.length)
             tv.textStorage?.beginEditing()
@@ -1196,53 +1573,41 @@ struct CustomTextEditor: NSViewRepresentable {
 
         /// Move caret to a 1-based line number, clamping to bounds, and emphasize the line.
         @objc func moveToLine(_ notification: Notification) {
-            guard let lineOneBased = notification.object as? Int,
-                  let textView = textView else { return }
+            guard let lineOneBased = notification.object as? Int else { return }
+            moveCaret(toLine: lineOneBased)
+        }
+
+        private func moveCaret(toLine lineOneBased: Int) {
+            guard let textView = textView else { return }
+
+            // Work with NSString/UTF-16 indices to match NSTextView expectations
+            let ns = textView.string as NSString
+            let totalLength = ns.length
 
             // If there's no text, nothing to do
-            let currentText = textView.string
-            guard !currentText.isEmpty else { return }
+            guard totalLength > 0 else { return }
 
             // Cancel any in-flight highlight to prevent it from restoring an old selection
             pendingHighlight?.cancel()
 
-            // Work with NSString/UTF-16 indices to match NSTextView expectations
-            let ns = currentText as NSString
-            let totalLength = ns.length
-
             // Clamp target line to available line count (1-based input)
-            let linesArray = currentText.components(separatedBy: .newlines)
-            let clampedLineIndex = max(1, min(lineOneBased, linesArray.count)) - 1 // 0-based index
-
-            // Compute the UTF-16 location by summing UTF-16 lengths of preceding lines + newline characters
-            var location = 0
-            if clampedLineIndex > 0 {
-                for i in 0..<(clampedLineIndex) {
-                    let lineNSString = linesArray[i] as NSString
-                    location += lineNSString.length
-                    // Add one for the newline that separates lines, as components(separatedBy:) drops separators
-                    location += 1
-                }
-            }
-            // Safety clamp
-            location = max(0, min(location, totalLength))
+            let clampedLineIndex = max(1, min(lineOneBased, lineIndex.lineCount)) - 1 // 0-based index
+            let location = min(lineIndex.lineStart(clampedLineIndex), totalLength)
+            let lineRange = ns.lineRange(for: NSRange(location: location, length: 0))
 
             // Move caret and scroll into view on the main thread
             DispatchQueue.main.async { [weak self] in
                 guard let self = self, let tv = self.textView else { return }
                 tv.window?.makeFirstResponder(tv)
-                // Ensure layout is up-to-date before scrolling
-                if let textContainer = tv.textContainer {
-                    tv.layoutManager?.ensureLayout(for: textContainer)
-                }
+                // Lay out the target line before scrolling; the rest of the document can wait
+                tv.layoutManager?.ensureLayout(forCharacterRange: lineRange)
                 tv.setSelectedRange(NSRange(location: location, length: 0))
                 tv.scrollRangeToVisible(NSRange(location: location, length: 0))
 
                 let fullRange = NSRange(location: 0, length: totalLength)
                 tv.textStorage?.beginEditing()
                 tv.textStorage?.removeAttribute(.backgroundColor, range: fullRange)
-                if self.highlightCurrentLine {
-                    let lineRange = ns.lineRange(for: NSRange(location: location, length: 0))
+                if self.parent.highlightCurrentLine {
                     tv.textStorage?.addAttribute(.backgroundColor, value: NSColor.selectedTextBackgroundColor.withAlphaComponent(0.18), range: lineRange)
                 }
                 tv.textStorage?.endEditing()
@@ -1256,6 +1621,8 @@ import UIKit
 final class LineNumberedTextViewContainer: UIView {
     let lineNumberView = UITextView()
     let textView = UITextView()
+    private var displayedLineCount = 0
+    private var displayedNumberFontSize: CGFloat = 0
 
     override init(frame: CGRect) {
         super.init(frame: frame)
@@ -1306,15 +1673,22 @@ final class LineNumberedTextViewContainer: UIView {
     }
 
     func updateLineNumbers(for text: String, fontSize: CGFloat) {
-        let lineCount = max(1, text.components(separatedBy: .newlines).count)
+        let lineCount = TextLineIndex.lineCount(of: text as NSString)
+        let numberFontSize = max(11, fontSize - 1)
+        // Most edits keep the line count; only rebuild the column when it or the font changes
+        guard lineCount != displayedLineCount || numberFontSize != displayedNumberFontSize else { return }
+        displayedLineCount = lineCount
+        displayedNumberFontSize = numberFontSize
         let numbers = (1...lineCount).map(String.init).joined(separator: "\n")
-        lineNumberView.font = UIFont.monospacedDigitSystemFont(ofSize: max(11, fontSize - 1), weight: .regular)
+        lineNumberView.font = UIFont.monospacedDigitSystemFont(ofSize: numberFontSize, weight: .regular)
         lineNumberView.text = numbers
     }
 }
 
 struct CustomTextEditor: UIViewRepresentable {
     @Binding var text: String
+    // When set, edits are reported to the buffer instead of copying the text into `text`
+    var documentBuffer: TextDocumentBuffer? = nil
     let language: String
     let colorScheme: ColorScheme
     let fontName: String
@@ -1377,7 +1751,9 @@ struct CustomTextEditor: UIViewRepresentable {
     func updateUIView(_ uiView: LineNumberedTextViewContainer, context: Context) {
         let textView = uiView.textView
         context.coordinator.parent = self
-        if textView.text != text {
+        if let documentBuffer {
+            context.coordinator.syncDocumentBuffer(documentBuffer, into: textView)
+        } else if textView.text != text {
             textView.text = text
         }
         if textView.font?.pointSize != fontSize {
@@ -1410,18 +1786,24 @@ struct CustomTextEditor: UIViewRepresentable {
             uiView.lineNumberView.isHidden = true
         } else {
             uiView.lineNumberView.isHidden = false
-            uiView.updateLineNumbers(for: text, fontSize: fontSize)
+            uiView.updateLineNumbers(for: textView.text, fontSize: fontSize)
         }
         context.coordinator.syncLineNumberScroll()
-        context.coordinator.scheduleHighlightIfNeeded(currentText: text)
+        context.coordinator.scheduleHighlightIfNeeded(currentText: textView.text)
     }
 
     func makeCoordinator() -> Coordinator {
         Coordinator(self)
     }
 
+    static func dismantleUIView(_ uiView: LineNumberedTextViewContainer, coordinator: Coordinator) {
+        coordinator.attachedBuffer?.detach()
+    }
+
     class Coordinator: NSObject, UITextViewDelegate {
         var parent: CustomTextEditor
+        private(set) weak var attachedBuffer: TextDocumentBuffer?
+        private var syncedBufferChangeCount = 0
         weak var container: LineNumberedTextViewContainer?
         weak var textView: UITextView?
         private let highlightQueue = DispatchQueue(label: "NeonVision.iOS.SyntaxHighlight", qos: .userInitiated)
@@ -1429,6 +1811,7 @@ struct CustomTextEditor: UIViewRepresentable {
         private var lastHighlightedText: String = ""
         private var lastLanguage: String?
         private var lastColorScheme: ColorScheme?
+        private var lastSyntaxColors: SyntaxColors?
         private var lastLineHeight: CGFloat?
         private var isApplyingHighlight = false
 
@@ -1451,7 +1834,8 @@ struct CustomTextEditor: UIViewRepresentable {
                 return
             }
 
-            if text == lastHighlightedText && lang == lastLanguage && scheme == lastColorScheme && lineHeight == lastLineHeight {
+            if text == lastHighlightedText && lang == lastLanguage && scheme == lastColorScheme && lineHeight == lastLineHeight &&
+                lastSyntaxColors == currentEditorTheme(colorScheme: scheme).syntax {
                 return
             }
 
@@ -1484,15 +1868,13 @@ struct CustomTextEditor: UIViewRepresentable {
             )
 
             let colors = currentEditorTheme(colorScheme: colorScheme).syntax
-            let patterns = getSyntaxPatterns(for: language, colors: colors)
-
-            for (pattern, color) in patterns {
-                guard let regex = try? NSRegularExpression(pattern: pattern, options: [.anchorsMatchLines]) else { continue }
-                let matches = regex.matches(in: text, range: fullRange)
-                let uiColor = UIColor(color)
-                for match in matches {
-                    attributed.addAttribute(.foregroundColor, value: uiColor, range: match.range)
-                }
+            let grammar = SyntaxGrammarCache.shared.grammar(for: language)
+            let palette = SyntaxColorPalette.shared.colors(for: colors)
+
+            let profile = syntaxLexicalProfile(for: language)
+
+            for token in grammar.tokensConcurrently(in: text, range: fullRange, profile: profile) {
+                attributed.addAttribute(.foregroundColor, value: palette[Int(token.kind.rawValue)], range: token.range)
             }
 
             DispatchQueue.main.async { [weak self] in
@@ -1516,15 +1898,45 @@ struct CustomTextEditor: UIViewRepresentable {
                 self.lastHighlightedText = text
                 self.lastLanguage = language
                 self.lastColorScheme = colorScheme
+                self.lastSyntaxColors = colors
                 self.lastLineHeight = self.parent.lineHeightMultiple
                 self.container?.updateLineNumbers(for: text, fontSize: self.parent.fontSize)
                 self.syncLineNumberScroll()
             }
         }
 
+        // Same contract as the macOS coordinator's `syncDocumentBuffer`.
+        func syncDocumentBuffer(_ buffer: TextDocumentBuffer, into textView: UITextView) {
+            if attachedBuffer !== buffer {
+                attachedBuffer?.detach()
+                let text = buffer.text
+                if textView.text != text {
+                    textView.text = text
+                }
+                buffer.attach { [weak textView] in textView?.text }
+                attachedBuffer = buffer
+                syncedBufferChangeCount = buffer.changeCount
+            } else if syncedBufferChangeCount != buffer.changeCount {
+                textView.text = buffer.text
+                syncedBufferChangeCount = buffer.changeCount
+            }
+            if let line = buffer.pendingCaretLine {
+                buffer.pendingCaretLine = nil
+                let rope = buffer.rope
+                let location = min(rope.lineStart(max(1, min(line, rope.lineCount)) - 1), (textView.text as NSString).length)
+                textView.selectedRange = NSRange(location: location, length: 0)
+                textView.scrollRangeToVisible(textView.selectedRange)
+            }
+        }
+
         func textViewDidChange(_ textView: UITextView) {
             guard !isApplyingHighlight else { return }
-            parent.text = textView.text
+            if let buffer = attachedBuffer {
+                buffer.noteEdit()
+                syncedBufferChangeCount = buffer.changeCount
+            } else {
+                parent.text = textView.text
+            }
             container?.updateLineNumbers(for: textView.text, fontSize: parent.fontSize)
             scheduleHighlightIfNeeded(currentText: textView.text)
         }
@@ -11,34 +11,91 @@ import AppKit
 
 final class LineNumberRulerView: NSRulerView {
     weak var textView: NSTextView?
+    // Kept current by the editor's text storage delegate
+    let lineIndex: TextLineIndex
 
     private let font = NSFont.monospacedDigitSystemFont(ofSize: 11, weight: .regular)
     private let textColor = NSColor.secondaryLabelColor
     private let inset: CGFloat = 6
-
-    init(textView: NSTextView) {
+    private let minimumThickness: CGFloat = 48
+    private lazy var attributes: [NSAttributedString.Key: Any] = [.font: font, .foregroundColor: textColor]
+    private lazy var digitWidth = ceil(("0" as NSString).size(withAttributes: attributes).width)
+    private var displayedDigitCount = 0
+
+    // Every visible line number is a layer keyed by its line. Scrolling only moves these layers;
+    // lines coming into view take a layer from the spares and get a label.
+    private var labelLayers: [Int: CALayer] = [:]
+    private var spareLabelLayers: [CALayer] = []
+    // The ten digits, rendered once per appearance and scale. A label shows its number as one
+    // sublayer per digit sharing these images, so no number is ever rendered on its own.
+    private var digitImages: [CGImage] = []
+    private lazy var digitAdvance = ("0" as NSString).size(withAttributes: attributes).width
+
+    init(textView: NSTextView, lineIndex: TextLineIndex) {
         self.textView = textView
+        self.lineIndex = lineIndex
         super.init(scrollView: textView.enclosingScrollView, orientation: .verticalRuler)
         self.clientView = textView
-        self.ruleThickness = 48
+        self.wantsLayer = true
+        updateRuleThickness()
 
         // Ensure we get bounds-changed notifications while scrolling
         textView.enclosingScrollView?.contentView.postsBoundsChangedNotifications = true
 
         NotificationCenter.default.addObserver(
             self,
-            selector: #selector(needsRedraw),
+            selector: #selector(visibleRectDidChange),
             name: NSView.boundsDidChangeNotification,
             object: textView.enclosingScrollView?.contentView
         )
+        // Edits and re-wrapping move lines without scrolling
+        NotificationCenter.default.addObserver(
+            self,
+            selector: #selector(textDidProcessEditing(_:)),
+            name: NSTextStorage.didProcessEditingNotification,
+            object: textView.textStorage
+        )
+        NotificationCenter.default.addObserver(
+            self,
+            selector: #selector(textLayoutDidChange),
+            name: NSView.frameDidChangeNotification,
+            object: textView
+        )
     }
 
     required init(coder: NSCoder) { fatalError("init(coder:) has not been implemented") }
 
-    @objc private func needsRedraw() {
-        needsDisplay = true
+    @objc private func visibleRectDidChange() {
+        updateLabels()
     }
-    
+
+    @objc private func textDidProcessEditing(_ notification: Notification) {
+        guard let storage = notification.object as? NSTextStorage,
+              storage.editedMask.contains(.editedCharacters) else { return }
+        // Layout catches up after editing ends; place the labels in the next layout pass
+        needsLayout = true
+    }
+
+    @objc private func textLayoutDidChange() {
+        needsLayout = true
+    }
+
+    override func layout() {
+        super.layout()
+        updateLabels()
+    }
+
+    override func viewDidChangeEffectiveAppearance() {
+        super.viewDidChangeEffectiveAppearance()
+        // The label color resolves against the appearance when the digits are rendered
+        discardLabels()
+    }
+
+    override func viewDidChangeBackingProperties() {
+        super.viewDidChangeBackingProperties()
+        discardLabels()
+    }
+
     // Keep the ruler transparent so the window's translucency/vibrancy shows through.
     override var isOpaque: Bool { false }
 
@@ -46,99 +103,143 @@ final class LineNumberRulerView: NSRulerView {
         // Do not paint an opaque background.
         NSColor.clear.setFill()
         dirtyRect.fill()
-
-        // Draw only the ruler contents (line numbers).
-        drawHashMarksAndLabels(in: dirtyRect)
     }
 
     override func drawHashMarksAndLabels(in rect: NSRect) {
+        // Line numbers are label layers placed by updateLabels(), not drawn here
+    }
+
+    /// Places a label for every logical line that starts in the visible part of the text view.
+    private func updateLabels() {
         guard
             let tv = textView,
-            let lm = tv.layoutManager
+            let lm = tv.layoutManager,
+            let container = tv.textContainer,
+            let layer
         else { return }
+        updateRuleThickness()
 
-        let fullString = tv.string as NSString
         let visibleRect = tv.visibleRect
         let tcOrigin = tv.textContainerOrigin  // Accounts for textContainerInset
 
-        // Find the first visible character using a probe point inside the text container
-        // (not inside the left inset / ruler area)
-        let probePoint = NSPoint(x: tcOrigin.x + 2, y: visibleRect.minY + 2)
-        let firstVisibleCharIndex = tv.characterIndexForInsertion(at: probePoint)
-        let clampedCharIndex = min(max(firstVisibleCharIndex, 0), fullString.length)
-
-        // Compute the line number of the first visible logical line
-        // by counting newline characters up to the visible character index
-        let prefix = fullString.substring(to: clampedCharIndex)
-        var currentLineNumber = prefix.reduce(1) { $1 == "\n" ? $0 + 1 : $0 }
-
-        // Start at the logical line containing the first visible character
-        var charIndex = fullString.lineRange(
-            for: NSRange(location: clampedCharIndex, length: 0)
-        ).location
-
-        while charIndex < fullString.length {
-            let lineRange = fullString.lineRange(
-                for: NSRange(location: charIndex, length: 0)
-            )
-
-            // Ensure layout information is available for this logical line
-            lm.ensureLayout(forCharacterRange: lineRange)
-
-            let glyphRange = lm.glyphRange(
-                forCharacterRange: lineRange,
-                actualCharacterRange: nil
-            )
-
-            if glyphRange.location >= lm.numberOfGlyphs { break }
-
-            var effectiveGlyphRange = NSRange(location: 0, length: 0)
-
-            // Get the visual rect for the first glyph of the logical line
-            let lineRectInContainer = lm.lineFragmentRect(
-                forGlyphAt: glyphRange.location,
-                effectiveRange: &effectiveGlyphRange,
-                withoutAdditionalLayout: false
-            )
-
-            // Convert from text container coordinates to view coordinates
-            let lineRectInView = NSRect(
-                x: lineRectInContainer.origin.x + tcOrigin.x,
-                y: lineRectInContainer.origin.y + tcOrigin.y,
-                width: lineRectInContainer.size.width,
-                height: lineRectInContainer.size.height
-            )
-
-            // Stop once we are below the visible viewport
-            if lineRectInView.minY > visibleRect.maxY { break }
-
-            // Draw only lines that intersect the visible area
-            if lineRectInView.maxY >= visibleRect.minY {
-                let numberString = NSString(string: "\(currentLineNumber)")
-                let attributes: [NSAttributedString.Key: Any] = [
-                    .font: font,
-                    .foregroundColor: textColor
-                ]
-                let size = numberString.size(withAttributes: attributes)
-
-                // Position the line number vertically centered relative to the line fragment
-                let drawY =
-                    (lineRectInView.minY - visibleRect.minY)
-                    + bounds.minY
-                    + (lineRectInView.height - size.height) / 2.0
-
-                let drawPoint = NSPoint(
-                    x: bounds.maxX - size.width - inset,
-                    y: drawY
-                )
-
-                numberString.draw(at: drawPoint, withAttributes: attributes)
+        // Line fragment rects of visible lines, keyed by zero-based line. Laying out the visible
+        // rect covers every fragment; wrapped continuations of a line get no number.
+        var visibleLines: [Int: NSRect] = [:]
+        if (tv.textStorage?.length ?? 0) > 0 {
+            let visibleInContainer = visibleRect.offsetBy(dx: -tcOrigin.x, dy: -tcOrigin.y)
+            let glyphRange = lm.glyphRange(forBoundingRect: visibleInContainer, in: container)
+            lm.enumerateLineFragments(forGlyphRange: glyphRange) { rect, _, _, fragmentGlyphRange, _ in
+                let charIndex = lm.characterIndexForGlyph(at: fragmentGlyphRange.location)
+                let line = self.lineIndex.lineIndex(containing: charIndex)
+                if self.lineIndex.lineStart(line) == charIndex {
+                    visibleLines[line] = rect
+                }
+            }
+        }
+
+        CATransaction.begin()
+        CATransaction.setDisableActions(true)
+        for (line, label) in labelLayers where visibleLines[line] == nil {
+            label.isHidden = true
+            spareLabelLayers.append(label)
+            labelLayers[line] = nil
+        }
+        let scale = window?.backingScaleFactor ?? 2
+        for (line, lineRectInContainer) in visibleLines {
+            let label: CALayer
+            if let existing = labelLayers[line] {
+                label = existing
+            } else {
+                label = spareLabelLayers.popLast() ?? CALayer()
+                if label.superlayer == nil {
+                    layer.addSublayer(label)
+                }
+                showNumber(line + 1, in: label, scale: scale)
+                label.isHidden = false
+                labelLayers[line] = label
             }
+            let size = label.bounds.size
+
+            // Vertically center the number on the line's first fragment
+            let lineMinYInView = lineRectInContainer.minY + tcOrigin.y
+            let drawY =
+                (lineMinYInView - visibleRect.minY)
+                + bounds.minY
+                + (lineRectInContainer.height - size.height) / 2.0
+            label.frame = NSRect(x: bounds.maxX - size.width - inset, y: drawY, width: size.width, height: size.height)
+        }
+        CATransaction.commit()
+    }
 
-            // Advance to the next logical line
-            charIndex = lineRange.upperBound
-            currentLineNumber += 1
+    private func showNumber(_ number: Int, in label: CALayer, scale: CGFloat) {
+        if digitImages.isEmpty {
+            digitImages = (0...9).compactMap { renderDigit($0, scale: scale) }
         }
+        guard digitImages.count == 10 else { return }
+        let digits = String(number).utf8.map { Int($0 - UInt8(ascii: "0")) }
+        let digitSize = NSSize(width: CGFloat(digitImages[0].width) / scale, height: CGFloat(digitImages[0].height) / scale)
+        var digitLayers = label.sublayers ?? []
+        while digitLayers.count < digits.count {
+            let digitLayer = CALayer()
+            label.addSublayer(digitLayer)
+            digitLayers.append(digitLayer)
+        }
+        for (position, digitLayer) in digitLayers.enumerated() {
+            guard position < digits.count else {
+                digitLayer.isHidden = true
+                continue
+            }
+            digitLayer.contents = digitImages[digits[position]]
+            digitLayer.contentsScale = scale
+            digitLayer.frame = NSRect(origin: NSPoint(x: CGFloat(position) * digitAdvance, y: 0), size: digitSize)
+            digitLayer.isHidden = false
+        }
+        label.bounds.size = NSSize(width: ceil(CGFloat(digits.count) * digitAdvance), height: digitSize.height)
+    }
+
+    private func renderDigit(_ digit: Int, scale: CGFloat) -> CGImage? {
+        let string = NSAttributedString(string: String(digit), attributes: attributes)
+        let size = string.size()
+        guard let bitmap = NSBitmapImageRep(
+            bitmapDataPlanes: nil,
+            pixelsWide: Int(ceil(size.width * scale)),
+            pixelsHigh: Int(ceil(size.height * scale)),
+            bitsPerSample: 8,
+            samplesPerPixel: 4,
+            hasAlpha: true,
+            isPlanar: false,
+            colorSpaceName: .deviceRGB,
+            bytesPerRow: 0,
+            bitsPerPixel: 0
+        ) else { return nil }
+        bitmap.size = NSSize(width: ceil(size.width), height: ceil(size.height))
+
+        NSGraphicsContext.saveGraphicsState()
+        NSGraphicsContext.current = NSGraphicsContext(bitmapImageRep: bitmap)
+        effectiveAppearance.performAsCurrentDrawingAppearance {
+            string.draw(at: .zero)
+        }
+        NSGraphicsContext.restoreGraphicsState()
+        return bitmap.cgImage
+    }
+
+    /// Drops the rendered digits and hides every label so the next update renders them again.
+    private func discardLabels() {
+        digitImages.removeAll()
+        for label in labelLayers.values {
+            label.isHidden = true
+            spareLabelLayers.append(label)
+        }
+        labelLayers.removeAll()
+        needsLayout = true
+    }
+
+    /// Widens the ruler when the line count gains a digit, and narrows it again when it loses one.
+    private func updateRuleThickness() {
+        let digitCount = String(lineIndex.lineCount).count
+        guard digitCount != displayedDigitCount else { return }
+        displayedDigitCount = digitCount
+        ruleThickness = max(minimumThickness, ceil(CGFloat(digitCount) * digitWidth + inset * 2))
     }
 }
 #endif
@@ -180,6 +180,110 @@ struct QuickFileSwitcherPanel: View {
     }
 }
 
+struct ProjectSearchPanel: View {
+    let fileURLs: [URL]
+    let onSelect: (ProjectSearchMatch) -> Void
+    @Environment(\.dismiss) private var dismiss
+    @State private var query = ""
+    @State private var useRegex = false
+    @State private var caseSensitive = false
+    @State private var matches: [ProjectSearchMatch] = []
+    @State private var statusMessage = ""
+    @State private var search = ProjectSearch()
+    @State private var pendingSearch: DispatchWorkItem?
+
+    var body: some View {
+        VStack(alignment: .leading, spacing: 12) {
+            Text("Find in Project")
+                .font(.headline)
+            TextField("Search project files", text: $query)
+                .textFieldStyle(.roundedBorder)
+            HStack {
+                Toggle("Use Regex", isOn: $useRegex)
+                Toggle("Case Sensitive", isOn: $caseSensitive)
+            }
+
+            List(matches) { match in
+                Button {
+                    onSelect(match)
+                    dismiss()
+                } label: {
+                    VStack(alignment: .leading, spacing: 2) {
+                        Text(match.preview)
+                            .font(.system(.body, design: .monospaced))
+                            .lineLimit(1)
+                        Text("\(match.url.lastPathComponent):\(match.lineNumber)")
+                            .font(.caption)
+                            .foregroundStyle(.secondary)
+                            .lineLimit(1)
+                    }
+                }
+                .buttonStyle(.plain)
+            }
+            .listStyle(.plain)
+
+            HStack {
+                Text(statusMessage)
+                    .font(.caption)
+                    .foregroundStyle(.secondary)
+                Spacer()
+                Button("Close") { dismiss() }
+            }
+        }
+        .padding(16)
+        .frame(minWidth: 560, minHeight: 420)
+        .onAppear {
+            if fileURLs.isEmpty {
+                statusMessage = "Open a project folder to search its files."
+            }
+        }
+        .onChange(of: query) { _, _ in scheduleSearch() }
+        .onChange(of: useRegex) { _, _ in scheduleSearch() }
+        .onChange(of: caseSensitive) { _, _ in scheduleSearch() }
+        .onDisappear {
+            pendingSearch?.cancel()
+            search.cancel()
+        }
+    }
+
+    /// Restarts the search once typing pauses; results of the previous query stop arriving now.
+    private func scheduleSearch() {
+        pendingSearch?.cancel()
+        search.cancel()
+        let work = DispatchWorkItem { startSearch() }
+        pendingSearch = work
+        DispatchQueue.main.asyncAfter(deadline: .now() + 0.25, execute: work)
+    }
+
+    private func startSearch() {
+        matches = []
+        guard !query.isEmpty, !fileURLs.isEmpty else {
+            statusMessage = ""
+            return
+        }
+        statusMessage = "Searching \(fileURLs.count) files…"
+        do {
+            try search.start(
+                query: TextMatchIndex.Query(pattern: query, usesRegex: useRegex, caseSensitive: caseSensitive),
+                in: fileURLs,
+                onMatches: { matches.append(contentsOf: $0) },
+                onFinish: { summary in
+                    var message = "\(summary.matchCount) results in \(summary.searchedFileCount) files"
+                    if summary.isTruncated {
+                        message += " (stopped at \(ProjectSearch.maxMatchCount))"
+                    }
+                    if summary.skippedFileCount > 0 {
+                        message += ", \(summary.skippedFileCount) binary or large files skipped"
+                    }
+                    statusMessage = message
+                }
+            )
+        } catch {
+            statusMessage = "Invalid regex pattern"
+        }
+    }
+}
+
 struct WelcomeTourView: View {
     @Environment(\.colorScheme) private var colorScheme
 
@@ -554,6 +658,7 @@ extension Notification.Name {
     static let showAPISettingsRequested = Notification.Name("showAPISettingsRequested")
     static let selectAIModelRequested = Notification.Name("selectAIModelRequested")
     static let showQuickSwitcherRequested = Notification.Name("showQuickSwitcherRequested")
+    static let showProjectSearchRequested = Notification.Name("showProjectSearchRequested")
     static let showWelcomeTourRequested = Notification.Name("showWelcomeTourRequested")
     static let toggleVimModeRequested = Notification.Name("toggleVimModeRequested")
     static let vimModeStateDidChange = Notification.Name("vimModeStateDidChange")
@@ -2,195 +2,111 @@ import SwiftUI
 import Foundation
 
 struct SidebarView: View {
-    let content: String
+    let buffer: TextDocumentBuffer?
     let language: String
+    @State private var outline: DocumentOutline?
+    @State private var entries: [DocumentOutline.Entry] = []
+    @State private var entriesRevision: Int?
+    @State private var isScanned = false
+    @State private var isTextEmpty = true
+    @State private var isLineListingDisabled = false
+
     var body: some View {
         List {
-            ForEach(generateTableOfContents(), id: \.self) { item in
-                Button {
-                    jump(to: item)
-                } label: {
-                    Text(item)
+            if buffer == nil || (isScanned && isTextEmpty) {
+                Text("No content available")
+                    .foregroundColor(.secondary)
+            } else if !isScanned {
+                ProgressView()
+                    .controlSize(.small)
+            } else if isLineListingDisabled {
+                Text("Large file detected: TOC disabled for performance")
+                    .foregroundColor(.secondary)
+            } else if entries.isEmpty {
+                Text("No headers found")
+                    .foregroundColor(.secondary)
+            } else {
+                ForEach(entries) { entry in
+                    Button {
+                        jump(to: entry)
+                    } label: {
+                        HStack(spacing: 6) {
+                            Image(systemName: symbolName(for: entry.kind))
+                                .foregroundColor(.secondary)
+                            Text(entry.name)
+                                .foregroundColor(.primary)
+                                .lineLimit(1)
+                            Spacer(minLength: 4)
+                            Text("\(entry.line + 1)")
+                                .font(.system(size: 11).monospacedDigit())
+                                .foregroundColor(.secondary)
+                        }
                         .font(.system(size: 13))
-                        .foregroundColor(.primary)
                         .padding(.vertical, 4)
                         .padding(.horizontal, 8)
+                    }
+                    .buttonStyle(.plain)
                 }
-                .buttonStyle(.plain)
             }
         }
         .listStyle(.sidebar)
         .scrollContentBackground(.hidden)
         .background(Color.clear)
         .frame(maxWidth: .infinity, alignment: .leading)
+        .onAppear(perform: attachOutline)
+        .onChange(of: buffer.map(ObjectIdentifier.init)) { _, _ in
+            attachOutline()
+        }
+        .onChange(of: language) { _, _ in
+            attachOutline()
+        }
+        .onReceive(NotificationCenter.default.publisher(for: DocumentOutline.didUpdateNotification)) { notif in
+            guard let outline, (notif.object as AnyObject?) === outline else { return }
+            showEntries(of: outline)
+        }
     }
 
-    private func jump(to item: String) {
-        // Expect item format: "... (Line N)"
-        if let startRange = item.range(of: "(Line "),
-           let endRange = item.range(of: ")", range: startRange.upperBound..<item.endIndex) {
-            let numberStr = item[startRange.upperBound..<endRange.lowerBound]
-            if let lineOneBased = Int(numberStr.trimmingCharacters(in: CharacterSet.whitespacesAndNewlines)),
-               lineOneBased > 0 {
-                DispatchQueue.main.async {
-                    NotificationCenter.default.post(name: .moveCursorToLine, object: lineOneBased)
-                }
-            }
+    // The outline is scanned off the main thread and follows edits on its own; this view only
+    // shows what it last published.
+    private func attachOutline() {
+        guard let buffer else {
+            outline = nil
+            entries = []
+            entriesRevision = nil
+            return
+        }
+        let outline = buffer.outline(for: language)
+        if outline !== self.outline {
+            entriesRevision = nil
         }
+        self.outline = outline
+        showEntries(of: outline)
     }
 
-    // Naive line-scanning TOC: looks for language-specific declarations or headers.
-    func generateTableOfContents() -> [String] {
-        guard !content.isEmpty else { return ["No content available"] }
-        if (content as NSString).length >= 400_000 {
-            return ["Large file detected: TOC disabled for performance"]
+    // Rows are handed to the list only when the entries changed, not on every edit
+    private func showEntries(of outline: DocumentOutline) {
+        if entriesRevision != outline.entriesRevision {
+            entries = outline.entries
+            entriesRevision = outline.entriesRevision
         }
-        let lines = content.components(separatedBy: .newlines)
-        var toc: [String] = []
+        isScanned = outline.generation != nil
+        isTextEmpty = outline.isTextEmpty
+        isLineListingDisabled = outline.isLineListingDisabled
+    }
 
-        switch language {
-        case "swift":
-            toc = lines.enumerated().compactMap { index, line in
-                let trimmed = line.trimmingCharacters(in: .whitespaces)
-                if trimmed.hasPrefix("func ") || trimmed.hasPrefix("struct ") ||
-                   trimmed.hasPrefix("class ") || trimmed.hasPrefix("enum ") {
-                    return "\(trimmed) (Line \(index + 1))"
-                }
-                return nil
-            }
-        case "python":
-            toc = lines.enumerated().compactMap { index, line in
-                let trimmed = line.trimmingCharacters(in: .whitespaces)
-                if trimmed.hasPrefix("def ") || trimmed.hasPrefix("class ") {
-                    return "\(trimmed) (Line \(index + 1))"
-                }
-                return nil
-            }
-        case "javascript":
-            toc = lines.enumerated().compactMap { index, line in
-                let trimmed = line.trimmingCharacters(in: .whitespaces)
-                if trimmed.hasPrefix("function ") || trimmed.hasPrefix("class ") {
-                    return "\(trimmed) (Line \(index + 1))"
-                }
-                return nil
-            }
-        case "java":
-            toc = lines.enumerated().compactMap { index, line in
-                let t = line.trimmingCharacters(in: .whitespaces)
-                if t.hasPrefix("class ") || (t.contains(" void ") || (t.contains(" public ") && t.contains("(") && t.contains(")"))) {
-                    return "\(t) (Line \(index + 1))"
-                }
-                return nil
-            }
-        case "kotlin":
-            toc = lines.enumerated().compactMap { index, line in
-                let t = line.trimmingCharacters(in: .whitespaces)
-                if t.hasPrefix("class ") || t.hasPrefix("object ") || t.hasPrefix("fun ") {
-                    return "\(t) (Line \(index + 1))"
-                }
-                return nil
-            }
-        case "go":
-            toc = lines.enumerated().compactMap { index, line in
-                let t = line.trimmingCharacters(in: .whitespaces)
-                if t.hasPrefix("func ") || t.hasPrefix("type ") {
-                    return "\(t) (Line \(index + 1))"
-                }
-                return nil
-            }
-        case "ruby":
-            toc = lines.enumerated().compactMap { index, line in
-                let t = line.trimmingCharacters(in: .whitespaces)
-                if t.hasPrefix("def ") || t.hasPrefix("class ") || t.hasPrefix("module ") {
-                    return "\(t) (Line \(index + 1))"
-                }
-                return nil
-            }
-        case "rust":
-            toc = lines.enumerated().compactMap { index, line in
-                let t = line.trimmingCharacters(in: .whitespaces)
-                if t.hasPrefix("fn ") || t.hasPrefix("struct ") || t.hasPrefix("enum ") || t.hasPrefix("impl ") {
-                    return "\(t) (Line \(index + 1))"
-                }
-                return nil
-            }
-        case "typescript":
-            toc = lines.enumerated().compactMap { index, line in
-                let t = line.trimmingCharacters(in: .whitespaces)
-                if t.hasPrefix("function ") || t.hasPrefix("class ") || t.hasPrefix("interface ") || t.hasPrefix("type ") {
-                    return "\(t) (Line \(index + 1))"
-                }
-                return nil
-            }
-        case "php":
-            toc = lines.enumerated().compactMap { index, line in
-                let t = line.trimmingCharacters(in: .whitespaces)
-                if t.hasPrefix("function ") || t.hasPrefix("class ") || t.hasPrefix("interface ") || t.hasPrefix("trait ") {
-                    return "\(t) (Line \(index + 1))"
-                }
-                return nil
-            }
-        case "objective-c":
-            toc = lines.enumerated().compactMap { index, line in
-                let t = line.trimmingCharacters(in: .whitespaces)
-                if t.hasPrefix("@interface") || t.hasPrefix("@implementation") || t.contains(")\n{") {
-                    return "\(t) (Line \(index + 1))"
-                }
-                return nil
-            }
-        case "c", "cpp":
-            toc = lines.enumerated().compactMap { index, line in
-                let trimmed = line.trimmingCharacters(in: .whitespaces)
-                if trimmed.contains("(") && !trimmed.contains(";") && (trimmed.hasPrefix("void ") || trimmed.hasPrefix("int ") || trimmed.hasPrefix("float ") || trimmed.hasPrefix("double ") || trimmed.hasPrefix("char ") || trimmed.contains("{")) {
-                    return "\(trimmed) (Line \(index + 1))"
-                }
-                return nil
-            }
-        case "bash", "zsh":
-            toc = lines.enumerated().compactMap { index, line in
-                let trimmed = line.trimmingCharacters(in: .whitespaces)
-                // Simple function detection: name() { or function name { or name()\n{
-                if trimmed.range(of: "^([A-Za-z_][A-Za-z0-9_]*)\\s*\\(\\)\\s*\\{", options: .regularExpression) != nil ||
-                   trimmed.range(of: "^function\\s+[A-Za-z_][A-Za-z0-9_]*\\s*\\{", options: .regularExpression) != nil {
-                    return "\(trimmed) (Line \(index + 1))"
-                }
-                return nil
-            }
-        case "powershell":
-            toc = lines.enumerated().compactMap { index, line in
-                let trimmed = line.trimmingCharacters(in: .whitespaces)
-                if trimmed.range(of: #"^function\s+[A-Za-z_][A-Za-z0-9_\-]*\s*\{"#, options: .regularExpression) != nil ||
-                   trimmed.hasPrefix("param(") {
-                    return "\(trimmed) (Line \(index + 1))"
-                }
-                return nil
-            }
-        case "html", "css", "json", "markdown", "csv":
-            toc = lines.enumerated().compactMap { index, line in
-                let trimmed = line.trimmingCharacters(in: .whitespaces)
-                if !trimmed.isEmpty && (trimmed.hasPrefix("#") || trimmed.hasPrefix("<h")) {
-                    return "\(trimmed) (Line \(index + 1))"
-                }
-                return nil
-            }
-        case "csharp":
-            toc = lines.enumerated().compactMap { index, line in
-                let t = line.trimmingCharacters(in: .whitespaces)
-                if t.hasPrefix("class ") || t.hasPrefix("interface ") || t.hasPrefix("enum ") || t.contains(" static void Main(") || (t.contains(" void ") && t.contains("(") && t.contains(")") && t.contains("{")) {
-                    return "\(t) (Line \(index + 1))"
-                }
-                return nil
-            }
-        default:
-            // For unknown or standard/plain, show first non-empty lines as headings
-            toc = lines.enumerated().compactMap { index, line in
-                let t = line.trimmingCharacters(in: .whitespaces)
-                if !t.isEmpty && t.count < 120 { return "\(t) (Line \(index + 1))" }
-                return nil
-            }
+    private func symbolName(for kind: DocumentOutline.Entry.Kind) -> String {
+        switch kind {
+        case .type: return "cube"
+        case .function: return "function"
+        case .heading: return "number"
+        case .line: return "text.alignleft"
         }
+    }
 
-        return toc.isEmpty ? ["No headers found"] : toc
+    private func jump(to entry: DocumentOutline.Entry) {
+        DispatchQueue.main.async {
+            NotificationCenter.default.post(name: .moveCursorToLine, object: entry.line + 1)
+        }
     }
 }
 struct ProjectStructureSidebarView: View {
@@ -201,6 +117,7 @@ struct ProjectStructureSidebarView: View {
     let onOpenFile: () -> Void
     let onOpenFolder: () -> Void
     let onOpenProjectFile: (URL) -> Void
+    let onLoadDirectory: (URL) -> Void
     let onRefreshTree: () -> Void
     @State private var expandedDirectories: Set<String> = []
 
@@ -273,8 +190,16 @@ struct ProjectStructureSidebarView: View {
                         }
                     }
                 )) {
-                    ForEach(node.children) { child in
-                        projectNodeView(child, level: level + 1)
+                    if let children = node.children {
+                        ForEach(children) { child in
+                            projectNodeView(child, level: level + 1)
+                        }
+                    } else {
+                        // Directories are listed the first time they are shown expanded
+                        ProgressView()
+                            .controlSize(.small)
+                            .padding(.leading, CGFloat(level + 1) * 10)
+                            .onAppear { onLoadDirectory(node.url) }
                     }
                 } label: {
                     Label(node.url.lastPathComponent, systemImage: "folder")
@@ -307,10 +232,3 @@ struct ProjectStructureSidebarView: View {
         }
     }
 }
-
-struct ProjectTreeNode: Identifiable {
-    let url: URL
-    let isDirectory: Bool
-    var children: [ProjectTreeNode]
-    var id: String { url.path }
-}
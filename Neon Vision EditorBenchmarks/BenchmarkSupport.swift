@@ -0,0 +1,179 @@
+import Foundation
+#if canImport(Darwin)
+import Darwin
+#elseif canImport(Glibc)
+import Glibc
+#endif
+
+// Shared inputs, timing and reporting for the benchmark cases.
+//
+// Environment overrides:
+//   NEON_BENCHMARK_LANGUAGES  comma-separated languages for synthetic files (default: a representative set)
+//   NEON_BENCHMARK_LINES      comma-separated synthetic line counts (default: 10000,100000; add 1000000 for the full run)
+//   NEON_BENCHMARK_EDITS      simulated edits per latency run (default: 300)
+enum Benchmark {
+    static let languages: [String] = list("NEON_BENCHMARK_LANGUAGES") ?? ["swift", "python", "javascript", "c", "json", "bash"]
+    static let lineCounts: [Int] = list("NEON_BENCHMARK_LINES")?.compactMap(Int.init) ?? [10_000, 100_000]
+    static let editCount: Int = list("NEON_BENCHMARK_EDITS")?.first.flatMap(Int.init) ?? 300
+
+    private static func list(_ key: String) -> [String]? {
+        guard let raw = ProcessInfo.processInfo.environment[key], !raw.isEmpty else { return nil }
+        return raw.split(separator: ",").map { $0.trimmingCharacters(in: .whitespaces) }
+    }
+
+    // MARK: Inputs
+
+    struct Fixture {
+        let name: String
+        let url: URL
+        let text: String
+    }
+
+    /// Files in `samples/language-fixtures`, located relative to this source file.
+    static func fixtures() -> [Fixture] {
+        let root = URL(fileURLWithPath: #filePath)
+            .deletingLastPathComponent()
+            .deletingLastPathComponent()
+            .appendingPathComponent("samples/language-fixtures")
+        let names = (try? FileManager.default.contentsOfDirectory(atPath: root.path)) ?? []
+        return names.sorted().compactMap { name in
+            guard name != "README.md" else { return nil }
+            let url = root.appendingPathComponent(name)
+            guard let text = try? String(contentsOf: url, encoding: .utf8) else { return nil }
+            return Fixture(name: name, url: url, text: text)
+        }
+    }
+
+    /// A deterministic file of `lineCount` lines that exercises keywords, strings, numbers,
+    /// line comments and (where the language has them) multi-line constructs.
+    static func syntheticSource(language: String, lineCount: Int) -> String {
+        let template = syntheticTemplate(for: language)
+        var lines: [String] = []
+        lines.reserveCapacity(lineCount)
+        var block = 0
+        while lines.count < lineCount {
+            for line in template where lines.count < lineCount {
+                lines.append(line.replacingOccurrences(of: "$N", with: String(block)))
+            }
+            block += 1
+        }
+        return lines.joined(separator: "\n") + "\n"
+    }
+
+    private static func syntheticTemplate(for language: String) -> [String] {
+        switch language {
+        case "swift":
+            return [
+                "/// Computes value $N.",
+                "func compute$N(value: Int) -> Int {",
+                "    let label = \"item $N\" // trailing comment",
+                "    /* block comment",
+                "       spanning lines */",
+                "    return value * $N + 0.5",
+                "}"
+            ]
+        case "python":
+            return [
+                "def compute_$N(value: int) -> int:",
+                "    \"\"\"Docstring for $N",
+                "    spanning lines.\"\"\"",
+                "    label = 'item $N'  # trailing comment",
+                "    return value * $N"
+            ]
+        case "javascript", "typescript":
+            return [
+                "function compute$N(value) {",
+                "  const label = `item $N",
+                "  spans lines`; // trailing comment",
+                "  /* block */ return value * $N;",
+                "}"
+            ]
+        case "c", "cpp":
+            return [
+                "int compute$N(int value) {",
+                "    char *label = \"item $N\"; // trailing comment",
+                "    /* block comment",
+                "       spanning lines */",
+                "    return value * $N;",
+                "}"
+            ]
+        case "json":
+            return [
+                "{\"id\": $N, \"name\": \"item $N\", \"enabled\": true, \"ratio\": 0.$N, \"tags\": [\"a\", \"b\", null]},"
+            ]
+        case "bash", "zsh":
+            return [
+                "function compute_$N() {",
+                "  local label=\"item $N\" # trailing comment",
+                "  cat <<EOF",
+                "  here-document body $N with $label",
+                "EOF",
+                "  if [ \"$1\" -gt $N ]; then echo '$N'; fi",
+                "}"
+            ]
+        default:
+            return [
+                "// line $N",
+                "if value == $N { return \"item $N\" }"
+            ]
+        }
+    }
+
+    // MARK: Measurement
+
+    static func now() -> UInt64 {
+        DispatchTime.now().uptimeNanoseconds
+    }
+
+    /// Bytes currently allocated on the heap, for before/after deltas.
+    static func heapBytesInUse() -> Int {
+#if canImport(Darwin)
+        var stats = malloc_statistics_t()
+        malloc_zone_statistics(nil, &stats)
+        return Int(stats.size_in_use)
+#elseif canImport(Glibc)
+        return Int(UInt32(bitPattern: mallinfo().uordblks))
+#else
+        return 0
+#endif
+    }
+
+    static func percentile(_ sortedSamples: [UInt64], _ fraction: Double) -> UInt64 {
+        guard !sortedSamples.isEmpty else { return 0 }
+        let index = min(sortedSamples.count - 1, Int(Double(sortedSamples.count) * fraction))
+        return sortedSamples[index]
+    }
+
+    // MARK: Reporting
+
+    static func report(_ columns: [String]) {
+        print("[benchmark] " + columns.joined(separator: "  "))
+    }
+
+    static func milliseconds(_ nanoseconds: UInt64) -> String {
+        String(format: "%.3fms", Double(nanoseconds) / 1_000_000)
+    }
+
+    static func perSecond(_ count: Int, _ nanoseconds: UInt64) -> String {
+        guard nanoseconds > 0 else { return "-" }
+        return String(format: "%.0f/s", Double(count) / (Double(nanoseconds) / 1_000_000_000))
+    }
+
+    static func bytes(_ count: Int) -> String {
+        String(format: "%.1fKB", Double(count) / 1024)
+    }
+}
+
+// Small deterministic generator so every run edits the same positions.
+struct BenchmarkRandom {
+    private var state: UInt64
+
+    init(seed: UInt64) {
+        state = seed
+    }
+
+    mutating func next(below bound: Int) -> Int {
+        state = state &* 6364136223846793005 &+ 1442695040888963407
+        return Int((state >> 33) % UInt64(max(1, bound)))
+    }
+}
@@ -0,0 +1,59 @@
+import XCTest
+@testable import NeonVisionCore
+
+final class DocumentOutlineBenchmarks: XCTestCase {
+    /// Times the first scan of each synthetic file, then replays typing and times each edit until
+    /// the updated outline reaches the main queue. The incrementally maintained entries are then
+    /// checked against a scan of the final text.
+    func testPerEditLatency() {
+        for language in Benchmark.languages {
+            for lineCount in Benchmark.lineCounts {
+                let text = NSMutableString(string: Benchmark.syntheticSource(language: language, lineCount: lineCount))
+                let outline = DocumentOutline(language: language)
+                var start = Benchmark.now()
+                waitForUpdate(of: outline) { outline.reset(text: text as String, generation: 0) }
+                let scanTime = Benchmark.now() - start
+                let entryCount = outline.entries.count
+
+                let insertions = ["x", "\n", "func ", "\n\nclass Added {\n", "# Title\n"]
+                var random = BenchmarkRandom(seed: UInt64(lineCount))
+                var samples: [UInt64] = []
+                samples.reserveCapacity(Benchmark.editCount)
+                for generation in 1...Benchmark.editCount {
+                    let location = random.next(below: text.length)
+                    let range: NSRange
+                    let replacement: String
+                    if random.next(below: 4) == 0 {
+                        range = NSRange(location: location, length: min(3, text.length - location))
+                        replacement = ""
+                    } else {
+                        range = NSRange(location: location, length: 0)
+                        replacement = insertions[random.next(below: insertions.count)]
+                    }
+                    text.replaceCharacters(in: range, with: replacement)
+
+                    start = Benchmark.now()
+                    waitForUpdate(of: outline) { outline.applyEdit(replacing: range, with: replacement, generation: generation) }
+                    samples.append(Benchmark.now() - start)
+                }
+
+                let rescanned = DocumentOutline(language: language)
+                waitForUpdate(of: rescanned) { rescanned.reset(text: text as String, generation: 0) }
+                XCTAssertEqual(outline.entries, rescanned.entries)
+                samples.sort()
+                Benchmark.report([
+                    "outline", language, "\(lineCount) lines", "\(entryCount) entries", "\(samples.count) edits",
+                    "scan \(Benchmark.milliseconds(scanTime))",
+                    "p50 \(Benchmark.milliseconds(Benchmark.percentile(samples, 0.5)))",
+                    "p99 \(Benchmark.milliseconds(Benchmark.percentile(samples, 0.99)))"
+                ])
+            }
+        }
+    }
+
+    private func waitForUpdate(of outline: DocumentOutline, _ change: () -> Void) {
+        let updated = expectation(forNotification: DocumentOutline.didUpdateNotification, object: outline)
+        change()
+        wait(for: [updated], timeout: 120)
+    }
+}
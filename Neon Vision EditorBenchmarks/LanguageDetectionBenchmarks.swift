@@ -0,0 +1,66 @@
+import XCTest
+@testable import NeonVisionCore
+
+final class LanguageDetectionBenchmarks: XCTestCase {
+    private let iterations = 20
+
+    func testDetectFixtures() {
+        for fixture in Benchmark.fixtures() {
+            // Content only, as when text is pasted into an untitled tab
+            let samples = sample { _ = LanguageDetector.shared.detect(text: fixture.text, name: nil, fileURL: nil) }
+            let detected = LanguageDetector.shared.detect(text: fixture.text, name: nil, fileURL: nil)
+            Benchmark.report([
+                "detect", fixture.name, detected.lang,
+                "p50 \(Benchmark.milliseconds(Benchmark.percentile(samples, 0.5)))",
+                "p99 \(Benchmark.milliseconds(Benchmark.percentile(samples, 0.99)))"
+            ])
+        }
+    }
+
+    func testDetectSyntheticFiles() {
+        for language in Benchmark.languages {
+            for lineCount in Benchmark.lineCounts {
+                let text = Benchmark.syntheticSource(language: language, lineCount: lineCount)
+                let heapBefore = Benchmark.heapBytesInUse()
+                let samples = sample(iterations: lineCount > 10_000 ? 3 : iterations) {
+                    _ = LanguageDetector.shared.detect(text: text, name: nil, fileURL: nil)
+                }
+                let heapDelta = Benchmark.heapBytesInUse() - heapBefore
+                let detected = LanguageDetector.shared.detect(text: text, name: nil, fileURL: nil)
+                let median = Benchmark.percentile(samples, 0.5)
+                Benchmark.report([
+                    "detect", language, "\(lineCount) lines", "-> \(detected.lang)",
+                    "p50 \(Benchmark.milliseconds(median))",
+                    "p99 \(Benchmark.milliseconds(Benchmark.percentile(samples, 0.99)))",
+                    "\(Benchmark.perSecond(text.utf16.count, median)) chars",
+                    "heap Δ \(Benchmark.bytes(heapDelta))"
+                ])
+            }
+        }
+    }
+
+    func testDetectSampledSyntheticFiles() {
+        for language in Benchmark.languages {
+            for lineCount in Benchmark.lineCounts {
+                let text = Benchmark.syntheticSource(language: language, lineCount: lineCount)
+                let samples = sample { _ = LanguageDetector.shared.detectSampled(text: text, name: nil, fileURL: nil) }
+                let detected = LanguageDetector.shared.detectSampled(text: text, name: nil, fileURL: nil)
+                Benchmark.report([
+                    "detect-sampled", language, "\(lineCount) lines", "-> \(detected.lang)",
+                    "p50 \(Benchmark.milliseconds(Benchmark.percentile(samples, 0.5)))",
+                    "examined \(Benchmark.bytes(detected.examinedByteCount)) of \(Benchmark.bytes(text.utf8.count))"
+                ])
+            }
+        }
+    }
+
+    private func sample(iterations: Int? = nil, _ body: () -> Void) -> [UInt64] {
+        var samples: [UInt64] = []
+        for _ in 0..<(iterations ?? self.iterations) {
+            let start = Benchmark.now()
+            body()
+            samples.append(Benchmark.now() - start)
+        }
+        return samples.sorted()
+    }
+}
@@ -0,0 +1,64 @@
+import XCTest
+@testable import NeonVisionCore
+
+final class ProjectFileIndexBenchmarks: XCTestCase {
+    /// Indexes a synthetic project, then times a full re-index with one changed file and each
+    /// Quick Open query as the user types, measured until the ranked results reach the main
+    /// queue. Each keystroke after the first only rescores what the previous query matched.
+    func testQueryLatency() {
+        let root = URL(fileURLWithPath: "/tmp/ProjectFileIndexBenchmarks")
+        let directories = ["Sources/Core", "Sources/UI", "Tests", "Resources/Localization", "Scripts"]
+        for lineCount in Benchmark.lineCounts {
+            // One file per ten lines keeps the file counts in the range of real repositories
+            let files = (0..<(lineCount / 10)).map { index in
+                root.appendingPathComponent("\(directories[index % directories.count])/Module\(index / 50)/File\(index).swift")
+            }
+            let index = ProjectFileIndex()
+            index.open(root: root)
+            var start = Benchmark.now()
+            index.update(files: files)
+            _ = search(index, "")
+            let buildTime = Benchmark.now() - start
+
+            start = Benchmark.now()
+            index.update(files: files, changedPaths: [files[files.count / 2]])
+            _ = search(index, "")
+            let updateTime = Benchmark.now() - start
+
+            var samples: [UInt64] = []
+            var lastCount = 0
+            var best: ProjectFileIndex.Entry?
+            for query in ["c", "cm", "cm1", "cm1f", "cm1f5", "cm1f50"] {
+                start = Benchmark.now()
+                let results = search(index, query)
+                samples.append(Benchmark.now() - start)
+                lastCount = results.count
+                best = results.first?.entry
+            }
+            if files.count > 50 {
+                XCTAssertGreaterThan(lastCount, 0)
+                // "cm1f50" picks Core/Module1/File50 out by its segment starts
+                XCTAssertEqual(best?.path, "Sources/Core/Module1/File50.swift")
+            }
+            samples.sort()
+            Benchmark.report([
+                "file-index", "\(files.count) files",
+                "build \(Benchmark.milliseconds(buildTime))",
+                "update \(Benchmark.milliseconds(updateTime))",
+                "query p50 \(Benchmark.milliseconds(Benchmark.percentile(samples, 0.5)))",
+                "max \(Benchmark.milliseconds(samples.last ?? 0))"
+            ])
+        }
+    }
+
+    private func search(_ index: ProjectFileIndex, _ query: String) -> [ProjectFileIndex.Match] {
+        let done = expectation(description: "query")
+        var results: [ProjectFileIndex.Match] = []
+        index.search(query, limit: 300) { _, entries in
+            results = entries
+            done.fulfill()
+        }
+        wait(for: [done], timeout: 120)
+        return results
+    }
+}
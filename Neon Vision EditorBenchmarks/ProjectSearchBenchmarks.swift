@@ -0,0 +1,57 @@
+import XCTest
+@testable import NeonVisionCore
+
+final class ProjectSearchBenchmarks: XCTestCase {
+    /// Searches a generated project of many small files (plus a binary one that must be skipped)
+    /// and times the first streamed batch and the whole search.
+    func testProjectSearchLatency() throws {
+        let root = FileManager.default.temporaryDirectory.appendingPathComponent("ProjectSearchBenchmarks-\(UUID().uuidString)")
+        try FileManager.default.createDirectory(at: root, withIntermediateDirectories: true)
+        defer { try? FileManager.default.removeItem(at: root) }
+
+        for lineCount in Benchmark.lineCounts {
+            let fileCount = max(1, lineCount / 500)
+            let source = Benchmark.syntheticSource(language: "swift", lineCount: 500)
+            var files: [URL] = []
+            for index in 0..<fileCount {
+                let url = root.appendingPathComponent("\(lineCount)-\(index).swift")
+                try source.write(to: url, atomically: false, encoding: .utf8)
+                files.append(url)
+            }
+            let binary = root.appendingPathComponent("\(lineCount).bin")
+            try Data([0x00, 0x56, 0x61, 0x6C, 0x75, 0x65]).write(to: binary)
+            files.append(binary)
+
+            let search = ProjectSearch()
+            let done = expectation(description: "search")
+            var firstBatch: UInt64?
+            var matchCount = 0
+            var summary = ProjectSearch.Summary()
+            let start = Benchmark.now()
+            try search.start(
+                query: TextMatchIndex.Query(pattern: "value", usesRegex: false, caseSensitive: false),
+                in: files,
+                onMatches: { matches in
+                    if firstBatch == nil {
+                        firstBatch = Benchmark.now() - start
+                    }
+                    matchCount += matches.count
+                },
+                onFinish: {
+                    summary = $0
+                    done.fulfill()
+                }
+            )
+            wait(for: [done], timeout: 120)
+            let total = Benchmark.now() - start
+
+            XCTAssertEqual(summary.skippedFileCount, 1)
+            XCTAssertEqual(summary.matchCount, matchCount)
+            Benchmark.report([
+                "project-search", "\(fileCount) files", "\(matchCount) results",
+                "first \(Benchmark.milliseconds(firstBatch ?? total))",
+                "total \(Benchmark.milliseconds(total))"
+            ])
+        }
+    }
+}
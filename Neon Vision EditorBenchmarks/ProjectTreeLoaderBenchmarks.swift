@@ -0,0 +1,53 @@
+import XCTest
+@testable import NeonVisionCore
+
+final class ProjectTreeLoaderBenchmarks: XCTestCase {
+    /// Times listing the root of a generated project (what opening a folder waits for) against
+    /// collecting its whole file list, and checks that ignored directories stay out of both.
+    func testRootListingLatency() throws {
+        let root = FileManager.default.temporaryDirectory.appendingPathComponent("ProjectTreeLoaderBenchmarks-\(UUID().uuidString)")
+        defer { try? FileManager.default.removeItem(at: root) }
+
+        let directoryCount = 40
+        let filesPerDirectory = 50
+        for name in ["Sources", "node_modules"] {
+            for directory in 0..<directoryCount {
+                let url = root.appendingPathComponent(name).appendingPathComponent("module\(directory)")
+                try FileManager.default.createDirectory(at: url, withIntermediateDirectories: true)
+                for file in 0..<filesPerDirectory {
+                    try Data().write(to: url.appendingPathComponent("file\(file).swift"))
+                }
+            }
+        }
+
+        let loader = ProjectTreeLoader()
+        let listed = expectation(description: "root")
+        var rootNodes: [ProjectTreeNode] = []
+        var start = Benchmark.now()
+        loader.loadChildren(of: root) {
+            rootNodes = $0
+            listed.fulfill()
+        }
+        wait(for: [listed], timeout: 120)
+        let rootTime = Benchmark.now() - start
+
+        let collected = expectation(description: "files")
+        var files: [URL] = []
+        start = Benchmark.now()
+        loader.loadFileList(under: root) {
+            files = $0
+            collected.fulfill()
+        }
+        wait(for: [collected], timeout: 120)
+        let fileListTime = Benchmark.now() - start
+
+        XCTAssertEqual(rootNodes.map(\.url.lastPathComponent), ["Sources"])
+        XCTAssertNil(rootNodes.first?.children)
+        XCTAssertEqual(files.count, directoryCount * filesPerDirectory)
+        Benchmark.report([
+            "project-tree", "\(files.count) files",
+            "root \(Benchmark.milliseconds(rootTime))",
+            "file list \(Benchmark.milliseconds(fileListTime))"
+        ])
+    }
+}
@@ -0,0 +1,116 @@
+import XCTest
+@testable import NeonVisionCore
+
+final class SyntaxHighlightingBenchmarks: XCTestCase {
+    func testTokenizeFixtures() {
+        for fixture in Benchmark.fixtures() {
+            let language = LanguageDetector.shared.preferredLanguage(for: fixture.url) ?? "standard"
+            let result = tokenize(fixture.text, language: language)
+            Benchmark.report([
+                "tokenize", fixture.name, language,
+                "\(result.tokenCount) tokens",
+                Benchmark.milliseconds(result.serial),
+                Benchmark.perSecond(result.tokenCount, result.serial)
+            ])
+        }
+    }
+
+    func testTokenizeSyntheticFiles() {
+        for language in Benchmark.languages {
+            for lineCount in Benchmark.lineCounts {
+                let text = Benchmark.syntheticSource(language: language, lineCount: lineCount)
+                let result = tokenize(text, language: language, concurrently: true)
+                XCTAssertGreaterThan(result.tokenCount, 0, "\(language) produced no tokens")
+                Benchmark.report([
+                    "tokenize", language, "\(lineCount) lines",
+                    "\(result.tokenCount) tokens",
+                    "serial \(Benchmark.milliseconds(result.serial)) \(Benchmark.perSecond(result.tokenCount, result.serial))",
+                    "concurrent \(Benchmark.milliseconds(result.concurrent)) \(Benchmark.perSecond(result.tokenCount, result.concurrent))",
+                    "heap Δ \(Benchmark.bytes(result.heapDelta))"
+                ])
+            }
+        }
+    }
+
+    /// Replays typing on a synthetic file: each edit updates the line-state table and
+    /// re-tokenizes the dirty lines, which is the work done per keystroke.
+    func testPerEditLatency() {
+        for language in Benchmark.languages {
+            for lineCount in Benchmark.lineCounts {
+                let text = NSMutableString(string: Benchmark.syntheticSource(language: language, lineCount: lineCount))
+                let grammar = SyntaxGrammarCache.shared.grammar(for: language)
+                let table = SyntaxLineStateTable(language: language, text: text)
+                let insertions = ["x", "\n", "/*", "*/", "\"", "\"\"\"", " // note", "<<EOF"]
+                var random = BenchmarkRandom(seed: UInt64(lineCount))
+                var samples: [UInt64] = []
+                samples.reserveCapacity(Benchmark.editCount)
+
+                for _ in 0..<Benchmark.editCount {
+                    let location = random.next(below: text.length)
+                    let editedRange: NSRange
+                    let delta: Int
+                    if random.next(below: 4) == 0 && location < text.length {
+                        text.deleteCharacters(in: NSRange(location: location, length: 1))
+                        editedRange = NSRange(location: location, length: 0)
+                        delta = -1
+                    } else {
+                        let insertion = insertions[random.next(below: insertions.count)]
+                        text.insert(insertion, at: location)
+                        editedRange = NSRange(location: location, length: insertion.utf16.count)
+                        delta = insertion.utf16.count
+                    }
+                    // The editor tokenizes an immutable snapshot; taking it is not part of the edit cost
+                    let snapshot = text.substring(from: 0)
+
+                    let start = Benchmark.now()
+                    let dirty = table.applyEdit(in: text, editedRange: editedRange, changeInLength: delta)
+                    let window = text.lineRange(for: dirty)
+                    let tokens = grammar.tokens(
+                        in: snapshot,
+                        range: window,
+                        startingIn: table.state(at: window.location),
+                        profile: table.profile
+                    )
+                    samples.append(Benchmark.now() - start)
+                    XCTAssertLessThanOrEqual(NSMaxRange(tokens.last?.range ?? window), NSMaxRange(window))
+                }
+
+                samples.sort()
+                Benchmark.report([
+                    "edit", language, "\(lineCount) lines", "\(samples.count) edits",
+                    "p50 \(Benchmark.milliseconds(Benchmark.percentile(samples, 0.5)))",
+                    "p99 \(Benchmark.milliseconds(Benchmark.percentile(samples, 0.99)))"
+                ])
+            }
+        }
+    }
+
+    private struct TokenizeResult {
+        var tokenCount = 0
+        var serial: UInt64 = 0
+        var concurrent: UInt64 = 0
+        var heapDelta = 0
+    }
+
+    private func tokenize(_ text: String, language: String, concurrently: Bool = false) -> TokenizeResult {
+        let grammar = SyntaxGrammarCache.shared.grammar(for: language)
+        let profile = syntaxLexicalProfile(for: language)
+        let range = NSRange(location: 0, length: text.utf16.count)
+        var result = TokenizeResult()
+
+        let heapBefore = Benchmark.heapBytesInUse()
+        var start = Benchmark.now()
+        let tokens = grammar.tokens(in: text, range: range, startingIn: .normal, profile: profile)
+        result.serial = Benchmark.now() - start
+        result.heapDelta = Benchmark.heapBytesInUse() - heapBefore
+        result.tokenCount = tokens.count
+
+        if concurrently {
+            start = Benchmark.now()
+            let concurrentTokens = grammar.tokensConcurrently(in: text, range: range, profile: profile)
+            result.concurrent = Benchmark.now() - start
+            XCTAssertEqual(concurrentTokens.count, tokens.count, "\(language): concurrent scan disagrees with serial scan")
+        }
+        return result
+    }
+}
@@ -0,0 +1,51 @@
+import XCTest
+@testable import NeonVisionCore
+
+final class TextLineIndexBenchmarks: XCTestCase {
+    /// Replays typing and times the index update plus the caret lookup that follows it, then
+    /// checks the incrementally maintained index against one built from scratch.
+    func testPerEditLatency() {
+        for lineCount in Benchmark.lineCounts {
+            let text = NSMutableString(string: Benchmark.syntheticSource(language: "swift", lineCount: lineCount))
+            var start = Benchmark.now()
+            let index = TextLineIndex(text: text)
+            let buildTime = Benchmark.now() - start
+            let insertions = ["x", "\n", "\r\n", "\r", "func ", "\n\n    "]
+            var random = BenchmarkRandom(seed: UInt64(lineCount))
+            var samples: [UInt64] = []
+            samples.reserveCapacity(Benchmark.editCount)
+
+            for _ in 0..<Benchmark.editCount {
+                let location = random.next(below: text.length)
+                let editedRange: NSRange
+                let delta: Int
+                if random.next(below: 4) == 0 {
+                    let length = min(3, text.length - location)
+                    text.deleteCharacters(in: NSRange(location: location, length: length))
+                    editedRange = NSRange(location: location, length: 0)
+                    delta = -length
+                } else {
+                    let insertion = insertions[random.next(below: insertions.count)]
+                    text.insert(insertion, at: location)
+                    editedRange = NSRange(location: location, length: insertion.utf16.count)
+                    delta = insertion.utf16.count
+                }
+
+                start = Benchmark.now()
+                index.applyEdit(in: text, editedRange: editedRange, changeInLength: delta)
+                let line = index.lineIndex(containing: NSMaxRange(editedRange))
+                samples.append(Benchmark.now() - start)
+                XCTAssertEqual(index.lineStart(line), text.lineRange(for: NSRange(location: NSMaxRange(editedRange), length: 0)).location)
+            }
+
+            XCTAssertEqual(index.lineStarts, TextLineIndex(text: text).lineStarts)
+            samples.sort()
+            Benchmark.report([
+                "line-index", "\(lineCount) lines", "\(samples.count) edits",
+                "build \(Benchmark.milliseconds(buildTime))",
+                "p50 \(Benchmark.milliseconds(Benchmark.percentile(samples, 0.5)))",
+                "p99 \(Benchmark.milliseconds(Benchmark.percentile(samples, 0.99)))"
+            ])
+        }
+    }
+}
@@ -0,0 +1,66 @@
+import XCTest
+@testable import NeonVisionCore
+
+final class TextMatchIndexBenchmarks: XCTestCase {
+    /// Times the initial background search, then replays typing and times the incremental
+    /// update, checking the result against a fresh search of the edited text. Edits whose
+    /// matches did not line up within the rescan budget are searched again, as the editor would.
+    func testPerEditLatency() {
+        let query = TextMatchIndex.Query(pattern: "Value", usesRegex: false, caseSensitive: false)
+        for lineCount in Benchmark.lineCounts {
+            let text = NSMutableString(string: Benchmark.syntheticSource(language: "swift", lineCount: lineCount))
+            let index = TextMatchIndex()
+            let searchTime = search(index, query: query, in: text)
+            let insertions = ["v", "value", "VALUE", "\n", "val"]
+            var random = BenchmarkRandom(seed: UInt64(lineCount))
+            var samples: [UInt64] = []
+            samples.reserveCapacity(Benchmark.editCount)
+            var researchCount = 0
+
+            for _ in 0..<Benchmark.editCount {
+                let location = random.next(below: text.length)
+                let editedRange: NSRange
+                let delta: Int
+                if random.next(below: 4) == 0 {
+                    let length = min(3, text.length - location)
+                    text.deleteCharacters(in: NSRange(location: location, length: length))
+                    editedRange = NSRange(location: location, length: 0)
+                    delta = -length
+                } else {
+                    let insertion = insertions[random.next(below: insertions.count)]
+                    text.insert(insertion, at: location)
+                    editedRange = NSRange(location: location, length: insertion.utf16.count)
+                    delta = insertion.utf16.count
+                }
+                let start = Benchmark.now()
+                index.applyEdit(in: text, editedRange: editedRange, changeInLength: delta)
+                samples.append(Benchmark.now() - start)
+                if !index.isCurrent {
+                    researchCount += 1
+                    _ = search(index, query: query, in: text)
+                }
+            }
+
+            let incremental = index.matches
+            let fresh = TextMatchIndex()
+            _ = search(fresh, query: query, in: text)
+            XCTAssertEqual(incremental, fresh.matches)
+            samples.sort()
+            Benchmark.report([
+                "find", "\(lineCount) lines", "\(incremental.count) matches", "\(researchCount) re-searches",
+                "search \(Benchmark.milliseconds(searchTime))",
+                "edit p50 \(Benchmark.milliseconds(Benchmark.percentile(samples, 0.5)))",
+                "p99 \(Benchmark.milliseconds(Benchmark.percentile(samples, 0.99)))"
+            ])
+        }
+    }
+
+    private func search(_ index: TextMatchIndex, query: TextMatchIndex.Query, in text: NSString) -> UInt64 {
+        let done = expectation(description: "search")
+        let snapshot = NSString(string: text)
+        let start = Benchmark.now()
+        index.matches(for: query, in: { snapshot }) { _ in done.fulfill() }
+        wait(for: [done], timeout: 120)
+        return Benchmark.now() - start
+    }
+}
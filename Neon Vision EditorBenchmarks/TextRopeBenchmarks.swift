@@ -0,0 +1,55 @@
+import XCTest
+@testable import NeonVisionCore
+
+final class TextRopeBenchmarks: XCTestCase {
+    /// Replays typing on a synthetic file and times each edit plus a caret line lookup, checking
+    /// the rope against an `NSMutableString` that receives the same edits.
+    func testPerEditLatency() {
+        for lineCount in Benchmark.lineCounts {
+            let source = Benchmark.syntheticSource(language: "swift", lineCount: lineCount)
+            let heapBefore = Benchmark.heapBytesInUse()
+            var start = Benchmark.now()
+            let rope = TextRope(source)
+            let buildTime = Benchmark.now() - start
+            let heapDelta = Benchmark.heapBytesInUse() - heapBefore
+            let reference = NSMutableString(string: source)
+            let insertions = ["x", "\n", "func ", "\n\n    ", "}"]
+            var random = BenchmarkRandom(seed: UInt64(lineCount))
+            var samples: [UInt64] = []
+            samples.reserveCapacity(Benchmark.editCount)
+
+            for _ in 0..<Benchmark.editCount {
+                let location = random.next(below: reference.length)
+                let range: NSRange
+                let replacement: String
+                if random.next(below: 4) == 0 {
+                    range = NSRange(location: location, length: min(8, reference.length - location))
+                    replacement = ""
+                } else {
+                    range = NSRange(location: location, length: 0)
+                    replacement = insertions[random.next(below: insertions.count)]
+                }
+                reference.replaceCharacters(in: range, with: replacement)
+
+                start = Benchmark.now()
+                rope.replace(range, with: replacement)
+                let line = rope.lineIndex(containing: location)
+                let lineStart = rope.lineStart(line)
+                samples.append(Benchmark.now() - start)
+                XCTAssertEqual(lineStart, reference.lineRange(for: NSRange(location: location, length: 0)).location)
+            }
+
+            XCTAssertEqual(rope.length, reference.length)
+            XCTAssertEqual(rope.string, reference as String)
+            XCTAssertEqual(rope.lineCount, (reference as String).split(separator: "\n", omittingEmptySubsequences: false).count)
+            samples.sort()
+            Benchmark.report([
+                "rope", "\(lineCount) lines", "\(samples.count) edits",
+                "build \(Benchmark.milliseconds(buildTime))",
+                "p50 \(Benchmark.milliseconds(Benchmark.percentile(samples, 0.5)))",
+                "p99 \(Benchmark.milliseconds(Benchmark.percentile(samples, 0.99)))",
+                "heap Δ \(Benchmark.bytes(heapDelta))"
+            ])
+        }
+    }
+}
@@ -0,0 +1 @@
+../Neon Vision Editor/Core/DocumentOutline.swift
\ No newline at end of file
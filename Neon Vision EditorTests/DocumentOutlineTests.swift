@@ -0,0 +1,79 @@
+import XCTest
+
+final class DocumentOutlineTests: XCTestCase {
+    func testSwiftDeclarations() {
+        let outline = DocumentOutline(language: "swift")
+        waitForUpdate(of: outline) {
+            outline.reset(text: "import Foundation\nclass Store {\n    class func make() {}\n}\nenum Mode {}\n", generation: 1)
+        }
+        XCTAssertEqual(outline.generation, 1)
+        XCTAssertEqual(outline.entries.map(\.name), ["Store", "make", "Mode"])
+        XCTAssertEqual(outline.entries.map(\.line), [1, 2, 4])
+    }
+
+    func testEditsThatChangeNoEntryKeepThem() {
+        let outline = DocumentOutline(language: "swift")
+        let text = "struct Point {\n    let x = 1\n}\n"
+        waitForUpdate(of: outline) { outline.reset(text: text, generation: 0) }
+        let revision = outline.entriesRevision
+
+        waitForUpdate(of: outline) { outline.applyEdit(replacing: NSRange(location: 27, length: 0), with: "0", generation: 1) }
+        XCTAssertEqual(outline.generation, 1)
+        XCTAssertEqual(outline.entriesRevision, revision)
+
+        waitForUpdate(of: outline) { outline.applyEdit(replacing: NSRange(location: 0, length: 0), with: "\n", generation: 2) }
+        XCTAssertGreaterThan(outline.entriesRevision, revision)
+        XCTAssertEqual(outline.entries.map(\.line), [1])
+    }
+
+    func testLongDocumentsListNoLines() {
+        let outline = DocumentOutline(language: "plain")
+        let text = String(repeating: "log line\n", count: 50_000)
+        waitForUpdate(of: outline) { outline.reset(text: text, generation: 0) }
+        XCTAssertTrue(outline.isLineListingDisabled)
+        XCTAssertTrue(outline.entries.isEmpty)
+
+        // Shrinking it below the limit lists the lines again
+        let length = (text as NSString).length
+        waitForUpdate(of: outline) { outline.applyEdit(replacing: NSRange(location: 90, length: length - 90), with: "", generation: 1) }
+        XCTAssertFalse(outline.isLineListingDisabled)
+        XCTAssertEqual(outline.entries.count, 10)
+    }
+
+    func testIncrementalEditsMatchRescan() {
+        let insertions = ["x", "\n", "func ", "\n\nclass Added {\n", "struct S", "}\n", "# Title\n"]
+        for (seed, language) in ["swift", "markdown", "plain"].enumerated() {
+            let text = NSMutableString(string: "struct Point {\n    func length() -> Double { 0 }\n}\n\n# Notes\nfunc main() {}\n")
+            let outline = DocumentOutline(language: language)
+            waitForUpdate(of: outline) { outline.reset(text: text as String, generation: 0) }
+            var random = TestRandom(seed: UInt64(seed + 1))
+            for generation in 1...200 {
+                let location = random.next(below: text.length + 1)
+                let range: NSRange
+                let replacement: String
+                if text.length > 0 && random.next(below: 3) == 0 {
+                    range = NSRange(location: location, length: min(1 + random.next(below: 6), text.length - location))
+                    replacement = ""
+                } else {
+                    range = NSRange(location: location, length: 0)
+                    replacement = insertions[random.next(below: insertions.count)]
+                }
+                text.replaceCharacters(in: range, with: replacement)
+                waitForUpdate(of: outline) { outline.applyEdit(replacing: range, with: replacement, generation: generation) }
+
+                let rescanned = DocumentOutline(language: language)
+                waitForUpdate(of: rescanned) { rescanned.reset(text: text as String, generation: generation) }
+                XCTAssertEqual(outline.generation, generation)
+                XCTAssertEqual(outline.entries, rescanned.entries, "\(language) outline diverged after edit \(generation)")
+                XCTAssertEqual(outline.isTextEmpty, text.length == 0)
+                if outline.entries != rescanned.entries { break }
+            }
+        }
+    }
+
+    private func waitForUpdate(of outline: DocumentOutline, _ change: () -> Void) {
+        let updated = expectation(forNotification: DocumentOutline.didUpdateNotification, object: outline)
+        change()
+        wait(for: [updated], timeout: 10)
+    }
+}
@@ -0,0 +1 @@
+../Neon Vision Editor/Core/FuzzyMatch.swift
\ No newline at end of file
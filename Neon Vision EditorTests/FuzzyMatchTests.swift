@@ -0,0 +1,53 @@
+import XCTest
+
+final class FuzzyMatchTests: XCTestCase {
+    func testSpreadOutQueryPrefersWordStarts() {
+        let ranked = rank("cvact", [
+            "docs/concave_actuator.txt",
+            "Neon Vision Editor/Core/CachedValueActivity.swift",
+            "cv/act/readme.md",
+            "Neon Vision Editor/UI/ContentView+Actions.swift",
+            "Neon Vision Editor/UI/ContentView.swift"
+        ])
+        XCTAssertEqual(ranked.first, "Neon Vision Editor/UI/ContentView+Actions.swift")
+        XCTAssertFalse(ranked.contains("Neon Vision Editor/UI/ContentView.swift"), "Paths missing a query character must not match")
+        XCTAssertEqual(ranked.count, 4)
+    }
+
+    func testFileNameMatchBeatsFolderMatch() {
+        let ranked = rank("outline", [
+            "out/line.txt",
+            "Neon Vision Editor/Outline/Readme.md",
+            "Neon Vision Editor/Core/DocumentOutline.swift"
+        ])
+        XCTAssertEqual(ranked.first, "Neon Vision Editor/Core/DocumentOutline.swift")
+
+        let rope = score("rope", "Core/TextRope.swift")
+        let spread = score("rope", "Resources/Project/Example.txt")
+        XCTAssertNotNil(rope)
+        XCTAssertNotNil(spread)
+        XCTAssertGreaterThan(rope ?? 0, spread ?? 0)
+    }
+
+    func testEmptyQueryAndCharacterMask() {
+        XCTAssertEqual(score("", "anything"), 0)
+        XCTAssertNil(score("zz", "ContentView.swift"))
+
+        let key = "neon vision editor/ui/contentview+actions.swift"
+        let keyMask = FuzzyMatch.characterMask(key.utf8)
+        XCTAssertEqual(FuzzyMatch.characterMask("cvact".utf8) & ~keyMask, 0)
+        XCTAssertNotEqual(FuzzyMatch.characterMask("xyz".utf8) & ~keyMask, 0)
+    }
+
+    private func score(_ query: String, _ path: String) -> Int? {
+        FuzzyMatch.score(Array(query.lowercased().utf8), text: path, key: path.lowercased())
+    }
+
+    // Matching paths, best first
+    private func rank(_ query: String, _ paths: [String]) -> [String] {
+        paths
+            .compactMap { path in score(query, path).map { (path, $0) } }
+            .sorted { $0.1 > $1.1 }
+            .map(\.0)
+    }
+}
@@ -100,6 +100,95 @@ final class LanguageDetectorTests: XCTestCase {
         }
     }
 
+    func testSampledDetectionStopsAtConfidentHead() {
+        let text = "import SwiftUI\n" + String(repeating: "let value = 1\n", count: 20_000)
+        let result = LanguageDetector.shared.detectSampled(text: text, name: nil, fileURL: nil)
+        XCTAssertEqual(result.lang, "swift")
+        XCTAssertLessThan(result.examinedByteCount, text.utf8.count)
+    }
+
+    func testIncrementalDetectionMatchesFullScan() {
+        let edits = [
+            "def main():\n    print('hi')\n",
+            "import os\ndef main():\n    print('hi')\n",
+            "import os\ndef main():\n    print('hi'); return\n",
+            "[section]\nkey=value\n",
+            "[section]\nkey = value\n[INFO] started\n",
+            "using System;\nnamespace Foo { class Program { static void Main() {} } }",
+            ""
+        ]
+        var previous = ""
+        var state = LanguageDetector.shared.detectionState(for: previous)
+        for text in edits {
+            let incremental = LanguageDetector.shared.detect(text: text, name: nil, fileURL: nil, updating: &state, previousText: previous)
+            let full = LanguageDetector.shared.detect(text: text, name: nil, fileURL: nil)
+            XCTAssertEqual(incremental.scores, full.scores, "Incremental scores diverged for \(text.debugDescription)")
+            previous = text
+        }
+    }
+
+    func testIncrementalLineCountsFollowTyping() {
+        let detector = LanguageDetector.shared
+        let typed = "[core]\nkey:\n  value\nname = x\nother: 1\n"
+        var text = ""
+        var state = detector.detectionState(for: text)
+        func edit(to newText: String) {
+            _ = detector.detect(text: newText, name: nil, fileURL: nil, updating: &state, previousText: text)
+            text = newText
+            XCTAssertEqual(state, detector.detectionState(for: text), "Incremental counts diverged for \(text.debugDescription)")
+        }
+
+        // One keystroke at a time, including the line breaks between keys and values
+        for character in typed {
+            edit(to: text + String(character))
+        }
+        // Then delete the punctuation the line patterns depend on, one character at a time
+        for removed in [":", "=", "]", "["] {
+            if let range = text.range(of: removed) {
+                edit(to: text.replacingCharacters(in: range, with: ""))
+            }
+        }
+        edit(to: "key:\n  value")
+        edit(to: "key\n  value")
+    }
+
+    func testEditWindowsMatchFullScan() {
+        let detector = LanguageDetector.shared
+        let text = NSMutableString(string: "[core]\nkey = value\nimport SwiftUI\n")
+        var state = detector.detectionState(for: text as String)
+        let edits: [(location: Int, length: Int, replacement: String)] = [
+            (0, 0, "def main():\n    print('hi')\n"),
+            (4, 4, "rust_main"),
+            (text.length, 0, "\nfinal class Foo {}\n"),
+            (10, 20, ""),
+            (0, 1, "@main struct App: View {}\nname: x\n"),
+            (3, 0, ":\n  value")
+        ]
+        var windows: [LanguageDetector.EditWindow] = []
+        for (index, edit) in edits.enumerated() {
+            let range = NSRange(location: min(edit.location, text.length), length: min(edit.length, text.length - min(edit.location, text.length)))
+            let removed = contextWindow(in: text, from: range.location, to: NSMaxRange(range))
+            text.replaceCharacters(in: range, with: edit.replacement)
+            let inserted = contextWindow(in: text, from: range.location, to: range.location + (edit.replacement as NSString).length)
+            windows.append(LanguageDetector.EditWindow(removed: removed, inserted: inserted))
+            // Several edits may reach the detector together
+            guard index % 2 == 1 else { continue }
+            let incremental = detector.detect(text: text as String, name: nil, fileURL: nil, updating: &state, edits: windows)
+            windows.removeAll()
+            XCTAssertEqual(state, detector.detectionState(for: text as String), "Window counts diverged for \((text as String).debugDescription)")
+            XCTAssertEqual(incremental.scores, detector.detect(text: text as String, name: nil, fileURL: nil).scores)
+        }
+    }
+
+    // The whole lines around `lower..<upper` widened by the detector's context length, the way
+    // the document buffer reports an edit
+    private func contextWindow(in text: NSString, from lower: Int, to upper: Int) -> String {
+        let margin = LanguageDetector.editContextLength
+        let start = text.lineRange(for: NSRange(location: max(0, lower - margin), length: 0)).location
+        let end = NSMaxRange(text.lineRange(for: NSRange(location: min(text.length, upper + margin), length: 0)))
+        return text.substring(with: NSRange(location: start, length: end - start))
+    }
+
     func testDetectPlainWhenNoSignal() {
         let result = LanguageDetector.shared.detect(text: "", name: nil, fileURL: nil)
         XCTAssertEqual(result.lang, "plain")
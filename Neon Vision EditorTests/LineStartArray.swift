@@ -0,0 +1 @@
+../Neon Vision Editor/Core/LineStartArray.swift
\ No newline at end of file
@@ -0,0 +1 @@
+../Neon Vision Editor/Core/SyntaxHighlighting.swift
\ No newline at end of file
@@ -0,0 +1,26 @@
+import XCTest
+
+final class SyntaxHighlightingTests: XCTestCase {
+    func testJSONKeysAreProperties() {
+        let text = #"{"name": "Neon", "tags": ["a:b"], "count": 2}"#
+        XCTAssertEqual(kind(of: #""name":"#, in: text, language: "json"), .property)
+        XCTAssertEqual(kind(of: #""count":"#, in: text, language: "json"), .property)
+        XCTAssertEqual(kind(of: #""Neon""#, in: text, language: "json"), .string)
+        XCTAssertEqual(kind(of: #""a:b""#, in: text, language: "json"), .string)
+    }
+
+    func testNotebookKeysAreProperties() {
+        let text = #"{"cells": [], "metadata": {"author": "x"}}"#
+        XCTAssertEqual(kind(of: #""cells":"#, in: text, language: "ipynb"), .property)
+        XCTAssertEqual(kind(of: #""metadata":"#, in: text, language: "ipynb"), .property)
+        XCTAssertEqual(kind(of: #""author""#, in: text, language: "ipynb"), .string)
+    }
+
+    // The kind of the token covering exactly the first occurrence of `fragment`, or nil when no
+    // token does
+    private func kind(of fragment: String, in text: String, language: String) -> SyntaxTokenKind? {
+        let target = (text as NSString).range(of: fragment)
+        let tokens = SyntaxGrammarCache.shared.grammar(for: language).tokens(in: text, range: NSRange(location: 0, length: (text as NSString).length))
+        return tokens.first { NSEqualRanges($0.range, target) }?.kind
+    }
+}
@@ -0,0 +1 @@
+../Neon Vision Editor/Core/SyntaxTokenizer.swift
\ No newline at end of file
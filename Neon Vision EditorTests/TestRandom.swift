@@ -0,0 +1,15 @@
+import Foundation
+
+/// Deterministic pseudo-random numbers, so a failing sequence of edits replays the same way.
+struct TestRandom {
+    private var state: UInt64
+
+    init(seed: UInt64) {
+        state = seed
+    }
+
+    mutating func next(below bound: Int) -> Int {
+        state = state &* 6364136223846793005 &+ 1442695040888963407
+        return Int((state >> 33) % UInt64(max(1, bound)))
+    }
+}
@@ -0,0 +1 @@
+../Neon Vision Editor/Core/TextLineIndex.swift
\ No newline at end of file
@@ -0,0 +1,43 @@
+import XCTest
+
+final class TextLineIndexTests: XCTestCase {
+    func testLineStartsFollowLineBreaks() {
+        let index = TextLineIndex(text: "a\nbc\r\nd\re\n")
+        XCTAssertEqual(index.lineStarts, [0, 2, 6, 8, 10])
+        XCTAssertEqual(index.lineIndex(containing: 0), 0)
+        XCTAssertEqual(index.lineIndex(containing: 4), 1)
+        XCTAssertEqual(index.lineIndex(containing: 6), 2)
+        XCTAssertEqual(index.lineIndex(containing: 10), 4)
+        XCTAssertEqual(index.lineStart(99), 10)
+    }
+
+    func testApplyEditMatchesReset() {
+        let text = NSMutableString(string: "first\nsecond\r\nthird\n\nfifth")
+        let index = TextLineIndex(text: text)
+        let insertions = ["x", "\n", "\r\n", "\r", "ab\ncd", "\n\n  "]
+        var random = TestRandom(seed: 17)
+        for step in 0..<2_000 {
+            let location = random.next(below: text.length + 1)
+            let editedRange: NSRange
+            let delta: Int
+            if text.length > 0 && random.next(below: 3) == 0 {
+                let length = min(1 + random.next(below: 4), text.length - location)
+                text.deleteCharacters(in: NSRange(location: location, length: length))
+                editedRange = NSRange(location: location, length: 0)
+                delta = -length
+            } else {
+                let insertion = insertions[random.next(below: insertions.count)]
+                text.insert(insertion, at: location)
+                editedRange = NSRange(location: location, length: insertion.utf16.count)
+                delta = insertion.utf16.count
+            }
+            index.applyEdit(in: text, editedRange: editedRange, changeInLength: delta)
+
+            let expected = TextLineIndex(text: text).lineStarts
+            XCTAssertEqual(index.lineStarts, expected, "Line starts diverged after edit \(step)")
+            let probe = random.next(below: text.length + 1)
+            XCTAssertEqual(index.lineStart(index.lineIndex(containing: probe)), text.lineRange(for: NSRange(location: probe, length: 0)).location)
+            if index.lineStarts != expected { return }
+        }
+    }
+}
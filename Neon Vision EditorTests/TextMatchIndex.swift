@@ -0,0 +1 @@
+../Neon Vision Editor/Core/TextMatchIndex.swift
\ No newline at end of file
@@ -0,0 +1,77 @@
+import XCTest
+
+final class TextMatchIndexTests: XCTestCase {
+    func testApplyEditMatchesFreshSearch() {
+        let queries = [
+            TextMatchIndex.Query(pattern: "value", usesRegex: false, caseSensitive: false),
+            TextMatchIndex.Query(pattern: "aa", usesRegex: false, caseSensitive: true)
+        ]
+        let insertions = ["a", "aa", "Value", "val", "ue", "\n", "x"]
+        for (seed, query) in queries.enumerated() {
+            let text = NSMutableString(string: "let value = aaa\nvar VALUE: Int\n// no match here\naa value aa\n")
+            let index = TextMatchIndex()
+            search(index, query: query, in: text)
+            var random = TestRandom(seed: UInt64(seed + 1))
+            for step in 0..<500 {
+                let location = random.next(below: text.length + 1)
+                let editedRange: NSRange
+                let delta: Int
+                if text.length > 0 && random.next(below: 3) == 0 {
+                    let length = min(1 + random.next(below: 4), text.length - location)
+                    text.deleteCharacters(in: NSRange(location: location, length: length))
+                    editedRange = NSRange(location: location, length: 0)
+                    delta = -length
+                } else {
+                    let insertion = insertions[random.next(below: insertions.count)]
+                    text.insert(insertion, at: location)
+                    editedRange = NSRange(location: location, length: insertion.utf16.count)
+                    delta = insertion.utf16.count
+                }
+                index.applyEdit(in: text, editedRange: editedRange, changeInLength: delta)
+
+                XCTAssertTrue(index.isCurrent, "A short document should never exceed the rescan budget")
+                XCTAssertEqual(index.matches, search(TextMatchIndex(), query: query, in: text), "Matches diverged after edit \(step) for \(query.pattern)")
+            }
+        }
+    }
+
+    func testEditWithoutMatchesAfterItStaysCurrent() {
+        let query = TextMatchIndex.Query(pattern: "needle", usesRegex: false, caseSensitive: true)
+        let text = NSMutableString(string: "needle\n" + String(repeating: "hay ", count: 100_000))
+        let index = TextMatchIndex()
+        search(index, query: query, in: text)
+
+        text.insert("needle", at: 20)
+        index.applyEdit(in: text, editedRange: NSRange(location: 20, length: 6), changeInLength: 6)
+        XCTAssertTrue(index.isCurrent)
+        XCTAssertEqual(index.matches, [NSRange(location: 0, length: 6), NSRange(location: 20, length: 6)])
+    }
+
+    func testEditBeyondRescanBudgetSearchesAgain() {
+        let query = TextMatchIndex.Query(pattern: "needle", usesRegex: false, caseSensitive: true)
+        let text = NSMutableString(string: "needle" + String(repeating: "hay ", count: 100_000) + "needle")
+        let index = TextMatchIndex()
+        search(index, query: query, in: text)
+        XCTAssertEqual(index.matches.count, 2)
+
+        // Breaking the first match leaves nothing to line up with until the far end of the text
+        text.deleteCharacters(in: NSRange(location: 0, length: 1))
+        index.applyEdit(in: text, editedRange: NSRange(location: 0, length: 0), changeInLength: -1)
+        XCTAssertFalse(index.isCurrent)
+        XCTAssertEqual(search(index, query: query, in: text), [NSRange(location: text.length - 6, length: 6)])
+        XCTAssertTrue(index.isCurrent)
+    }
+
+    @discardableResult
+    private func search(_ index: TextMatchIndex, query: TextMatchIndex.Query, in text: NSString) -> [NSRange] {
+        let done = expectation(description: "search")
+        let snapshot = NSString(string: text)
+        var found: [NSRange] = []
+        index.matches(for: query, in: { snapshot }) { result in
+            found = (try? result.get()) ?? []
+            done.fulfill()
+        }
+        wait(for: [done], timeout: 10)
+        return found
+    }
+}
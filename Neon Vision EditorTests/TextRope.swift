@@ -0,0 +1 @@
+../Neon Vision Editor/Core/TextRope.swift
\ No newline at end of file
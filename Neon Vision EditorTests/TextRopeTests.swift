@@ -0,0 +1,68 @@
+import XCTest
+
+final class TextRopeTests: XCTestCase {
+    func testLinesEndAtNewlines() {
+        let rope = TextRope("a\r\nb\rc\n")
+        XCTAssertEqual(rope.length, 7)
+        XCTAssertEqual(rope.lineCount, 3)
+        XCTAssertEqual(rope.lineStart(1), 3)
+        XCTAssertEqual(rope.lineStart(2), 7)
+        XCTAssertEqual(rope.lineIndex(containing: 2), 0)
+        XCTAssertEqual(rope.lineIndex(containing: 3), 1)
+        XCTAssertEqual(rope.lineIndex(containing: 7), 2)
+        XCTAssertEqual(rope.lineRange(0), NSRange(location: 0, length: 3))
+        XCTAssertEqual(rope.lineRange(2), NSRange(location: 7, length: 0))
+    }
+
+    func testReplaceMatchesString() {
+        // Long enough for several levels of chunks, with edits often landing on chunk boundaries
+        let line = "let value = \"ü\" // comment\r\n"
+        let text = NSMutableString(string: String(repeating: line, count: 3_000))
+        let rope = TextRope(text as String)
+        let insertions = ["x", "\n", "\r\n", "ü", "", String(repeating: "y\n", count: 1_500)]
+        var random = TestRandom(seed: 16)
+        for step in 0..<300 {
+            var location = random.next(below: text.length + 1)
+            if random.next(below: 2) == 0 {
+                location = min(text.length, (location / 2048) * 2048 + random.next(below: 3))
+            }
+            let length = min(random.next(below: 3) == 0 ? random.next(below: 5_000) : random.next(below: 4), text.length - location)
+            let range = NSRange(location: location, length: length)
+            let replacement = insertions[random.next(below: insertions.count)]
+            text.replaceCharacters(in: range, with: replacement)
+            rope.replace(range, with: replacement)
+
+            XCTAssertEqual(rope.length, text.length, "Length diverged after edit \(step)")
+            let starts = lineStarts(of: text)
+            XCTAssertEqual(rope.lineCount, starts.count, "Line count diverged after edit \(step)")
+            for _ in 0..<20 {
+                let lineNumber = random.next(below: starts.count)
+                XCTAssertEqual(rope.lineStart(lineNumber), starts[lineNumber])
+                let offset = random.next(below: text.length + 1)
+                XCTAssertEqual(rope.lineIndex(containing: offset), starts.lastIndex { $0 <= offset })
+                let substringRange = NSRange(location: offset, length: min(random.next(below: 4_096), text.length - offset))
+                XCTAssertEqual(rope.substring(with: substringRange), text.substring(with: substringRange))
+            }
+        }
+        XCTAssertEqual(rope.string, text as String)
+    }
+
+    func testSnapshotIsUnaffectedByLaterEdits() {
+        let rope = TextRope(String(repeating: "line\n", count: 2_000))
+        let snapshot = rope.snapshot()
+        rope.replace(NSRange(location: 0, length: 5), with: "edited\n\n")
+        snapshot.replace(NSRange(location: snapshot.length, length: 0), with: "tail")
+        XCTAssertEqual(snapshot.string, String(repeating: "line\n", count: 2_000) + "tail")
+        XCTAssertEqual(rope.string, "edited\n\n" + String(repeating: "line\n", count: 1_999))
+        XCTAssertEqual(rope.lineCount, 2_002)
+    }
+
+    // Offsets just past each "\n", after 0, the way the rope splits lines
+    private func lineStarts(of text: NSString) -> [Int] {
+        var starts = [0]
+        for offset in 0..<text.length where text.character(at: offset) == UInt16(ascii: "\n") {
+            starts.append(offset + 1)
+        }
+        return starts
+    }
+}
@@ -0,0 +1,43 @@
+// swift-tools-version:6.1
+// Headless build of the Foundation-only editor core. It exists so the highlighting, language
+// detection and text buffer benchmarks run with `swift test`, on macOS or Linux, without AppKit.
+// The app itself is built from "Neon Vision Editor.xcodeproj".
+//
+// Swift 6.1 or later is required: the core marks types that run on background queues
+// `nonisolated`, because the app target isolates everything to the main actor by default. The
+// sources are still compiled in the Swift 5 language mode, like the app.
+import PackageDescription
+
+let package = Package(
+    name: "NeonVisionCore",
+    platforms: [.macOS(.v13)],
+    targets: [
+        .target(
+            name: "NeonVisionCore",
+            path: "Neon Vision Editor/Core",
+            sources: [
+                "DocumentOutline.swift",
+                "FuzzyMatch.swift",
+                "LanguageDetector.swift",
+                "LineStartArray.swift",
+                "ProjectFileIndex.swift",
+                "ProjectFileWatcher.swift",
+                "ProjectSearch.swift",
+                "ProjectTreeLoader.swift",
+                "SyntaxHighlighting.swift",
+                "SyntaxTokenizer.swift",
+                "TextLineIndex.swift",
+                "TextMatchIndex.swift",
+                "TextRope.swift"
+            ],
+            // Lets the benchmarks use `@testable import` in release builds too
+            swiftSettings: [.unsafeFlags(["-enable-testing"])]
+        ),
+        .testTarget(
+            name: "NeonVisionEditorBenchmarks",
+            dependencies: ["NeonVisionCore"],
+            path: "Neon Vision EditorBenchmarks"
+        )
+    ],
+    swiftLanguageModes: [.v5]
+)